@@ -1,7 +1,17 @@
+import os
 from abc import ABC, abstractmethod
-from typing import Any
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
 
+from background_save import BackgroundSave
+from bitmap import Bitmap
 from book import Book, BookStatus
+from change_feed import ChangeEvent, ChangeFeed
+from enums import ChangeKind, SearchCriteria
+from exceptions import BookRepositoryError
+from record_store import BookRecord, BookRecordStore
+from repository_view import RepositoryView
+from snapshot_io import write_snapshot, open_snapshot, is_line_delimited
 
 
 class AbstractBookRepositoryExport(ABC):
@@ -23,27 +33,54 @@ class AbstractBookRepositoryExport(ABC):
 
     @abstractmethod
     def export_data(self, source_data: tuple[dict[int, dict[str: Any]], dict[int, bool]],
-                    destination_data: tuple[dict[int, dict[str: Any]], dict[int, bool]]) -> int:
+                    destination_data: BookRecordStore) -> int:
         """
         Заполняет хранилище из списка простых объектов.
         :param source_data: Данные для экспорта в виде кортежа: [book_list, status_dict].
-        :param destination_data: Данные, куда данные экспортируются.
+        :param destination_data: Записи книг, куда данные экспортируются.
         :return: Последний номер идентификатора.
         :raises BookRepositoryExportException: Ошибка при экспорте данных
         """
         raise NotImplementedError()
 
+    @abstractmethod
+    def export_lines(self, lines: Iterable[str], destination_data: BookRecordStore) -> int:
+        """
+        Заполняет хранилище из строк, каждая из которых является JSON-записью книги со статусом.
+        :param lines: Строки для экспорта.
+        :param destination_data: Записи книг, куда данные экспортируются.
+        :return: Последний номер идентификатора.
+        :raises BookRepositoryExportException: Ошибка при экспорте данных с указанием номера строки.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def book_to_line(self, book: Book, status: bool | BookStatus) -> str:
+        """
+        Преобразует книгу и её статус в строку с JSON-записью.
+        :param book: Книга.
+        :param status: Статус книги.
+        :return: Строка, заканчивающаяся переводом строки.
+        """
+        raise NotImplementedError()
+
 
 class AbstractBookRepository(ABC):
     """ Абстрактный метод для хранилища книг. """
     def __init__(self):
         self._last_id = 0
         """"""
-        self._books: dict[int, Book] = {}
-        """ Книги. """
-        self._books_status: dict[int, bool] = {}
-        """ Статусы книги. """
+        self._records = BookRecordStore()
+        """ Записи книг вместе с их статусами. """
         self._repository_export: AbstractBookRepositoryExport | None = None
+        self._background_save: BackgroundSave | None = None
+        """ Последнее фоновое сохранение. """
+        self._version = 0
+        """ Номер версии хранилища, увеличивается при каждом изменении. """
+        self._compression_level: int | None = None
+        """ Уровень сжатия снимка, None - уровень по умолчанию. """
+        self._change_feed = ChangeFeed()
+        """ Лента изменений хранилища. """
 
     def set_repository_export(self, repository_export: AbstractBookRepositoryExport):
         """
@@ -68,6 +105,109 @@ class AbstractBookRepository(ABC):
         """
         raise NotImplementedError()
 
+    def set_compression_level(self, compression_level: int | None):
+        """
+        Устанавливает уровень сжатия снимка.
+        Сжатие снимка выбирается по расширению файла: '.gz', '.bz2' или '.xz'.
+        :param compression_level: Уровень сжатия, или None для уровня по умолчанию.
+        """
+        self._compression_level = compression_level
+
+    @property
+    def version(self) -> int:
+        """ Номер версии хранилища, который увеличивается при каждом изменении. """
+        return self._version
+
+    @property
+    def change_feed(self) -> ChangeFeed:
+        """ Лента изменений хранилища, на которую подписываются производные структуры, кэши и реплики. """
+        return self._change_feed
+
+    def _publish(self, kind: ChangeKind, records: Iterable[BookRecord] = ()):
+        """
+        Публикует событие в ленту изменений с текущей версией хранилища.
+        Записи перебираются, только если у ленты есть подписчики, поэтому их можно передавать генератором.
+        :param kind: Вид события.
+        :param records: Затронутые книги со статусами.
+        """
+        if self._change_feed:
+            self._change_feed.publish(ChangeEvent(kind, self._version, tuple(records)))
+
+    @property
+    def last_background_save(self) -> BackgroundSave | None:
+        """ Последнее фоновое сохранение, или None, если фоновых сохранений не было. """
+        return self._background_save
+
+    def save_in_background(self, filename) -> BackgroundSave:
+        """
+        Сохраняет книги в файл в фоновом потоке.
+        Снимок хранилища берётся сразу, а запись идёт в фоне, поэтому хранилище можно изменять во время сохранения.
+        Файл создаётся, только если хранилище не пустое.
+        :param filename:
+        :return: Запущенное фоновое сохранение.
+        """
+        records = self.snapshot()
+        self._background_save = BackgroundSave(
+            lambda progress: self._write_snapshot(filename, records, progress),
+            len(records), previous=self._background_save).start()
+        return self._background_save
+
+    def _write_snapshot(self, filename, records: BookRecordStore,
+                        progress: Callable[[int], None] | None = None) -> int:
+        """
+        Записывает снимок хранилища в файл.
+        Снимок пишется потоково во временный файл, сбрасывается на диск и только потом заменяет файл хранилища.
+        Если расширение файла указывает на сжатие, то снимок потоково сжимается,
+        а для расширений '.ndjson' и '.jsonl' снимок пишется построчно.
+        :param filename:
+        :param records: Записи книг снимка.
+        :param progress: Функция, которой передаётся количество уже записанных книг.
+        :return: Количество сохранённых книг.
+        """
+        filename = Path(filename)
+        # Временный файл получает расширение основного файла, чтобы сжатие определилось так же.
+        tmp_filename = filename.with_name(f"{filename.stem}.tmp{filename.suffix}")
+        with open_snapshot(tmp_filename, 'w', self._compression_level) as f:
+            if is_line_delimited(filename):
+                count = self._write_lines(f, records, progress)
+            else:
+                count = write_snapshot(f, records, progress)
+        with open(tmp_filename, 'r+b') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+        return count
+
+    def _write_lines(self, f, records: BookRecordStore, progress: Callable[[int], None] | None = None) -> int:
+        """
+        Записывает снимок построчно, по одной книге со статусом в строке.
+        :return: Количество записанных книг.
+        """
+        count = 0
+        for book, status in records.records():
+            f.write(self._repository_export.book_to_line(book, status))
+            count += 1
+            if progress is not None:
+                progress(count)
+        return count
+
+    def snapshot(self) -> BookRecordStore:
+        """
+        Возвращает согласованную копию книг и их статусов.
+        :return: Записи книг вместе с их статусами.
+        """
+        records = BookRecordStore()
+        for book, status in self.iter_books_with_status():
+            records.put(book, status.value)
+        return records
+
+    def view(self) -> RepositoryView:
+        """
+        Возвращает представление хранилища только для чтения, закреплённое за текущей версией.
+        По умолчанию представление строится по снимку хранилища.
+        """
+        version = self._version
+        return RepositoryView(self.snapshot(), version)
+
     @abstractmethod
     def load(self, filename) -> int:
         """
@@ -79,12 +219,70 @@ class AbstractBookRepository(ABC):
         """
         raise NotImplementedError()
 
+    def iter_books_with_status(self) -> Iterator[tuple[Book, BookStatus]]:
+        """
+        Обходит книги хранилища вместе с их статусами, не создавая списка всех книг.
+        :return: Генератор пар (книга, статус).
+        """
+        for book in self.all_books:
+            yield book, self.get_status_book(book.id)
+
+    def status_bitmap(self, status: BookStatus) -> Bitmap:
+        """
+        Возвращает битовую карту идентификаторов книг с указанным статусом.
+        Карту можно объединять побитовыми операциями с другими картами, например с картой годов издания.
+        :param status: Статус книг.
+        """
+        return Bitmap.from_indexes(book.id for book, book_status in self.iter_books_with_status()
+                                   if book_status == status)
+
+    def year_bitmap(self, year_from: int | None = None, year_to: int | None = None) -> Bitmap:
+        """
+        Возвращает битовую карту идентификаторов книг, изданных в указанном диапазоне лет.
+        :param year_from: Год, не раньше которого изданы книги, или None.
+        :param year_to: Год, не позже которого изданы книги, или None.
+        """
+        return Bitmap.from_indexes(book.id for book, _ in self.iter_books_with_status()
+                                   if (year_from is None or book.year >= year_from)
+                                   and (year_to is None or book.year <= year_to))
+
+    def find_books_with_status(self, search_criteria: SearchCriteria, search_val: str | int) \
+            -> tuple[tuple[Book, BookStatus], ...]:
+        """
+        Ищет книги и возвращает их вместе со статусами.
+        :param search_criteria: Критерий поиска.
+        :param search_val: Значение поиска.
+        :return: Кортеж пар (книга, статус).
+        :raises BookRepositoryError: Ошибка при указании года выпуска книги;
+                                     Указан неверный критерий поиска.
+        """
+        match search_criteria:
+            case SearchCriteria.SEARCH_TITLE:
+                books = self.find_book_by_title(search_val)
+            case SearchCriteria.SEARCH_AUTHOR:
+                books = self.find_book_by_author(search_val)
+            case SearchCriteria.SEARCH_YEAR:
+                books = self.find_book_by_year(search_val)
+            case _:
+                raise BookRepositoryError("Invalid search criteria specified")
+        return tuple((book, self.get_status_book(book.id)) for book in books)
+
     @property
     @abstractmethod
     def number_of_books(self) -> int:
         """ Количество книг в хранилище. """
         raise NotImplementedError()
 
+    def count_by_status(self) -> dict[BookStatus, int]:
+        """
+        Подсчитывает количество книг с каждым статусом.
+        :return: Словарь {статус: количество книг}.
+        """
+        counts = dict.fromkeys(BookStatus, 0)
+        for _, status in self.iter_books_with_status():
+            counts[status] += 1
+        return counts
+
     @abstractmethod
     def add_book(self, book: Book) -> int:
         """
@@ -94,6 +292,23 @@ class AbstractBookRepository(ABC):
         """
         raise NotImplementedError()
 
+    def add_books(self, books: Iterable[Book]) -> tuple[int, ...]:
+        """
+        Добавляет пачку книг в хранилище.
+        :param books: Добавляемые книги.
+        :return: Идентификаторы добавленных книг.
+        """
+        return tuple(self.add_book(book) for book in books)
+
+    @abstractmethod
+    def compact(self, renumber: bool = False) -> tuple[int, dict[int, int]]:
+        """
+        Уплотняет хранилище: освобождает место удалённых записей и при необходимости перенумеровывает книги.
+        :param renumber: Перенумеровать книги, убрав пропуски в идентификаторах.
+        :return: Кортеж (количество освобождённых записей, таблица {старый идентификатор: новый идентификатор}).
+        """
+        raise NotImplementedError()
+
     @abstractmethod
     def get_status_book(self, _id) -> BookStatus:
         """
@@ -138,6 +353,16 @@ class AbstractBookRepository(ABC):
         """
         raise NotImplementedError()
 
+    def get_book_with_status(self, _id: int) -> tuple[Book, BookStatus] | None:
+        """
+        Получение книги вместе с её статусом по идентификатору книги.
+        :param _id: Идентификатор книги, которую требуется вернуть.
+        :return: Пара (книга, статус) или None, если книги с таким идентификатором нет.
+        :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
+        """
+        book = self.get_book_by_id(_id)
+        return None if book is None else (book, self.get_status_book(book.id))
+
     @abstractmethod
     def find_book_by_author(self, author: str) -> tuple[Book]:
         """ Поиск книг по автору. """
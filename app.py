@@ -1,11 +1,14 @@
+import argparse
+import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 from abstract_class import AbstractBookRepository, AbstractBookRepositoryExport
 from book_manager import BookManager
 from book_repository import BookRepository
-from exceptions import BookRepositoryError, BookRepositoryExportException
+from enums import BookStatus
+from exceptions import BookRepositoryError, BookRepositoryExportException, BookManagerError
 from helper import clear_display, print_awaiting_message
-from library_console import LibraryConsole
 from repository_export import BookRepositoryExport
 
 
@@ -13,28 +16,203 @@ from repository_export import BookRepositoryExport
 # logger = get_logger('app', LOGGER_FILENAME, is_debug_mode=True)
 
 
+EXPORT_FORMATS = ('ndjson', 'csv')
+""" Форматы выгрузки каталога, совпадают с CatalogExporter.FORMATS. """
+
+
 class SimpleLibrary:
+    """
+    Приложение библиотеки.
+    Консоль, планировщик контрольных точек и секционированное хранилище импортируются только при использовании,
+    поэтому короткие запуски из командной строки не тратят время на их загрузку.
+    """
     REPOSITORY_FILENAME = r"db/book_repository.json"
+    PARTITIONED_REPOSITORY_FILENAME = r"db/book_repository.manifest.json"
+
+    def __init__(self, partitioned: bool = False, stats: bool = False, metrics_port: int | None = None):
+        """
+        Конструктор класса.
+        :param partitioned: Хранить снимок хранилища в виде манифеста и сегментов.
+        :param stats: Собирать статистику операций хранилища и менеджера книг.
+        :param metrics_port: Порт, на котором публикуются метрики в формате Prometheus, или None.
+            Публикация метрик включает и сбор статистики операций.
+        """
+        if partitioned:
+            from partitioned_book_repository import PartitionedBookRepository
 
-    def __init__(self):
-        book_repository: AbstractBookRepository = BookRepository()
+            book_repository: AbstractBookRepository = PartitionedBookRepository()
+            self._repository_filename = self.PARTITIONED_REPOSITORY_FILENAME
+        else:
+            book_repository: AbstractBookRepository = BookRepository()
+            self._repository_filename = self.REPOSITORY_FILENAME
         repository_export: AbstractBookRepositoryExport = BookRepositoryExport(book_repository)
         book_repository.set_repository_export(repository_export)
+        self._book_repository = book_repository
         self._book_manager = BookManager(book_repository)
-        self._library_console = LibraryConsole(self._book_manager)
+        self._checkpoint_scheduler = None
+        self._instrumentation = None
+        self._metrics_port = metrics_port
+        self._metrics_server = None
+        if stats or metrics_port is not None:
+            from instrumentation import Instrumentation
+
+            self._instrumentation = Instrumentation()
+            self._instrumentation.instrument(book_repository, 'repository')
+            self._instrumentation.instrument(self._book_manager, 'manager')
+
+    @property
+    def instrumentation(self) -> 'Instrumentation | None':
+        """ Сбор статистики операций, или None, если статистика не собирается. """
+        return self._instrumentation
 
     def run(self):
         """ Запуск работы приложения """
+        from checkpoint import CheckpointScheduler
+        from library_console import LibraryConsole
+
         self._load_data()
-        self._library_console.start_console(self._quit_handler)
+        if self._metrics_port is not None:
+            from metrics_server import MetricsCollector, MetricsServer
+
+            collector = MetricsCollector(self._book_repository, self._instrumentation, self._repository_filename)
+            self._metrics_server = MetricsServer(collector, self._metrics_port).start()
+        self._checkpoint_scheduler = CheckpointScheduler(self._book_repository, self._repository_filename).start()
+        LibraryConsole(self._book_manager, self._instrumentation).start_console(self._quit_handler)
+
+    def run_batch(self, filename=None, output=None) -> int:
+        """
+        Выполняет команды консоли из файла без диалога и сохраняет хранилище, если команды его изменили.
+        Результаты команд пишутся строками JSON, а сообщения - в поток ошибок, чтобы не смешиваться с результатами.
+        :param filename: Файл с командами, или None для стандартного ввода.
+        :param output: Файл для результатов, или None для стандартного вывода.
+        :return: Код завершения приложения, 1 - если хотя бы одна команда завершилась ошибкой.
+        """
+        from library_console import LibraryConsole
+
+        console = LibraryConsole(self._book_manager, self._instrumentation)
+        try:
+            if Path(self._repository_filename).exists():
+                self._book_manager.load_data(self._repository_filename)
+            version = self._book_repository.version
+            with nullcontext(sys.stdin) if filename in (None, '-') else open(filename, encoding='utf-8') as commands:
+                with nullcontext(sys.stdout) if output in (None, '-') else open(output, 'w', encoding='utf-8') \
+                        as results:
+                    failed = console.run_batch(commands, results)
+            if self._book_repository.version != version:
+                saved = self._book_manager.save_data(self._repository_filename)
+                print(f"{saved} books have been saved", file=sys.stderr)
+        except (BookRepositoryError, BookRepositoryExportException, BookManagerError) as err:
+            print(err.message, file=sys.stderr)
+            return 1
+        except OSError as err:
+            print(f"The commands could not be run: {err}", file=sys.stderr)
+            return 1
+        if failed > 0:
+            print(f"{failed} commands have failed", file=sys.stderr)
+            return 1
+        return 0
+
+    def import_csv(self, filename, reject_filename=None) -> int:
+        """
+        Импортирует книги из CSV-файла без запуска консоли и сохраняет хранилище.
+        :param filename: CSV-файл для импорта.
+        :param reject_filename: Файл для отклонённых строк.
+        :return: Код завершения приложения.
+        """
+        try:
+            if Path(self._repository_filename).exists():
+                self._book_manager.load_data(self._repository_filename)
+            imported, rejected = self._book_manager.import_csv(filename, reject_filename)
+        except (BookRepositoryError, BookRepositoryExportException, BookManagerError) as err:
+            print(err.message)
+            return 1
+        print(f"{imported} books have been imported, {rejected} rows have been rejected")
+        self._save_data()
+        return 0
+
+    def export_catalog(self, export_format: str, output=None, **filters) -> int:
+        """
+        Выгружает каталог без запуска консоли.
+        :param export_format: Формат выгрузки 'ndjson' или 'csv'.
+        :param output: Файл для выгрузки, или None для стандартного вывода.
+        :param filters: Фильтры выгрузки.
+        :return: Код завершения приложения.
+        """
+        try:
+            if Path(self._repository_filename).exists():
+                self._book_manager.load_data(self._repository_filename)
+            if output is None or output == '-':
+                count = self._book_manager.export_catalog(sys.stdout, export_format, **filters)
+            else:
+                with open(output, 'w', encoding='utf-8', newline='') as f:
+                    count = self._book_manager.export_catalog(f, export_format, **filters)
+        except (BookRepositoryError, BookRepositoryExportException, BookManagerError) as err:
+            print(err.message, file=sys.stderr)
+            return 1
+        # Сообщение выводится в поток ошибок, чтобы не смешиваться с выгрузкой.
+        print(f"{count} books have been exported", file=sys.stderr)
+        return 0
+
+    def compact(self, renumber: bool = False, mapping_filename=None) -> int:
+        """
+        Уплотняет хранилище без запуска консоли и переписывает снимок.
+        :param renumber: Перенумеровать книги, убрав пропуски в идентификаторах.
+        :param mapping_filename: CSV-файл для таблицы перенумерации.
+        :return: Код завершения приложения.
+        """
+        try:
+            if Path(self._repository_filename).exists():
+                self._book_manager.load_data(self._repository_filename)
+            removed, renumbered = self._book_manager.compact(self._repository_filename, renumber, mapping_filename)
+        except (BookRepositoryError, BookRepositoryExportException, BookManagerError) as err:
+            print(err.message)
+            return 1
+        print(f"{removed} removed entries have been freed, {renumbered} books have been renumbered")
+        return 0
+
+    def make_patch(self, base_filename, output) -> int:
+        """
+        Записывает патч с изменениями хранилища относительно его прежнего снимка без запуска консоли.
+        :param base_filename: Файл снимка, относительно которого вычисляются изменения.
+        :param output: Файл патча.
+        :return: Код завершения приложения.
+        """
+        try:
+            if Path(self._repository_filename).exists():
+                self._book_manager.load_data(self._repository_filename)
+            summary = self._book_manager.make_patch(base_filename, output)
+        except (BookRepositoryError, BookRepositoryExportException, BookManagerError) as err:
+            print(err.message)
+            return 1
+        print("The patch has been written: {added} added, {changed} changed, {statuses} status changes, "
+              "{removed} removed".format(**summary))
+        return 0
+
+    def apply_patch(self, patch_filename) -> int:
+        """
+        Применяет патч к хранилищу без запуска консоли и сохраняет хранилище.
+        :param patch_filename: Файл патча.
+        :return: Код завершения приложения.
+        """
+        try:
+            if Path(self._repository_filename).exists():
+                self._book_manager.load_data(self._repository_filename)
+            summary = self._book_manager.apply_patch(patch_filename)
+        except (BookRepositoryError, BookRepositoryExportException, BookManagerError) as err:
+            print(err.message)
+            return 1
+        print("The patch has been applied: {added} added, {changed} changed, {statuses} status changes, "
+              "{removed} removed".format(**summary))
+        self._save_data()
+        return 0
 
     def _load_data(self):
         """ Загружает из файла данные в хранилище """
-        repository_file = Path(self.REPOSITORY_FILENAME)
+        repository_file = Path(self._repository_filename)
         # Данные будут загружены, если файл для загрузки есть.
         if repository_file.exists():
             try:
-                load_num = self._book_manager.load_data(self.REPOSITORY_FILENAME)
+                load_num = self._book_manager.load_data(self._repository_filename)
                 print_awaiting_message(f'{load_num} books have been uploaded')
             except (BookRepositoryError, BookRepositoryExportException) as err:
                 print("Probably not all books have been downloaded..")
@@ -42,7 +220,15 @@ class SimpleLibrary:
 
     def _save_data(self):
         """ Сохраняет данные из хранилища в файл. """
-        save_num = self._book_manager.save_data(self.REPOSITORY_FILENAME)
+        # Сохранение идёт в фоне, а пользователю показывается его ход.
+        background_save = self._book_manager.save_data_in_background(self._repository_filename)
+        while not background_save.wait(0.2):
+            print(f"\rSaving books... {background_save.progress:.0%}", end='')
+        print("\r", end='')
+        if background_save.error is not None:
+            print(f"The books could not be saved: {background_save.error}")
+            return
+        save_num = background_save.saved_books
         if save_num > 0:
             # Показывать сообщение, только если были данные для сохранения.
             print(f"{save_num} books have been saved")
@@ -50,9 +236,74 @@ class SimpleLibrary:
     def _quit_handler(self):
         """ Обработка выхода из приложения. """
         clear_display()
+        if self._checkpoint_scheduler is not None:
+            self._checkpoint_scheduler.stop()
         self._save_data()
+        if self._metrics_server is not None:
+            self._metrics_server.stop()
         input("Thank you for using our library. Good luck.")
 
 
+def main() -> int:
+    """ Разбирает аргументы командной строки и запускает приложение. """
+    parser = argparse.ArgumentParser(description="Simple library")
+    parser.add_argument('--partitioned', action='store_true',
+                        help="store the repository as a manifest with segment files")
+    parser.add_argument('--stats', action='store_true',
+                        help="collect call counts and latencies of the repository and manager operations")
+    parser.add_argument('--stats-file', help="collect statistics and save them as JSON to the file on exit")
+    parser.add_argument('--metrics-port', type=int,
+                        help="publish Prometheus metrics at http://127.0.0.1:PORT/metrics")
+    subparsers = parser.add_subparsers(dest='command')
+    import_parser = subparsers.add_parser('import-csv', help="import books from a CSV file")
+    import_parser.add_argument('filename', help="CSV file with the title, author and year columns")
+    import_parser.add_argument('--rejects', help="file for the rejected rows and their errors")
+    compact_parser = subparsers.add_parser('compact', help="remove deleted records and rewrite the repository")
+    compact_parser.add_argument('--renumber', action='store_true', help="renumber the books without gaps in ids")
+    compact_parser.add_argument('--mapping', help="CSV file for the old_id, new_id mapping table")
+    diff_parser = subparsers.add_parser('diff', help="write a patch with the changes since a repository snapshot")
+    diff_parser.add_argument('base', help="earlier snapshot of the repository")
+    diff_parser.add_argument('-o', '--output', required=True,
+                             help="patch file, compressed if it ends with .gz, .bz2 or .xz")
+    patch_parser = subparsers.add_parser('patch', help="apply a patch written by the diff command")
+    patch_parser.add_argument('filename', help="patch file")
+    batch_parser = subparsers.add_parser('batch', help="run console commands from a file without prompts")
+    batch_parser.add_argument('filename', nargs='?', help="file with one command per line, standard input by default")
+    batch_parser.add_argument('-o', '--output', help="file for the JSON results, standard output by default")
+    export_parser = subparsers.add_parser('export', help="export the catalog as NDJSON or CSV")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', dest='export_format')
+    export_parser.add_argument('-o', '--output', help="output file, standard output by default")
+    export_parser.add_argument('--status', choices=('available', 'given_out'))
+    export_parser.add_argument('--title', help="only books whose title contains the string")
+    export_parser.add_argument('--author', help="only books whose author contains the string")
+    export_parser.add_argument('--year-from', type=int)
+    export_parser.add_argument('--year-to', type=int)
+    args = parser.parse_args()
+
+    library = SimpleLibrary(args.partitioned, args.stats or args.stats_file is not None, args.metrics_port)
+    try:
+        match args.command:
+            case 'import-csv':
+                return library.import_csv(args.filename, args.rejects)
+            case 'compact':
+                return library.compact(args.renumber, args.mapping)
+            case 'diff':
+                return library.make_patch(args.base, args.output)
+            case 'patch':
+                return library.apply_patch(args.filename)
+            case 'batch':
+                return library.run_batch(args.filename, args.output)
+            case 'export':
+                status = BookStatus[args.status.upper()] if args.status else None
+                return library.export_catalog(args.export_format, args.output, status=status, title=args.title,
+                                              author=args.author, year_from=args.year_from, year_to=args.year_to)
+            case _:
+                library.run()
+                return 0
+    finally:
+        if args.stats_file is not None:
+            library.instrumentation.dump(args.stats_file)
+
+
 if __name__ == "__main__":
-    SimpleLibrary().run()
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Callable
+
+
+class BackgroundSave:
+    """
+    Сохранение снимка хранилища в фоновом потоке.
+    Снимок хранилища берётся до запуска сохранения, поэтому хранилище можно изменять во время сохранения,
+    а изменения попадут в следующее сохранение.
+    """
+    def __init__(self, write_snapshot: Callable[[Callable[[int], None]], int], total_books: int,
+                 previous: 'BackgroundSave | None' = None):
+        """
+        Конструктор класса.
+        :param write_snapshot: Функция записи снимка, которой передаётся функция учёта записанных книг.
+        :param total_books: Количество книг в снимке.
+        :param previous: Предыдущее фоновое сохранение, завершения которого надо дождаться перед записью.
+        """
+        self._write_snapshot = write_snapshot
+        self._previous = previous
+        self._total_books = total_books
+        self._saved_books = 0
+        self._error: Exception | None = None
+        self._started: float | None = None
+        self._duration: float | None = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='background-save', daemon=True)
+
+    def start(self) -> 'BackgroundSave':
+        """ Запускает сохранение. """
+        self._thread.start()
+        return self
+
+    @property
+    def total_books(self) -> int:
+        """ Количество книг в снимке. """
+        return self._total_books
+
+    @property
+    def saved_books(self) -> int:
+        """ Количество уже записанных книг. """
+        return self._saved_books
+
+    @property
+    def progress(self) -> float:
+        """ Доля записанных книг от 0 до 1. """
+        return self._saved_books / self._total_books if self._total_books > 0 else 1.0
+
+    @property
+    def duration(self) -> float | None:
+        """ Время записи снимка в секундах, или None, пока сохранение не завершено. """
+        return self._duration
+
+    @property
+    def done(self) -> bool:
+        """ Сохранение завершено. """
+        return self._done.is_set()
+
+    @property
+    def error(self) -> Exception | None:
+        """ Ошибка, возникшая при сохранении. """
+        return self._error
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Ожидает завершения сохранения.
+        :param timeout: Время ожидания в секундах, или None для ожидания без ограничения.
+        :return: Завершено ли сохранение.
+        """
+        return self._done.wait(timeout)
+
+    def _run(self):
+        """ Записывает снимок. """
+        try:
+            if self._previous is not None:
+                # Сохранения в один файл не должны перемешиваться.
+                self._previous.wait()
+                self._previous = None
+            self._started = time.perf_counter()
+            # Файл создаётся, только если хранилище не пустое.
+            if self._total_books > 0:
+                self._saved_books = self._write_snapshot(self._set_saved_books)
+        except Exception as err:
+            # Ошибка не должна теряться в потоке, иначе неудачное сохранение выглядело бы успешным.
+            self._error = err
+        finally:
+            # Вместе с функцией записи освобождается и копия снимка.
+            self._write_snapshot = None
+            if self._started is not None:
+                self._duration = time.perf_counter() - self._started
+            self._done.set()
+
+    def _set_saved_books(self, count: int):
+        """ Обновляет количество записанных книг. """
+        self._saved_books = count
@@ -0,0 +1,108 @@
+import itertools
+import random
+from datetime import datetime
+from typing import Iterator
+
+from book import Book
+
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+""" Размеры каталогов для замеров. """
+
+SEED = 20240101
+""" Начальное значение генератора случайных чисел по умолчанию. """
+
+NUMBER_OF_AUTHORS = 50_000
+""" Количество разных авторов в каталоге. """
+
+ZIPF_EXPONENT = 1.1
+""" Показатель распределения Ципфа для популярности авторов. """
+
+CYRILLIC_SHARE = 0.6
+""" Доля книг с названиями и авторами на кириллице. """
+
+_CYRILLIC_WORDS = ('война', 'мир', 'тихий', 'дон', 'мастер', 'сердце', 'собачье', 'белая', 'гвардия', 'тёмные',
+                   'аллеи', 'отцы', 'дети', 'мёртвые', 'души', 'горе', 'ума', 'герой', 'нашего', 'времени',
+                   'капитанская', 'дочка', 'вишнёвый', 'сад', 'золотой', 'телёнок', 'двенадцать', 'стульев',
+                   'сказки', 'повести', 'история', 'очерки', 'словарь', 'толковый', 'записки', 'письма', 'дневник',
+                   'северный', 'ветер', 'река', 'город', 'ночь', 'дорога', 'лес', 'море', 'песни', 'стихи')
+_LATIN_WORDS = ('the', 'old', 'man', 'sea', 'great', 'gatsby', 'brave', 'new', 'world', 'animal', 'farm',
+                'pride', 'prejudice', 'moby', 'dick', 'little', 'women', 'silent', 'spring', 'dark', 'matter',
+                'history', 'of', 'time', 'river', 'city', 'night', 'road', 'forest', 'letters', 'journal',
+                'stories', 'poems', 'guide', 'theory', 'practice', 'northern', 'wind', 'house', 'garden', 'light')
+_CYRILLIC_SURNAMES = ('Толстой', 'Шолохов', 'Булгаков', 'Бунин', 'Тургенев', 'Гоголь', 'Грибоедов', 'Лермонтов',
+                      'Пушкин', 'Чехов', 'Ильф', 'Петров', 'Даль', 'Достоевский', 'Пастернак', 'Набоков',
+                      'Горький', 'Куприн', 'Ахматова', 'Цветаева', 'Есенин', 'Блок', 'Паустовский', 'Платонов')
+_LATIN_SURNAMES = ('Hemingway', 'Fitzgerald', 'Huxley', 'Orwell', 'Austen', 'Melville', 'Alcott', 'Carson',
+                   'Pullman', 'Hawking', 'Twain', 'Dickens', 'Bronte', 'Woolf', 'Joyce', 'Steinbeck', 'Faulkner',
+                   'Tolkien', 'Christie', 'Wilde', 'Kafka', 'Mann', 'Hesse', 'Camus', 'Eco', 'Borges')
+_CYRILLIC_INITIALS = 'АБВГДЕИКЛМНОПРСТФЮЯ'
+_LATIN_INITIALS = 'ABCDEFGHIJKLMNOPRSTW'
+
+
+def _make_title(rng: random.Random, cyrillic: bool) -> str:
+    """ Составляет название книги из двух-пяти слов длиной не больше 50 символов. """
+    words = _CYRILLIC_WORDS if cyrillic else _LATIN_WORDS
+    title = ' '.join(rng.choice(words) for _ in range(rng.randint(2, 5)))
+    return title[:50].strip().capitalize()
+
+
+def _make_authors(rng: random.Random, number_of_authors: int) -> list[str]:
+    """ Составляет список авторов в виде инициалов и фамилии длиной не больше 25 символов. """
+    authors = []
+    for i in range(number_of_authors):
+        if rng.random() < CYRILLIC_SHARE:
+            initials, surnames = _CYRILLIC_INITIALS, _CYRILLIC_SURNAMES
+        else:
+            initials, surnames = _LATIN_INITIALS, _LATIN_SURNAMES
+        author = f"{rng.choice(initials)}.{rng.choice(initials)}. {rng.choice(surnames)}"
+        # Однофамильцы различаются номером, как тома одного автора.
+        if i >= len(surnames) * len(initials):
+            author = f"{author} {i}"
+        authors.append(author[:25])
+    return authors
+
+
+def _make_year(rng: random.Random, now_year: int) -> int:
+    """
+    Выбирает год издания.
+    Большая часть книг издана в последние десятилетия, часть является классикой, а немногие изданы до нашей эры.
+    """
+    kind = rng.random()
+    if kind < 0.8:
+        return min(now_year, int(rng.gauss(1995, 20)))
+    if kind < 0.99:
+        return rng.randint(1450, 1900)
+    return rng.randint(-800, -1)
+
+
+def generate_catalog(size: int, seed: int = SEED, number_of_authors: int = NUMBER_OF_AUTHORS) \
+        -> Iterator[tuple[str, str, int]]:
+    """
+    Детерминированно генерирует каталог книг.
+    Одинаковые размер и начальное значение всегда дают одинаковый каталог.
+    Названия и авторы бывают на кириллице и на латинице, популярность авторов распределена по закону Ципфа,
+    а годы издания смещены к современности.
+    :param size: Количество книг.
+    :param seed: Начальное значение генератора случайных чисел.
+    :param number_of_authors: Количество разных авторов.
+    :return: Генератор кортежей (название, автор, год издания).
+    """
+    rng = random.Random(seed)
+    authors = _make_authors(rng, number_of_authors)
+    cum_weights = list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, number_of_authors + 1)))
+    now_year = datetime.now().year
+    for _ in range(size):
+        author = rng.choices(authors, cum_weights=cum_weights)[0]
+        yield _make_title(rng, not author.isascii()), author, _make_year(rng, now_year)
+
+
+def generate_books(size: int, seed: int = SEED) -> Iterator[Book]:
+    """
+    Детерминированно генерирует книги каталога.
+    :param size: Количество книг.
+    :param seed: Начальное значение генератора случайных чисел.
+    :return: Генератор книг без идентификаторов.
+    """
+    for title, author, year in generate_catalog(size, seed):
+        yield Book.from_validated(title, author, year)
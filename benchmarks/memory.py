@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from benchmarks.catalog import SEED, SIZES, generate_books
+from book_repository import BookRepository
+from memory_profiler import memory_report, traced_allocations
+from repository_export import BookRepositoryExport
+
+
+TOLERANCE = 0.1
+""" Допустимый рост памяти на одну книгу относительно базовых результатов, 0.1 означает 10%. """
+
+
+def run_size(size: int, seed: int = SEED) -> dict[str, Any]:
+    """
+    Замеряет память хранилища с каталогом заданного размера.
+    Память, выделенная при заполнении хранилища, замеряется tracemalloc, а составляющие оцениваются по структурам.
+    :param size: Количество книг.
+    :param seed: Начальное значение генератора каталога.
+    :return: Результат замера.
+    """
+    book_repository = BookRepository()
+    book_repository.set_repository_export(BookRepositoryExport(book_repository))
+    _, traced_bytes, peak_bytes = traced_allocations(lambda: book_repository.add_books(generate_books(size, seed)))
+    report = memory_report(book_repository)
+    return {
+        'size': size,
+        'traced_bytes': traced_bytes,
+        'peak_bytes': peak_bytes,
+        'traced_bytes_per_book': traced_bytes / size,
+        'estimated_bytes': report['total_bytes'],
+        'estimated_bytes_per_book': report['bytes_per_book'],
+        'components': report['components'],
+    }
+
+
+def main() -> int:
+    """ Замеряет рост памяти по размерам каталога и сравнивает объём на одну книгу с базовыми результатами. """
+    parser = argparse.ArgumentParser(description="Book repository memory benchmark")
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=['10k', '100k'])
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('-o', '--output', help="file for the results, standard output by default")
+    parser.add_argument('--baseline', help="file with the baseline results to compare with")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = []
+    for size_name in args.sizes:
+        result = run_size(SIZES[size_name], args.seed)
+        if results:
+            # Рост памяти относительно предыдущего размера каталога.
+            previous = results[-1]
+            result['growth'] = result['traced_bytes'] / previous['traced_bytes'] if previous['traced_bytes'] else None
+        results.append(result)
+    report = json.dumps({'results': results}, indent=2)
+    if args.output is None:
+        print(report)
+    else:
+        Path(args.output).write_text(report, encoding='utf-8')
+
+    if args.baseline is None:
+        return 0
+    baseline = {result['size']: result for result in json.loads(Path(args.baseline).read_text('utf-8'))['results']}
+    regression = False
+    for result in results:
+        base = baseline.get(result['size'])
+        if base is None:
+            continue
+        ratio = result['estimated_bytes_per_book'] / base['estimated_bytes_per_book']
+        regression |= ratio > 1 + args.tolerance
+        print(f"{result['size']:>10} {result['estimated_bytes_per_book']:10.1f} bytes/book {ratio:6.2f}x",
+              file=sys.stderr)
+    return 1 if regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.catalog import SEED, SIZES, generate_books, generate_catalog
+from book_manager import BookManager
+from book_repository import BookRepository
+from enums import BookStatus, SearchCriteria
+from repository_export import BookRepositoryExport
+
+
+SAMPLES = 1000
+""" Количество одиночных операций добавления, удаления и изменения статуса в одном замере. """
+
+SEARCHES = 5
+""" Количество поисковых запросов по каждому критерию. """
+
+TOLERANCE = 0.2
+""" Допустимое замедление относительно базовых результатов, 0.2 означает 20%. """
+
+
+def _timed(operation: str, size: int, count: int, func: Callable[[], Any]) -> dict[str, Any]:
+    """ Выполняет функцию и возвращает результат замера. """
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    return {'size': size, 'operation': operation, 'count': count, 'seconds': seconds,
+            'seconds_per_op': seconds / count if count else 0.0}
+
+
+def _create_manager() -> tuple[BookRepository, BookManager]:
+    """ Создаёт хранилище и менеджер, как это делает приложение. """
+    book_repository = BookRepository()
+    book_repository.set_repository_export(BookRepositoryExport(book_repository))
+    return book_repository, BookManager(book_repository)
+
+
+def run_size(size: int, seed: int = SEED, samples: int = SAMPLES) -> list[dict[str, Any]]:
+    """
+    Замеряет операции хранилища на каталоге заданного размера.
+    :param size: Количество книг в каталоге.
+    :param seed: Начальное значение генератора каталога и выборки запросов.
+    :param samples: Количество одиночных операций в замере.
+    :return: Список результатов замеров.
+    """
+    rng = random.Random(seed)
+    book_repository, book_manager = _create_manager()
+    results = [_timed('add_books', size, size, lambda: book_repository.add_books(generate_books(size, seed)))]
+
+    extra_books = list(generate_catalog(samples, seed + 1))
+    results.append(_timed('add_book', size, samples,
+                          lambda: [book_manager.add_book(*book) for book in extra_books]))
+
+    ids = rng.sample(range(1, size + 1), min(samples, size))
+    results.append(_timed('change_status', size, len(ids),
+                          lambda: [book_manager.changing_status_book(_id, BookStatus.GIVEN_OUT) for _id in ids]))
+
+    books = [book_repository.get_book_by_id(_id) for _id in rng.sample(range(1, size + 1), SEARCHES)]
+    queries = {
+        SearchCriteria.SEARCH_TITLE: [book.title.split()[0] for book in books],
+        SearchCriteria.SEARCH_AUTHOR: [book.author for book in books],
+        SearchCriteria.SEARCH_YEAR: [book.year for book in books],
+    }
+    for criteria, values in queries.items():
+        results.append(_timed(criteria.name.lower(), size, len(values),
+                              lambda: [book_manager.find_book(criteria, value) for value in values]))
+
+    repository_export = BookRepositoryExport(book_repository)
+    results.append(_timed('import_data', size, 1, repository_export.import_data))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = Path(tmpdir, 'books.json')
+        results.append(_timed('save', size, 1, lambda: book_manager.save_data(filename)))
+        _, load_manager = _create_manager()
+        results.append(_timed('load', size, 1, lambda: load_manager.load_data(filename)))
+
+    results.append(_timed('remove', size, len(ids), lambda: [book_manager.remove_book(_id) for _id in ids]))
+    return results
+
+
+def compare(results: list[dict[str, Any]], baseline: list[dict[str, Any]], tolerance: float = TOLERANCE) \
+        -> list[dict[str, Any]]:
+    """
+    Сравнивает результаты с базовыми по времени одной операции.
+    :param results: Текущие результаты.
+    :param baseline: Базовые результаты.
+    :param tolerance: Допустимое замедление.
+    :return: Список сравнений с полями size, operation, baseline, current, ratio и regression.
+    """
+    baseline_index = {(result['size'], result['operation']): result for result in baseline}
+    comparisons = []
+    for result in results:
+        base = baseline_index.get((result['size'], result['operation']))
+        if base is None or base['seconds_per_op'] == 0:
+            continue
+        ratio = result['seconds_per_op'] / base['seconds_per_op']
+        comparisons.append({'size': result['size'], 'operation': result['operation'],
+                            'baseline': base['seconds_per_op'], 'current': result['seconds_per_op'],
+                            'ratio': ratio, 'regression': ratio > 1 + tolerance})
+    return comparisons
+
+
+def main() -> int:
+    """ Запускает замеры, сохраняет результаты в JSON и сравнивает их с базовыми. """
+    parser = argparse.ArgumentParser(description="Book repository benchmark")
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=['10k', '100k'])
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--samples', type=int, default=SAMPLES)
+    parser.add_argument('-o', '--output', help="file for the results, standard output by default")
+    parser.add_argument('--baseline', help="file with the baseline results to compare with")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = []
+    for size_name in args.sizes:
+        results.extend(run_size(SIZES[size_name], args.seed, args.samples))
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'seed': args.seed,
+                 'created': datetime.now().isoformat(timespec='seconds')},
+        'results': results,
+    }
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    if args.baseline is None:
+        return 0
+    baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))['results']
+    comparisons = compare(results, baseline, args.tolerance)
+    for comparison in comparisons:
+        mark = 'REGRESSION' if comparison['regression'] else 'ok'
+        print(f"{comparison['size']:>10} {comparison['operation']:<16} {comparison['ratio']:6.2f}x  {mark}",
+              file=sys.stderr)
+    return 1 if any(comparison['regression'] for comparison in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
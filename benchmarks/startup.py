@@ -0,0 +1,61 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+""" Корневой каталог приложения. """
+
+STARTUP_BUDGET_MS = 250.0
+""" Допустимое время импорта приложения в миллисекундах. """
+
+DEFERRED_MODULES = ('multiprocessing', 'concurrent.futures', 'csv', 'gzip', 'bz2', 'lzma', 'logging.handlers',
+                    'platform', 'library_console', 'checkpoint', 'partitioned_book_repository', 'csv_import',
+                    'catalog_export')
+""" Модули, которые не должны загружаться при запуске приложения. """
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure_import_time(module: str = 'app') -> dict[str, tuple[int, int]]:
+    """
+    Замеряет время импорта модуля в отдельном интерпретаторе с помощью -X importtime.
+    :param module: Импортируемый модуль.
+    :return: Словарь {модуль: (собственное время, время вместе с вложенными импортами)} в микросекундах.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT_PATH,
+                            env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is not None:
+            self_us, cumulative_us, _, name = match.groups()
+            times[name] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main() -> int:
+    """ Выводит самые долгие импорты приложения и сравнивает время запуска с допустимым. """
+    parser = argparse.ArgumentParser(description="Startup import time benchmark")
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--top', type=int, default=15, help="number of the slowest imports to show")
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    times = measure_import_time(args.module)
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda item: item[1][1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:10.2f} ms {self_us / 1000:10.2f} ms  {name}")
+    total_ms = times[args.module][1] / 1000
+    deferred = [name for name in DEFERRED_MODULES if name in times]
+    print(f"import {args.module}: {total_ms:.2f} ms, budget {args.budget_ms:.2f} ms")
+    if deferred:
+        print(f"modules that should be imported lazily: {', '.join(deferred)}")
+    return 0 if total_ms <= args.budget_ms and not deferred else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
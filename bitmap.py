@@ -0,0 +1,126 @@
+from typing import Iterable, Iterator
+
+
+class Bitmap:
+    """
+    Битовая карта, в которой бит с номером i соответствует идентификатору i.
+    Установка и сброс бита выполняются за O(1), подсчёт установленных битов и побитовые операции
+    над картами выполняются над всем массивом байт сразу.
+    Карта растёт при установке бита за её пределами, а биты за пределами карты считаются сброшенными.
+    """
+    __slots__ = ('_bits',)
+
+    def __init__(self, size: int = 0):
+        """
+        Конструктор класса.
+        :param size: Начальное количество битов.
+        """
+        self._bits = bytearray((size + 7) // 8)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray) -> 'Bitmap':
+        """ Создаёт карту по массиву байт, младший бит первого байта соответствует номеру 0. """
+        bitmap = cls()
+        bitmap._bits = bytearray(data)
+        return bitmap
+
+    @classmethod
+    def from_indexes(cls, indexes: Iterable[int]) -> 'Bitmap':
+        """ Создаёт карту, в которой установлены биты с указанными номерами. """
+        bitmap = cls()
+        for index in indexes:
+            bitmap.set(index)
+        return bitmap
+
+    def __len__(self) -> int:
+        """ Количество битов в карте. """
+        return len(self._bits) * 8
+
+    def __getitem__(self, index: int) -> bool:
+        byte_index = index >> 3
+        return byte_index < len(self._bits) and bool(self._bits[byte_index] >> (index & 7) & 1)
+
+    def __setitem__(self, index: int, value: bool):
+        if value:
+            self.set(index)
+        else:
+            self.clear(index)
+
+    def __iter__(self) -> Iterator[int]:
+        """ Обходит номера установленных битов. """
+        return self.iter_set()
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Bitmap):
+            return NotImplemented
+        return self._to_int() == other._to_int()
+
+    def set(self, index: int):
+        """ Устанавливает бит. """
+        byte_index = index >> 3
+        if byte_index >= len(self._bits):
+            # Карта растёт вдвое, чтобы последовательное добавление идентификаторов не копировало её каждый раз.
+            self._bits.extend(bytes(max(byte_index + 1, len(self._bits) * 2) - len(self._bits)))
+        self._bits[byte_index] |= 1 << (index & 7)
+
+    def clear(self, index: int):
+        """ Сбрасывает бит. """
+        byte_index = index >> 3
+        if byte_index < len(self._bits):
+            self._bits[byte_index] &= ~(1 << (index & 7)) & 0xFF
+
+    def count(self) -> int:
+        """ Количество установленных битов. """
+        return self._to_int().bit_count()
+
+    def iter_set(self) -> Iterator[int]:
+        """ Обходит номера установленных битов по возрастанию, нулевые байты пропускаются целиком. """
+        for byte_index, byte in enumerate(self._bits):
+            base = byte_index << 3
+            while byte:
+                lowest = byte & -byte
+                yield base + lowest.bit_length() - 1
+                byte ^= lowest
+
+    def iter_clear(self, stop: int | None = None) -> Iterator[int]:
+        """
+        Обходит номера сброшенных битов по возрастанию.
+        :param stop: Номер, до которого обходятся биты, по умолчанию до конца карты.
+        """
+        stop = len(self) if stop is None else stop
+        for index in range(stop):
+            if not self[index]:
+                yield index
+
+    def copy(self) -> 'Bitmap':
+        """ Возвращает копию карты. """
+        return Bitmap.from_bytes(self._bits)
+
+    def to_bytes(self) -> bytes:
+        """ Возвращает массив байт карты. """
+        return bytes(self._bits)
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        return self._combine(self._to_int() & other._to_int(), other)
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        return self._combine(self._to_int() | other._to_int(), other)
+
+    def __xor__(self, other: 'Bitmap') -> 'Bitmap':
+        return self._combine(self._to_int() ^ other._to_int(), other)
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        """ Биты, установленные в этой карте и сброшенные в другой. """
+        return self._combine(self._to_int() & ~other._to_int(), other)
+
+    def __invert__(self) -> 'Bitmap':
+        """ Инвертирует все биты в пределах карты. """
+        return Bitmap.from_bytes(bytes(byte ^ 0xFF for byte in self._bits))
+
+    def _to_int(self) -> int:
+        """ Представляет карту целым числом, чтобы побитовые операции выполнялись над всей картой сразу. """
+        return int.from_bytes(self._bits, 'little')
+
+    def _combine(self, value: int, other: 'Bitmap') -> 'Bitmap':
+        """ Создаёт карту из результата побитовой операции, размер карты берётся по большей из карт. """
+        return Bitmap.from_bytes(value.to_bytes(max(len(self._bits), len(other._bits)), 'little'))
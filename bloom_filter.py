@@ -0,0 +1,97 @@
+import math
+from typing import Iterable
+
+from bitmap import Bitmap
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для идентификаторов книг.
+    Отрицательный ответ фильтра точный: если идентификатора в фильтре нет, то книги с ним точно нет.
+    Положительный ответ может быть ложным с вероятностью, которая задаётся при создании фильтра.
+    Идентификаторы из фильтра не удаляются, поэтому после удаления книг фильтр пересоздаётся при уплотнении.
+    """
+    __slots__ = ('_bits', '_size', '_hashes', '_capacity', '_count')
+
+    MIN_CAPACITY = 1024
+    _MASK = (1 << 64) - 1
+
+    def __init__(self, capacity: int, error_rate: float = 0.01, max_bytes: int | None = None):
+        """
+        Конструктор класса.
+        :param capacity: Количество идентификаторов, на которое рассчитан фильтр.
+        :param error_rate: Допустимая вероятность ложноположительного ответа.
+        :param max_bytes: Ограничение памяти битового массива, при нём вероятность ошибки может быть выше заданной.
+        """
+        self._capacity = max(capacity, 1)
+        size = math.ceil(-self._capacity * math.log(error_rate) / math.log(2) ** 2)
+        if max_bytes is not None:
+            size = min(size, max_bytes * 8)
+        self._size = max(size, 8)
+        self._hashes = max(1, round(self._size / self._capacity * math.log(2)))
+        self._bits = Bitmap(self._size)
+        self._count = 0
+
+    @classmethod
+    def from_ids(cls, ids: Iterable[int], error_rate: float = 0.01, max_bytes: int | None = None) -> 'BloomFilter':
+        """
+        Создаёт фильтр по идентификаторам с двукратным запасом ёмкости для добавляемых книг.
+        :param ids: Идентификаторы, которые помещаются в фильтр.
+        :param error_rate: Допустимая вероятность ложноположительного ответа.
+        :param max_bytes: Ограничение памяти битового массива.
+        """
+        ids = list(ids)
+        bloom_filter = cls(max(2 * len(ids), cls.MIN_CAPACITY), error_rate, max_bytes)
+        for _id in ids:
+            bloom_filter.add(_id)
+        return bloom_filter
+
+    def __len__(self) -> int:
+        """ Количество добавленных идентификаторов. """
+        return self._count
+
+    def __contains__(self, _id: int) -> bool:
+        return all(self._bits[position] for position in self._positions(_id))
+
+    @property
+    def capacity(self) -> int:
+        """ Количество идентификаторов, на которое рассчитан фильтр. """
+        return self._capacity
+
+    @property
+    def is_full(self) -> bool:
+        """ Добавлено больше идентификаторов, чем рассчитан фильтр. """
+        return self._count > self._capacity
+
+    @property
+    def memory_bytes(self) -> int:
+        """ Размер битового массива фильтра в байтах. """
+        return len(self._bits) // 8
+
+    @property
+    def error_rate(self) -> float:
+        """ Ожидаемая вероятность ложноположительного ответа при текущем количестве идентификаторов. """
+        return (1 - math.exp(-self._hashes * self._count / self._size)) ** self._hashes
+
+    def add(self, _id: int):
+        """ Добавляет идентификатор в фильтр. """
+        for position in self._positions(_id):
+            self._bits.set(position)
+        self._count += 1
+
+    def _positions(self, _id: int) -> Iterable[int]:
+        """
+        Номера битов идентификатора.
+        Вместо нескольких независимых хеш-функций используется двойное хеширование: i-й бит равен h1 + i * h2.
+        """
+        h1 = self._mix(_id)
+        h2 = self._mix(h1) | 1
+        return ((h1 + i * h2) % self._size for i in range(self._hashes))
+
+    @classmethod
+    def _mix(cls, value: int) -> int:
+        """ Перемешивает биты числа (финализатор splitmix64), чтобы соседние идентификаторы попадали в разные биты. """
+        value = (value + 0x9E3779B97F4A7C15) & cls._MASK
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & cls._MASK
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & cls._MASK
+        return value ^ (value >> 31)
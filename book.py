@@ -1,5 +1,4 @@
 import json
-from dataclasses import dataclass
 
 from enums import BookStatus
 from validation import validation_id, validation_year, validation_status, validation_title, validation_author
@@ -20,6 +19,22 @@ class Book:
         self._author = validation_author(author)
         self._year = validation_year(year)
 
+    @classmethod
+    def from_validated(cls, title: str, author: str, year: int) -> 'Book':
+        """
+        Создаёт книгу из значений, которые уже проверены, например функцией validation_columns.
+        Значения повторно не проверяются.
+        :param title: Название книги.
+        :param author: Автор.
+        :param year: Год издания.
+        """
+        book = cls.__new__(cls)
+        book._id = 0
+        book._title = title
+        book._author = author
+        book._year = year
+        return book
+
     @property
     def id(self) -> int:
         """ Идентификатор книги. """
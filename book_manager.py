@@ -1,4 +1,7 @@
+from typing import Any, Iterator, TextIO
+
 from abstract_class import AbstractBookRepository
+from background_save import BackgroundSave
 from book import Book, BookStatus
 from enums import SearchCriteria
 from exceptions import BookManagerError, BookRepositoryError, ValidationError
@@ -28,6 +31,113 @@ class BookManager:
         """
         return self._book_repository.save(filename)
 
+    def save_data_in_background(self, filename) -> BackgroundSave:
+        """
+        Сохраняет данные из хранилища в файл в фоновом потоке.
+        Файл создаётся, только если хранилище не пустое.
+        :param filename: Наименование файла для сохранения.
+        :return: Запущенное фоновое сохранение, по которому можно следить за ходом и завершением сохранения.
+        """
+        return self._book_repository.save_in_background(filename)
+
+    def import_csv(self, filename, reject_filename=None, max_workers: int | None = None) -> tuple[int, int]:
+        """
+        Импортирует книги из CSV-файла с колонками title, author и year.
+        Строки проверяются параллельно, а корректные книги добавляются в хранилище пачками.
+        :param filename: CSV-файл для импорта.
+        :param reject_filename: Файл, куда записываются отклонённые строки с описанием ошибок.
+        :param max_workers: Количество процессов для проверки строк.
+        :return: Кортеж (количество импортированных книг, количество отклонённых строк).
+        :raises BookManagerError: Файл не найден или в нём нет обязательных колонок.
+        """
+        from csv_import import CsvBookImporter
+
+        return CsvBookImporter(self._book_repository, max_workers=max_workers).import_csv(filename, reject_filename)
+
+    def export_catalog(self, f: TextIO, export_format: str, **filters) -> int:
+        """
+        Потоково выгружает каталог в формате NDJSON или CSV.
+        :param f: Файл, открытый на запись в текстовом режиме.
+        :param export_format: Формат выгрузки 'ndjson' или 'csv'.
+        :param filters: Фильтры status, title, author, year_from и year_to.
+        :return: Количество выгруженных книг.
+        :raises BookManagerError: Неизвестный формат выгрузки.
+        """
+        from catalog_export import CatalogExporter
+
+        return CatalogExporter(self._book_repository).export(f, export_format, **filters)
+
+    def iter_catalog(self, **filters) -> Iterator[dict[str, Any]]:
+        """
+        Обходит книги каталога в виде словарей, как в выгрузке NDJSON.
+        :param filters: Фильтры status, title, author, year_from и year_to.
+        :return: Генератор словарей с идентификатором, данными и статусом книги.
+        """
+        from catalog_export import CatalogExporter
+
+        return CatalogExporter(self._book_repository).iter_rows(**filters)
+
+    def compact(self, filename=None, renumber: bool = False, mapping_filename=None) -> tuple[int, int]:
+        """
+        Уплотняет хранилище и переписывает снимок без удалённых книг.
+        :param filename: Файл снимка, который переписывается после уплотнения, или None.
+        :param renumber: Перенумеровать книги, убрав пропуски в идентификаторах.
+        :param mapping_filename: CSV-файл, куда записывается таблица перенумерации old_id, new_id, или None.
+        :return: Кортеж (количество освобождённых записей, количество перенумерованных книг).
+        :raises BookManagerError: Перенумерация не поддерживается хранилищем.
+        """
+        try:
+            removed, id_mapping = self._book_repository.compact(renumber)
+        except BookRepositoryError as err:
+            raise BookManagerError(err.message)
+        if mapping_filename is not None:
+            import csv
+
+            with open(mapping_filename, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(('old_id', 'new_id'))
+                writer.writerows(id_mapping.items())
+        if filename is not None:
+            self._book_repository.save(filename)
+        return removed, len(id_mapping)
+
+    def make_patch(self, base_filename, patch_filename) -> dict[str, int]:
+        """
+        Записывает патч с изменениями хранилища относительно его прежнего снимка.
+        :param base_filename: Файл снимка, относительно которого вычисляются изменения.
+        :param patch_filename: Файл патча.
+        :return: Количество операций каждого вида.
+        :raises BookRepositoryError:
+        :raises BookRepositoryExportException:
+        """
+        from delta_sync import Changeset
+
+        changeset = Changeset.compute_from_snapshot(base_filename, self._book_repository)
+        changeset.write(patch_filename)
+        return changeset.summary
+
+    def apply_patch(self, patch_filename) -> dict[str, int]:
+        """
+        Применяет к хранилищу патч, записанный методом make_patch.
+        :param patch_filename: Файл патча.
+        :return: Количество операций каждого вида.
+        :raises BookManagerError: Патч повреждён или сделан для другого состояния хранилища.
+        """
+        from delta_sync import Changeset
+
+        changeset = Changeset.read(patch_filename)
+        changeset.apply(self._book_repository)
+        return changeset.summary
+
+    def memory_report(self) -> dict:
+        """
+        Оценивает объём памяти, который занимает содержимое хранилища.
+        :return: Словарь с составляющими в байтах, общим объёмом, количеством книг и объёмом на одну книгу.
+        """
+        from memory_profiler import memory_report
+
+        return memory_report(self._book_repository)
+
     def add_book(self, title: str, author: str, year: int) -> int:
         """
         Добавляет книгу в библиотеку.
@@ -66,11 +176,11 @@ class BookManager:
                                      Книга с указанным идентификатором отсутствует.
         """
         try:
-            book = self._book_repository.get_book_by_id(_id)
-            if book is None:
+            book_with_status = self._book_repository.get_book_with_status(_id)
+            if book_with_status is None:
                 return None
             else:
-                return f"{book}, status {self.get_status_book(book.id).to_str()}"
+                return self._book_list_to_str((book_with_status,))
         except BookRepositoryError as err:
             raise BookManagerError(err.message)
 
@@ -83,28 +193,32 @@ class BookManager:
         :raises BookManagerError: Ошибка при указании года выпуска книги;
                                      Указан неверный критерий поиска.
         """
-        match search_criteria:
-            case SearchCriteria.SEARCH_TITLE:
-                books = self._book_repository.find_book_by_title(search_val)
-            case SearchCriteria.SEARCH_AUTHOR:
-                books = self._book_repository.find_book_by_author(search_val)
-            case SearchCriteria.SEARCH_YEAR:
-                try:
-                    books = self._book_repository.find_book_by_year(search_val)
-                except BookRepositoryError as err:
-                    raise BookManagerError(err.args[0])
-            case _:
-                raise BookManagerError("Invalid search criteria specified")
+        books = self.find_books(search_criteria, search_val)
         count_books = len(books)
         return (count_books, self._book_list_to_str(books)) if len(books) > 0 \
             else (0, "Nothing was found for your query")
 
+    def find_books(self, search_criteria: SearchCriteria, search_val: str | int) \
+            -> tuple[tuple[Book, BookStatus], ...]:
+        """
+        Поиск книг вместе с их статусами.
+        :param search_criteria: Критерий поиска.
+        :param search_val: Значение поиска.
+        :return: Кортеж пар (книга, статус).
+        :raises BookManagerError: Ошибка при указании года выпуска книги;
+                                     Указан неверный критерий поиска.
+        """
+        try:
+            return self._book_repository.find_books_with_status(search_criteria, search_val)
+        except BookRepositoryError as err:
+            raise BookManagerError(err.args[0])
+
     def get_all_books(self) -> tuple[int, str]:
         """
         Возвращает общее кол-во книг и список всех книг из хранилища.
         :return: Кортеж в формате (Общее кол-во книг, строковый список всех книг).
         """
-        books = self._book_repository.all_books
+        books = tuple(self._book_repository.iter_books_with_status())
         count_books = len(books)
         return (count_books, self._book_list_to_str(books)) if len(books) > 0 \
             else (0, "There are no books to display in the storage")
@@ -139,6 +253,6 @@ class BookManager:
             raise BookManagerError(err.message)
 
     # noinspection PyMethodMayBeStatic
-    def _book_list_to_str(self, book_list: tuple[Book, ...]):
-        """ Преобразует список книг в строку """
-        return "\n".join(f"{book}, status {self.get_status_book(book.id).to_str()}" for book in book_list)
+    def _book_list_to_str(self, book_list: tuple[tuple[Book, BookStatus], ...]):
+        """ Преобразует список пар (книга, статус) в строку, статус уже получен вместе с книгой. """
+        return "\n".join(f"{book}, status {status.to_str()}" for book, status in book_list)
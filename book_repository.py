@@ -1,24 +1,133 @@
 import logging
+import os
 from copy import copy
 from pathlib import Path
 import json
-from typing import Any
+from typing import Any, Iterable, Iterator
 
 from abstract_class import AbstractBookRepository, AbstractBookRepositoryExport
+from bitmap import Bitmap
 # from app import LOGGER_FILENAME
 from book import Book, BookStatus
+from enums import ChangeKind, SearchCriteria
 from exceptions import BookRepositoryError, ValidationError, BookRepositoryExportException
-from helper import Logger
+from helper import Logger, log_timing
+from record_store import BookRecord, BookRecordStore
+from repository_export import BookRepositoryExport
+from repository_view import RepositoryView
+from snapshot_io import open_snapshot, SnapshotReader, detect_compression, is_line_delimited, split_lines
 # from helper import get_logger
 from validation import validation_year, validation_id, validation_status
 
 
-logger = Logger.get_logger('book_repository', logging.DEBUG)
+logger = Logger.get_logger('book_repository', Logger.get_level(logging.INFO))
+
+
+def _load_line_chunk(filename: Path, start: int, end: int) \
+        -> tuple[BookRecordStore, int, int, tuple[int, str] | None]:
+    """
+    Разбирает часть построчного снимка в диапазоне байт.
+    Выполняется в отдельном процессе.
+    :param filename: Файл снимка.
+    :param start: Начало части, всегда на границе строки.
+    :param end: Конец части, всегда на границе строки.
+    :return: Кортеж (записи книг, последний идентификатор, количество строк части,
+        ошибка в виде (номер строки внутри части, причина) или None).
+    """
+    records = BookRecordStore()
+    last_id = 0
+    line_num = 0
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        lines = f.read(end - start).decode('utf-8').split('\n')
+        # Часть заканчивается переводом строки, поэтому последний элемент пустой.
+        if lines[-1] == '':
+            lines.pop()
+        for line in lines:
+            line_num += 1
+            if line.strip() == '':
+                continue
+            try:
+                _id = BookRepositoryExport.export_line(line, records)
+            except BookRepositoryExportException as err:
+                return BookRecordStore(), 0, line_num, (line_num, err.message)
+            last_id = max(last_id, _id)
+    return records, last_id, line_num, None
 
 
 class BookRepository(AbstractBookRepository):
     """ Хранилище книг. """
+    PARALLEL_LOAD_MIN_SIZE = 16 * 1024 * 1024
+    """ Размер построчного снимка в байтах, начиная с которого он разбирается параллельно. """
+    COMPACTION_THRESHOLD = 0.25
+    """ Доля удалённых записей, при которой хранилище уплотняется автоматически. """
+    COMPACTION_MIN_ENTRIES = 1000
+    """ Минимальное количество удалённых записей для автоматического уплотнения. """
+
+    def __init__(self):
+        super().__init__()
+        self._compaction_threshold: float | None = self.COMPACTION_THRESHOLD
+        self._dead_entries = 0
+        """ Количество записей, удалённых с последнего пересоздания словаря записей. """
+
+    def set_compaction_threshold(self, compaction_threshold: float | None):
+        """
+        Устанавливает порог автоматического уплотнения хранилища.
+        :param compaction_threshold: Доля удалённых записей от всех записей, включая удалённые, или None,
+            чтобы отключить автоматическое уплотнение.
+        """
+        self._compaction_threshold = compaction_threshold
+
+    @property
+    def dead_entries(self) -> int:
+        """
+        Количество записей, удалённых с последнего уплотнения.
+        Словарь при удалении ключей не уменьшается, поэтому место удалённых записей остаётся занятым.
+        """
+        return self._dead_entries
+
+    def compact(self, renumber: bool = False) -> tuple[int, dict[int, int]]:
+        """
+        Уплотняет хранилище: пересоздаёт словарь записей без места удалённых книг
+        и при необходимости перенумеровывает книги.
+        При перенумерации книги получают идентификаторы подряд с единицы в прежнем порядке.
+        Книги с новыми идентификаторами заменяются копиями, поэтому уже взятые снимки хранилища не меняются.
+        :param renumber: Перенумеровать книги, убрав пропуски в идентификаторах.
+        :return: Кортеж (количество освобождённых записей, таблица {старый идентификатор: новый идентификатор}
+            для книг, идентификатор которых изменился).
+        """
+        removed = self._dead_entries
+        self._dead_entries = 0
+        id_mapping: dict[int, int] = {}
+        if not renumber:
+            self._records.rebuild()
+            return removed, id_mapping
+
+        records = BookRecordStore()
+        for new_id, old_id in enumerate(sorted(self._records), start=1):
+            book, status = self._records[old_id]
+            if new_id != old_id:
+                book = copy(book)
+                book.set_id(new_id)
+                id_mapping[old_id] = new_id
+            records.put(book, status)
+        self._records = records
+        self._last_id = len(records)
+        if id_mapping:
+            self._version += 1
+            self._publish(ChangeKind.RESET)
+        return removed, id_mapping
 
+    def _compact_if_needed(self):
+        """ Уплотняет хранилище, если удалённых записей стало больше порога. """
+        if self._compaction_threshold is None:
+            return
+        dead_entries = self._dead_entries
+        if dead_entries >= self.COMPACTION_MIN_ENTRIES \
+                and dead_entries >= self._compaction_threshold * (len(self._records) + dead_entries):
+            self.compact()
+
+    @log_timing(logger, 'save')
     def save(self, filename) -> int:
         """
         Сохраняет книги в файл.
@@ -29,12 +138,9 @@ class BookRepository(AbstractBookRepository):
         # Сохранять книги надо только, если хранилище не пустое.
         if self.number_of_books == 0:
             return 0
-        filename = Path(filename)
-        with open(filename, 'w') as f:
-            json.dump(self._repository_export.import_data(), f)
-            # json.dump(self._import(), f)
-        return self.number_of_books
+        return self._write_snapshot(filename, self._records.view())
 
+    @log_timing(logger, 'load')
     def load(self, filename) -> int:
         """
         Загружает книги из файла.
@@ -46,20 +152,126 @@ class BookRepository(AbstractBookRepository):
         filename = Path(filename)
         if not filename.exists():
             raise BookRepositoryError(f"The file '{filename}' with the saved books was not found")
-        with open(filename, 'r') as f:
-            self._last_id = self._repository_export.export_data(json.load(f), (self._books, self._books_status))
-            # self._export(json.load(f))
+        # Загрузка с ошибкой тоже меняет хранилище, поэтому подписчики получают сброс в любом случае.
+        try:
+            if is_line_delimited(filename) and detect_compression(filename, 'r') is None \
+                    and filename.stat().st_size >= self.PARALLEL_LOAD_MIN_SIZE:
+                self._load_lines_in_parallel(filename)
+            else:
+                # Снимок читается и при необходимости распаковывается потоково.
+                with open_snapshot(filename, 'r') as f:
+                    if is_line_delimited(filename):
+                        self._last_id = self._repository_export.export_lines(f, self._records)
+                    else:
+                        self._last_id = self._repository_export.export_data(SnapshotReader(f).read(),
+                                                                            self._records)
+                    # self._export(json.load(f))
+            self._version += 1
+        finally:
+            self._publish(ChangeKind.RESET)
         return self.number_of_books
 
+    def _load_lines_in_parallel(self, filename: Path):
+        """
+        Загружает построчный снимок, разбирая его части параллельно в нескольких процессах.
+        Файл делится на части по границам строк, поэтому каждая часть разбирается независимо.
+        :raises BookRepositoryExportException: Ошибка при экспорте данных с указанием номера строки.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        max_workers = os.cpu_count() or 1
+        chunks = split_lines(filename, max_workers * 4)
+        with ProcessPoolExecutor(min(max_workers, len(chunks))) as executor:
+            results = list(executor.map(_load_line_chunk, *zip(*((filename, start, end) for start, end in chunks))))
+        # Номер строки с ошибкой считается от начала файла по количеству строк в предыдущих частях.
+        first_line = 0
+        for records, last_id, line_count, error in results:
+            if error is not None:
+                self._records.clear()
+                line_num, message = error
+                raise BookRepositoryExportException(f"Error when exporting books on line {first_line + line_num}. "
+                                                    f"{message}")
+            self._records.update(records)
+            self._last_id = max(self._last_id, last_id)
+            first_line += line_count
+
+    @log_timing(logger, 'snapshot')
+    def snapshot(self) -> BookRecordStore:
+        """
+        Возвращает согласованную копию книг и их статусов.
+        Снимок является представлением записей и берётся за постоянное время, а словарь и карту наличия
+        хранилище копирует только при первом изменении, пока снимок ещё используется.
+        :return: Записи книг вместе с их статусами.
+        """
+        return self._records.view()
+
+    def view(self) -> RepositoryView:
+        """
+        Возвращает представление хранилища только для чтения, закреплённое за текущей версией.
+        Представление берётся за постоянное время, а изменения хранилища его не блокируют и в нём не видны.
+        """
+        return RepositoryView(self._records.view(), self._version)
+
+    def restore(self, records: BookRecordStore, last_id: int | None = None):
+        """
+        Заменяет содержимое хранилища записями снимка.
+        :param records: Записи книг, которые становятся содержимым хранилища.
+        :param last_id: Последний выданный идентификатор, по умолчанию наибольший идентификатор снимка.
+        """
+        self._records = records
+        self._last_id = max(records, default=0) if last_id is None else last_id
+        self._dead_entries = 0
+        self._version += 1
+        self._publish(ChangeKind.RESET)
+
     @property
     def number_of_books(self) -> int:
         """ Количество книг в хранилище. """
-        return len(self._books)
+        return len(self._records)
+
+    def count_by_status(self) -> dict[BookStatus, int]:
+        """
+        Подсчитывает количество книг с каждым статусом.
+        :return: Словарь {статус: количество книг}.
+        """
+        # Книги в наличии считаются по установленным битам карты наличия.
+        records = self._records.view()
+        available = records.count_available()
+        return {BookStatus.AVAILABLE: available, BookStatus.GIVEN_OUT: len(records) - available}
+
+    def status_bitmap(self, status: BookStatus) -> Bitmap:
+        """
+        Возвращает битовую карту идентификаторов книг с указанным статусом.
+        Карта книг в наличии копируется из хранилища, а карта выданных книг получается из неё вычитанием.
+        :param status: Статус книг.
+        """
+        if status == BookStatus.AVAILABLE:
+            return self._records.available_bitmap()
+        return self._records.id_bitmap() - self._records.available_bitmap()
+
+    def year_bitmap(self, year_from: int | None = None, year_to: int | None = None) -> Bitmap:
+        """
+        Возвращает битовую карту идентификаторов книг, изданных в указанном диапазоне лет.
+        :param year_from: Год, не раньше которого изданы книги, или None.
+        :param year_to: Год, не позже которого изданы книги, или None.
+        """
+        return Bitmap.from_indexes(book.id for book in self._records.view().books()
+                                   if (year_from is None or book.year >= year_from)
+                                   and (year_to is None or book.year <= year_to))
+
+    def iter_books_with_status(self) -> Iterator[tuple[Book, BookStatus]]:
+        """
+        Обходит книги хранилища вместе с их статусами, не создавая списка всех книг.
+        Обходится представление текущей версии, поэтому изменения хранилища во время обхода в нём не видны.
+        :return: Генератор пар (книга, статус).
+        """
+        for book, status in self._records.view().records():
+            yield book, BookStatus.get_status(status)
 
     @property
     def all_books(self) -> tuple[Book, ...]:
         """ Возвращает всё книги из хранилища. """
-        return tuple(self._books.values())
+        return tuple(self._records.view().books())
 
     def add_book(self, book: Book) -> int:
         """
@@ -71,11 +283,54 @@ class BookRepository(AbstractBookRepository):
         # Книге назначается идентификатор,
         book.set_id(self._last_id)
         # и устанавливается статус.
-        self._books_status[self._last_id] = BookStatus.AVAILABLE.value
-        # book.status = BookStatus.AVAILABLE
-        self._books[self._last_id] = book
+        self._records.put(book, BookStatus.AVAILABLE.value)
+        self._version += 1
+        self._publish(ChangeKind.ADD, (BookRecord(book, BookStatus.AVAILABLE.value),))
         return book.id
 
+    @log_timing(logger, 'add_books')
+    def add_books(self, books: Iterable[Book]) -> tuple[int, ...]:
+        """
+        Добавляет пачку книг в хранилище, подписчики ленты изменений получают одно событие на всю пачку.
+        :param books: Добавляемые книги.
+        :return: Идентификаторы добавленных книг.
+        """
+        added: list[Book] = []
+        status = BookStatus.AVAILABLE.value
+        try:
+            for book in books:
+                self._last_id += 1
+                book.set_id(self._last_id)
+                added.append(book)
+        finally:
+            # Книги помещаются в записи одной пачкой, поэтому записи проверяют, надо ли копировать данные, один раз.
+            self._records.put_all(added, status)
+        self._version += len(added)
+        if added:
+            self._publish(ChangeKind.ADD, (BookRecord(book, status) for book in added))
+        return tuple(book.id for book in added)
+
+    def put_book(self, book: Book, status: bool | BookStatus) -> int:
+        """
+        Помещает в хранилище книгу с уже назначенным идентификатором.
+        :param book: Книга с назначенным идентификатором.
+        :param status: Статус книги.
+        :return: Идентификатор помещённой в хранилище книги.
+        :raises BookRepositoryError: Ошибка проверки идентификатора или статуса книги.
+        """
+        try:
+            _id = validation_id(book.id)
+            status = validation_status(status)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        self._records.put(book, status)
+        # Последний идентификатор не должен быть меньше идентификатора помещённой книги.
+        if _id > self._last_id:
+            self._last_id = _id
+        self._version += 1
+        self._publish(ChangeKind.PUT, (BookRecord(book, status),))
+        return _id
+
     def get_status_book(self, _id) -> BookStatus:
         """
         Возвращает статус книги
@@ -84,7 +339,7 @@ class BookRepository(AbstractBookRepository):
         :raises BookRepositoryError: Книга с указанным идентификатором отсутствует;
         """
         try:
-            return BookStatus.get_status(self._books_status[_id])
+            return BookStatus.get_status(self._records[_id].status)
         except KeyError:
             raise BookRepositoryError(f"The book with the ID {_id} is missing.")
 
@@ -100,14 +355,15 @@ class BookRepository(AbstractBookRepository):
         """
         self._is_repository_empty('changing status')
         try:
-            # book = self._books[_id]
-            # book.status = status
-            self._books_status[_id] = validation_status(status)
-            return self._books[_id]
+            status = validation_status(status)
+            book = self._records.set_status(_id, status)
         except KeyError:
             raise BookRepositoryError(f"The book with the ID {_id} is missing.")
         except ValidationError as err:
             raise BookRepositoryError(err.message)
+        self._version += 1
+        self._publish(ChangeKind.STATUS, (BookRecord(book, status),))
+        return book
 
     def remove_book(self, _id: int) -> Book:
         """
@@ -119,9 +375,14 @@ class BookRepository(AbstractBookRepository):
         """
         self._is_repository_empty('delete')
         try:
-            return self._books.pop(_id)
+            record = self._records.pop(_id)
         except KeyError:
             raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+        self._dead_entries += 1
+        self._version += 1
+        self._publish(ChangeKind.REMOVE, (record,))
+        self._compact_if_needed()
+        return record.book
 
     def get_book_by_id(self, _id: int) -> Book | None:
         """
@@ -131,27 +392,36 @@ class BookRepository(AbstractBookRepository):
         :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
         """
         try:
-            return self._books[validation_id(_id)]
+            return self._records[validation_id(_id)].book
         except ValidationError as err:
             raise BookRepositoryError(err.message)
         except KeyError:
             return None
 
+    def get_book_with_status(self, _id: int) -> tuple[Book, BookStatus] | None:
+        """
+        Получение книги вместе с её статусом по идентификатору книги.
+        :param _id: Идентификатор книги, которую требуется вернуть.
+        :return: Пара (книга, статус) или None, если книги с таким идентификатором нет.
+        :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
+        """
+        try:
+            record = self._records.get(validation_id(_id))
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        return None if record is None else (record.book, BookStatus.get_status(record.status))
+
+    @log_timing(logger, 'find_book_by_author')
     def find_book_by_author(self, author: str) -> tuple[Book, ...]:
         """ Поиск книг по автору. """
-        author = author.strip().lower()
-        if author == "":
-            return ()
-        return tuple(filter(lambda b: author in b.author.lower(), self._books.values()))
+        return tuple(book for book, _ in self._find_records(SearchCriteria.SEARCH_AUTHOR, author))
 
+    @log_timing(logger, 'find_book_by_title')
     def find_book_by_title(self, title: str) -> tuple[Book, ...]:
         """ Поиск книг по заголовку. """
-        title = title.strip().lower()
-        # При пустом запросе должен вернуться пустой кортеж
-        if title == "":
-            return ()
-        return tuple(filter(lambda b: title in b.title.lower(), self._books.values()))
+        return tuple(book for book, _ in self._find_records(SearchCriteria.SEARCH_TITLE, title))
 
+    @log_timing(logger, 'find_book_by_year')
     def find_book_by_year(self, year: int) -> tuple[Book, ...]:
         """
         Поиск книг по году издания.
@@ -159,15 +429,50 @@ class BookRepository(AbstractBookRepository):
         :return:
         :raises BookRepositoryError: Ошибка при указании года выпуска книги.
         """
-        try:
-            year = validation_year(year)
-        except ValidationError as err:
-            raise BookRepositoryError(err.message)
-        return tuple(filter(lambda b: b.year == year, self._books.values()))
+        return tuple(book for book, _ in self._find_records(SearchCriteria.SEARCH_YEAR, year))
+
+    def find_books_with_status(self, search_criteria: SearchCriteria, search_val: str | int) \
+            -> tuple[tuple[Book, BookStatus], ...]:
+        """
+        Ищет книги и возвращает их вместе со статусами, статус берётся из той же записи, что и книга.
+        :param search_criteria: Критерий поиска.
+        :param search_val: Значение поиска.
+        :return: Кортеж пар (книга, статус).
+        :raises BookRepositoryError: Ошибка при указании года выпуска книги;
+                                     Указан неверный критерий поиска.
+        """
+        return tuple((book, BookStatus.get_status(status))
+                     for book, status in self._find_records(search_criteria, search_val))
+
+    def _find_records(self, search_criteria: SearchCriteria, search_val: str | int) -> Iterator[BookRecord]:
+        """
+        Ищет записи книг по критерию поиска.
+        При пустом запросе по заголовку или автору ничего не находится.
+        :raises BookRepositoryError: Ошибка при указании года выпуска книги;
+                                     Указан неверный критерий поиска.
+        """
+        match search_criteria:
+            case SearchCriteria.SEARCH_TITLE | SearchCriteria.SEARCH_AUTHOR:
+                search_val = search_val.strip().lower()
+                if search_val == "":
+                    return iter(())
+                if search_criteria == SearchCriteria.SEARCH_TITLE:
+                    return filter(lambda r: search_val in r.book.title.lower(), self._records.view().records())
+                return filter(lambda r: search_val in r.book.author.lower(), self._records.view().records())
+            case SearchCriteria.SEARCH_YEAR:
+                try:
+                    year = validation_year(search_val)
+                except ValidationError as err:
+                    raise BookRepositoryError(err.message)
+                return filter(lambda r: r.book.year == year, self._records.view().records())
+            case _:
+                raise BookRepositoryError("Invalid search criteria specified")
 
     def _import(self) -> tuple[list[dict[str: Any]], dict[int, bool]]:
         """ Преобразует список всех книг в список простых объектов и добавляет словарь статусов книг """
-        return [copy(book.to_dict()) for book in self.all_books], self._books_status
+        records = self._records.view()
+        return [copy(book.to_dict()) for book in records.books()], \
+            {book.id: status for book, status in records.records()}
 
     def _export_statuses(self, row_num, status_dict: dict[int, bool]):
         """
@@ -181,7 +486,10 @@ class BookRepository(AbstractBookRepository):
             # При экспорте проверятся, чтобы такой идентифкатор не превышал самый большой идентификатор в хранилище.
             if _id > self._last_id:
                 ValidationError(f'The identifier does not exist in the book store.', 'status', _id)
-            self._books_status[validation_id(_id)] = validation_status(status)
+            status = validation_status(status)
+            # Статусы книг, которых нет в хранилище, не сохраняются.
+            if _id in self._records:
+                self._records.set_status(_id, status)
             row_num[0] = row_num[0] + 1
 
     def _export_book(self, row_num, book_list: list[dict[str: Any]]) -> int:
@@ -198,7 +506,7 @@ class BookRepository(AbstractBookRepository):
         for _book in book_list:
             book = Book(_book['_title'], _book['_author'], _book['_year'])
             book.set_id(_book['_id'])
-            self._books[book.id] = book
+            self._records.put(book, BookStatus.AVAILABLE.value)
             # Сразу же ищется самый последний (он же самый большой) идентификатор.
             if book.id > last_id:
                 last_id = book.id
@@ -221,13 +529,11 @@ class BookRepository(AbstractBookRepository):
             row_num = [1]
             self._export_statuses(row_num, status_dict)
         except ValidationError as err:
-            self._books_status = {}
-            self._books = {}
+            self._records.clear()
             raise BookRepositoryExportException(f"Error when exporting books number {row_num[0]}. "
                                                 f"{err.message}: {err.var_name} = {err.value}")
         except KeyError as err:
-            self._books_status = {}
-            self._books = {}
+            self._records.clear()
             raise BookRepositoryExportException(f"Error when exporting books number {row_num[0]}. "
                                                 f"The {err.args[0][1:]} data is missing")
 
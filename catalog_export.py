@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+from typing import Any, Iterator, TextIO
+
+from abstract_class import AbstractBookRepository
+from enums import BookStatus
+from exceptions import BookManagerError
+
+
+BUFFER_ROWS = 1000
+""" Количество строк, которые накапливаются перед записью в файл. """
+
+COLUMNS = ('id', 'title', 'author', 'year', 'status')
+""" Колонки выгрузки каталога. """
+
+
+class CatalogExporter:
+    """
+    Потоковая выгрузка каталога в форматах NDJSON и CSV.
+    Книги обходятся генератором и записываются блоками строк, поэтому список всего каталога в памяти не строится.
+    """
+    FORMATS = ('ndjson', 'csv')
+
+    def __init__(self, book_repository: AbstractBookRepository, buffer_rows: int = BUFFER_ROWS):
+        """
+        Конструктор класса.
+        :param book_repository: Хранилище, каталог которого выгружается.
+        :param buffer_rows: Количество строк, которые накапливаются перед записью в файл.
+        """
+        self._book_repository = book_repository
+        self._buffer_rows = buffer_rows
+
+    def iter_rows(self, status: BookStatus | None = None, title: str | None = None, author: str | None = None,
+                  year_from: int | None = None, year_to: int | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Обходит книги каталога, удовлетворяющие фильтрам.
+        :param status: Только книги с указанным статусом.
+        :param title: Только книги, в наименование которых входит строка, без учёта регистра.
+        :param author: Только книги, в автора которых входит строка, без учёта регистра.
+        :param year_from: Только книги, изданные не раньше указанного года.
+        :param year_to: Только книги, изданные не позже указанного года.
+        :return: Генератор строк выгрузки.
+        """
+        title = title.strip().lower() if title else None
+        author = author.strip().lower() if author else None
+        for book, book_status in self._book_repository.iter_books_with_status():
+            if status is not None and book_status != status:
+                continue
+            if title is not None and title not in book.title.lower():
+                continue
+            if author is not None and author not in book.author.lower():
+                continue
+            if year_from is not None and book.year < year_from:
+                continue
+            if year_to is not None and book.year > year_to:
+                continue
+            yield {'id': book.id, 'title': book.title, 'author': book.author, 'year': book.year,
+                   'status': book_status.name.lower()}
+
+    def export(self, f: TextIO, export_format: str, **filters) -> int:
+        """
+        Выгружает каталог в файл.
+        :param f: Файл, открытый на запись в текстовом режиме.
+        :param export_format: Формат выгрузки 'ndjson' или 'csv'.
+        :param filters: Фильтры, как у iter_rows.
+        :return: Количество выгруженных книг.
+        :raises BookManagerError: Неизвестный формат выгрузки.
+        """
+        match export_format:
+            case 'ndjson':
+                return self._export_ndjson(f, self.iter_rows(**filters))
+            case 'csv':
+                return self._export_csv(f, self.iter_rows(**filters))
+            case _:
+                raise BookManagerError(f"Unknown export format '{export_format}', "
+                                       f"expected one of: {', '.join(self.FORMATS)}")
+
+    def _export_ndjson(self, f: TextIO, rows: Iterator[dict[str, Any]]) -> int:
+        """ Выгружает строки в формате NDJSON, по одной книге в строке. """
+        count = 0
+        buffer: list[str] = []
+        for row in rows:
+            buffer.append(json.dumps(row, ensure_ascii=False))
+            buffer.append('\n')
+            count += 1
+            if len(buffer) >= self._buffer_rows * 2:
+                f.write(''.join(buffer))
+                buffer.clear()
+        f.write(''.join(buffer))
+        return count
+
+    def _export_csv(self, f: TextIO, rows: Iterator[dict[str, Any]]) -> int:
+        """ Выгружает строки в формате CSV с заголовком. """
+        count = 0
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+            if count % self._buffer_rows == 0:
+                f.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+        f.write(buffer.getvalue())
+        return count
@@ -0,0 +1,145 @@
+import threading
+from typing import Callable, Iterable, NamedTuple
+
+from enums import ChangeKind
+from exceptions import BookRepositoryError
+from helper import Logger
+from record_store import BookRecord
+
+
+logger = Logger.get_logger('change_feed')
+
+
+class ChangeEvent(NamedTuple):
+    """ Событие ленты изменений хранилища. """
+    kind: ChangeKind
+    version: int
+    """ Версия хранилища после изменения. """
+    records: tuple[BookRecord, ...]
+    """ Затронутые книги со статусами после изменения, для удаления - удалённые книги, для сброса - пусто. """
+
+
+class Subscription:
+    """
+    Подписка на ленту изменений хранилища.
+    Подписчик без пачек получает каждое событие сразу в потоке, который изменил хранилище.
+    Подписчик с пачками получает список накопленных событий, когда их набирается на пачку или при вызове flush.
+    """
+    def __init__(self, feed: 'ChangeFeed', callback: Callable, kinds: Iterable[ChangeKind] | None = None,
+                 batch_size: int | None = None):
+        """
+        Конструктор класса.
+        :param feed: Лента изменений.
+        :param callback: Функция, которой передаётся событие, а при доставке пачками - список событий.
+        :param kinds: Виды событий, которые получает подписчик, по умолчанию все.
+        :param batch_size: Количество событий в пачке, или None для доставки каждого события сразу.
+        """
+        self._feed = feed
+        self._callback = callback
+        self._kinds = None if kinds is None else frozenset(kinds)
+        self._batch_size = batch_size
+        self._pending: list[ChangeEvent] = []
+        self._lock = threading.Lock()
+
+    @property
+    def batched(self) -> bool:
+        """ События доставляются пачками. """
+        return self._batch_size is not None
+
+    @property
+    def pending(self) -> int:
+        """ Количество накопленных, но ещё не доставленных событий. """
+        return len(self._pending)
+
+    def deliver(self, event: ChangeEvent):
+        """ Доставляет событие подписчику или откладывает его до заполнения пачки. """
+        if self._kinds is not None and event.kind not in self._kinds:
+            return
+        if self._batch_size is None:
+            self._call(event)
+            return
+        with self._lock:
+            self._pending.append(event)
+            is_full = len(self._pending) >= self._batch_size
+        if is_full:
+            self.flush()
+
+    def flush(self):
+        """ Доставляет подписчику накопленные события одной пачкой. """
+        with self._lock:
+            events, self._pending = self._pending, []
+        if events:
+            self._call(events)
+
+    def close(self):
+        """ Доставляет накопленные события и отменяет подписку. """
+        self._feed.unsubscribe(self)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _call(self, arg: ChangeEvent | list[ChangeEvent]):
+        """ Вызывает подписчика, его ошибка записывается в журнал и не прерывает изменение хранилища. """
+        try:
+            self._callback(arg)
+        except Exception:
+            logger.exception("The change feed subscriber %r failed", self._callback)
+
+
+class ChangeFeed:
+    """
+    Лента изменений хранилища.
+    Хранилище публикует в ленту события добавления, замены, изменения статуса и удаления книг с номером версии
+    хранилища после изменения, а производные структуры, кэши и реплики обновляются по ним, не перестраиваясь
+    целиком. Добавление пачки книг публикуется одним событием, а события сброса означают, что содержимое
+    хранилища заменено целиком, например после загрузки или перенумерации, и подписчикам надо перестроиться.
+    Пока подписчиков нет, хранилище событий не создаёт.
+    """
+    def __init__(self):
+        self._subscriptions: tuple[Subscription, ...] = ()
+        """ Подписки, кортеж заменяется целиком, поэтому публикация обходит его без блокировки. """
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        """ У ленты есть подписчики. """
+        return bool(self._subscriptions)
+
+    def __len__(self) -> int:
+        """ Количество подписок. """
+        return len(self._subscriptions)
+
+    def subscribe(self, callback: Callable, kinds: Iterable[ChangeKind] | None = None,
+                  batch_size: int | None = None) -> Subscription:
+        """
+        Подписывает функцию на события ленты.
+        :param callback: Функция, которой передаётся событие, а при доставке пачками - список событий.
+        :param kinds: Виды событий, которые получает подписчик, по умолчанию все.
+        :param batch_size: Количество событий в пачке, или None для доставки каждого события сразу.
+        :return: Подписка.
+        :raises BookRepositoryError: Размер пачки не является положительным целым числом.
+        """
+        if batch_size is not None and (not isinstance(batch_size, int) or batch_size < 1):
+            raise BookRepositoryError("The batch size must be a positive integer")
+        subscription = Subscription(self, callback, kinds, batch_size)
+        with self._lock:
+            self._subscriptions = (*self._subscriptions, subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """ Отменяет подписку, накопленные ей события не доставляются. """
+        with self._lock:
+            self._subscriptions = tuple(item for item in self._subscriptions if item is not subscription)
+
+    def publish(self, event: ChangeEvent):
+        """ Доставляет событие всем подписчикам. """
+        for subscription in self._subscriptions:
+            subscription.deliver(event)
+
+    def flush(self):
+        """ Доставляет накопленные события всем подписчикам с доставкой пачками. """
+        for subscription in self._subscriptions:
+            subscription.flush()
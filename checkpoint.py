@@ -0,0 +1,125 @@
+import threading
+import time
+
+from abstract_class import AbstractBookRepository
+from background_save import BackgroundSave
+
+
+class CheckpointScheduler:
+    """
+    Планировщик контрольных точек хранилища.
+    Периодически проверяет, сколько изменений накопилось с последнего сохранения, и сохраняет хранилище в фоне,
+    когда прошло заданное время или накопилось заданное количество изменений, смотря что наступит раньше.
+    Серия изменений между проверками объединяется в одно сохранение.
+    """
+    INTERVAL = 300.0
+    MAX_MUTATIONS = 1000
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, book_repository: AbstractBookRepository, filename, interval: float = INTERVAL,
+                 max_mutations: int = MAX_MUTATIONS, poll_interval: float = POLL_INTERVAL):
+        """
+        Конструктор класса.
+        :param book_repository: Хранилище, для которого создаются контрольные точки.
+        :param filename: Файл, в который сохраняется хранилище.
+        :param interval: Максимальное время в секундах между первым несохранённым изменением и сохранением.
+        :param max_mutations: Количество изменений, после которого хранилище сохраняется, не дожидаясь интервала.
+        :param poll_interval: Период проверки накопленных изменений в секундах.
+        """
+        self._book_repository = book_repository
+        self._filename = filename
+        self._interval = interval
+        self._max_mutations = max_mutations
+        self._poll_interval = poll_interval
+        self._saved_version = book_repository.version
+        self._dirty_since: float | None = None
+        """ Время, когда было замечено первое несохранённое изменение. """
+        self._background_save: BackgroundSave | None = None
+        self._unconfirmed_version: int | None = None
+        """ Версия, сохранённая до запущенной контрольной точки, пока не известно, удалась ли она. """
+        self._number_of_checkpoints = 0
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def number_of_checkpoints(self) -> int:
+        """ Количество запущенных контрольных точек. """
+        return self._number_of_checkpoints
+
+    @property
+    def pending_mutations(self) -> int:
+        """ Количество изменений хранилища, которые ещё не попали в контрольную точку. """
+        self._confirm_checkpoint()
+        return self._book_repository.version - self._saved_version
+
+    @property
+    def last_error(self) -> Exception | None:
+        """ Ошибка последней контрольной точки. """
+        return self._background_save.error if self._background_save is not None else None
+
+    def start(self) -> 'CheckpointScheduler':
+        """ Запускает планировщик в фоновом потоке. """
+        # Изменения, сделанные до запуска, например загрузка хранилища, в контрольную точку не попадают.
+        self._saved_version = self._book_repository.version
+        self._unconfirmed_version = None
+        self._dirty_since = None
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='checkpoint-scheduler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """ Останавливает планировщик и дожидается завершения последней контрольной точки. """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._background_save is not None:
+            self._background_save.wait()
+
+    def checkpoint(self) -> BackgroundSave | None:
+        """
+        Запускает контрольную точку, если с последней контрольной точки хранилище изменилось.
+        :return: Запущенное фоновое сохранение или None, если сохранять нечего.
+        """
+        self._confirm_checkpoint()
+        version = self._book_repository.version
+        if version == self._saved_version:
+            return None
+        self._background_save = self._book_repository.save_in_background(self._filename)
+        self._unconfirmed_version = self._saved_version
+        self._saved_version = version
+        self._dirty_since = None
+        self._number_of_checkpoints += 1
+        return self._background_save
+
+    def _confirm_checkpoint(self):
+        """
+        Проверяет завершившуюся контрольную точку.
+        Если сохранение завершилось ошибкой, то его изменения снова считаются несохранёнными,
+        поэтому планировщик повторит сохранение.
+        """
+        if self._unconfirmed_version is None or not self._background_save.done:
+            return
+        if self._background_save.error is not None:
+            self._saved_version = self._unconfirmed_version
+        self._unconfirmed_version = None
+
+    def _is_checkpoint_due(self) -> bool:
+        """ Проверяет, пора ли создавать контрольную точку. """
+        pending_mutations = self.pending_mutations
+        if pending_mutations == 0:
+            return False
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        # Пока идёт предыдущее сохранение, новые изменения копятся и попадут в следующее.
+        if self._background_save is not None and not self._background_save.done:
+            return False
+        return pending_mutations >= self._max_mutations \
+            or time.monotonic() - self._dirty_since >= self._interval
+
+    def _run(self):
+        """ Цикл проверки накопленных изменений. """
+        while not self._stop_event.wait(self._poll_interval):
+            if self._is_checkpoint_due():
+                self.checkpoint()
@@ -0,0 +1,126 @@
+import csv
+import os
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator
+
+from abstract_class import AbstractBookRepository
+from book import Book
+from exceptions import BookManagerError
+from validation import validation_columns
+
+
+CHUNK_SIZE = 10_000
+""" Количество строк CSV-файла в одной пачке. """
+
+COLUMNS = ('title', 'author', 'year')
+""" Обязательные колонки CSV-файла. """
+
+REJECT_COLUMNS = ('row', 'field', 'value', 'message')
+""" Колонки файла отклонённых строк. """
+
+
+def _validate_chunk(rows: list[tuple[int, str, str, str]]) -> tuple[list[Book], list[tuple[int, str, Any, str]]]:
+    """
+    Проверяет пачку строк CSV-файла и создаёт из корректных строк книги.
+    Выполняется в отдельном процессе.
+    :param rows: Строки в виде кортежей (номер строки, наименование, автор, год издания).
+    :return: Кортеж из списка книг и списка ошибок (номер строки, поле, значение, сообщение).
+    """
+    row_nums, titles, authors, years = zip(*rows) if rows else ((), (), (), ())
+    columns, rejects = validation_columns({'title': titles, 'author': authors, 'year': years}, row_nums)
+    # Для отклонённой строки в список ошибок попадают все её некорректные поля.
+    rejected_rows = {reject[0] for reject in rejects}
+    books = [Book.from_validated(title, author, year)
+             for row_num, title, author, year in zip(row_nums, columns['title'], columns['author'], columns['year'])
+             if row_num not in rejected_rows]
+    return books, rejects
+
+
+class CsvBookImporter:
+    """
+    Импорт книг из CSV-файла.
+    Файл читается пачками строк, пачки проверяются параллельно в нескольких процессах,
+    а корректные книги добавляются в хранилище пачками.
+    """
+    def __init__(self, book_repository: AbstractBookRepository, chunk_size: int = CHUNK_SIZE,
+                 max_workers: int | None = None):
+        """
+        Конструктор класса.
+        :param book_repository: Хранилище, в которое импортируются книги.
+        :param chunk_size: Количество строк в одной пачке.
+        :param max_workers: Количество процессов для проверки строк, по умолчанию по количеству процессоров.
+        """
+        self._book_repository = book_repository
+        self._chunk_size = chunk_size
+        self._max_workers = max_workers or os.cpu_count() or 1
+
+    def import_csv(self, filename, reject_filename=None) -> tuple[int, int]:
+        """
+        Импортирует книги из CSV-файла.
+        :param filename: CSV-файл с колонками title, author и year.
+        :param reject_filename: Файл, куда записываются отклонённые строки с описанием ошибок.
+        :return: Кортеж (количество импортированных книг, количество отклонённых строк).
+        :raises BookManagerError: Файл не найден или в нём нет обязательных колонок.
+        """
+        filename = Path(filename)
+        if not filename.exists():
+            raise BookManagerError(f"The file '{filename}' for import was not found")
+        imported = 0
+        rejected_rows: set[int] = set()
+        reject_file = open(reject_filename, 'w', encoding='utf-8', newline='') \
+            if reject_filename is not None else nullcontext()
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f, reject_file:
+            reject_writer = None
+            if reject_filename is not None:
+                reject_writer = csv.writer(reject_file)
+                reject_writer.writerow(REJECT_COLUMNS)
+            for books, rejects in self._validate(self._read_chunks(csv.reader(f))):
+                imported += len(self._book_repository.add_books(books))
+                for reject in rejects:
+                    rejected_rows.add(reject[0])
+                    if reject_writer is not None:
+                        reject_writer.writerow(reject)
+        return imported, len(rejected_rows)
+
+    def _read_chunks(self, reader) -> Iterator[list[tuple[int, str, str, str]]]:
+        """
+        Читает CSV-файл пачками строк.
+        :raises BookManagerError: В файле нет обязательных колонок.
+        """
+        header = [column.strip().lower() for column in next(reader, [])]
+        try:
+            indexes = tuple(header.index(column) for column in COLUMNS)
+        except ValueError:
+            raise BookManagerError(f"The CSV file must contain the columns: {', '.join(COLUMNS)}")
+        chunk = []
+        for row in reader:
+            if not row:
+                continue
+            # Недостающие значения считаются пустыми и отклоняются при проверке.
+            chunk.append((reader.line_num, *(row[i] if i < len(row) else '' for i in indexes)))
+            if len(chunk) >= self._chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _validate(self, chunks: Iterator[list[tuple[int, str, str, str]]]) \
+            -> Iterator[tuple[list[Book], list[tuple[int, str, Any, str]]]]:
+        """
+        Проверяет пачки строк, сохраняя их порядок.
+        Одновременно в работе находится не больше двух пачек на процесс, поэтому файл целиком в память не читается.
+        """
+        if self._max_workers == 1:
+            yield from map(_validate_chunk, chunks)
+            return
+        with ProcessPoolExecutor(self._max_workers) as executor:
+            pending: deque[Future] = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_validate_chunk, chunk))
+                if len(pending) >= self._max_workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,241 @@
+import json
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from abstract_class import AbstractBookRepository
+from book import Book, BookStatus
+from book_repository import BookRepository
+from enums import PatchOperation
+from exceptions import BookManagerError, BookRepositoryError, ValidationError
+from repository_export import BookRepositoryExport
+from snapshot_io import open_snapshot
+from validation import validation_id, validation_status
+
+
+PATCH_FORMAT = 'book-delta'
+PATCH_VERSION = 1
+
+
+def encode_operation(op: PatchOperation, item: Book | int, status: bool | None = None) -> list[Any]:
+    """
+    Представляет операцию списком для записи в JSON.
+    :param op: Операция.
+    :param item: Книга для добавления и изменения, идентификатор книги для изменения статуса и удаления.
+    :param status: Статус книги, для удаления не указывается.
+    :return: Список [операция, идентификатор, данные книги..., статус].
+    """
+    match op:
+        case PatchOperation.ADD | PatchOperation.CHANGE:
+            return [op, item.id, item.title, item.author, item.year, status]
+        case PatchOperation.STATUS:
+            return [op, item, status]
+        case _:
+            return [op, item]
+
+
+def decode_operation(operation: list[Any]) -> tuple[PatchOperation, Book | int, bool | None]:
+    """
+    Разбирает операцию, записанную функцией encode_operation.
+    :return: Кортеж (операция, книга или идентификатор книги, статус или None).
+    :raises ValidationError: Некорректные данные книги.
+    :raises ValueError: Неизвестная операция.
+    """
+    match operation:
+        case [PatchOperation.ADD | PatchOperation.CHANGE as op, _id, title, author, year, status]:
+            book = Book(title, author, year)
+            book.set_id(_id)
+            return PatchOperation(op), book, validation_status(status)
+        case [PatchOperation.STATUS, _id, status]:
+            return PatchOperation.STATUS, validation_id(_id), validation_status(status)
+        case [PatchOperation.REMOVE, _id]:
+            return PatchOperation.REMOVE, validation_id(_id), None
+        case _:
+            raise ValueError(operation)
+
+
+def apply_operation(book_repository: BookRepository, op: PatchOperation, item: Book | int,
+                    status: bool | None = None):
+    """
+    Выполняет операцию над хранилищем.
+    :raises BookRepositoryError: Книга с указанным идентификатором отсутствует.
+    """
+    match op:
+        case PatchOperation.ADD | PatchOperation.CHANGE:
+            book_repository.put_book(item, status)
+        case PatchOperation.STATUS:
+            book_repository.changing_status_book(item, status)
+        case PatchOperation.REMOVE:
+            book_repository.remove_book(item)
+
+
+class Changeset:
+    """
+    Набор изменений между двумя состояниями хранилища.
+    Изменения вычисляются слиянием двух упорядоченных по идентификатору списков книг, поэтому сравнение
+    занимает один проход, а в набор попадают только добавленные, изменённые и удалённые книги.
+    Набор записывается в патч построчно: заголовок и по одной операции в строке.
+    """
+    def __init__(self, base_books: int = 0, target_books: int = 0):
+        """
+        Конструктор класса.
+        :param base_books: Количество книг в исходном состоянии хранилища.
+        :param target_books: Количество книг в итоговом состоянии хранилища.
+        """
+        self.base_books = base_books
+        self.target_books = target_books
+        self.added: list[tuple[Book, bool]] = []
+        self.changed: list[tuple[Book, bool]] = []
+        self.statuses: list[tuple[int, bool]] = []
+        self.removed: list[int] = []
+
+    def __len__(self) -> int:
+        """ Количество операций в наборе. """
+        return len(self.added) + len(self.changed) + len(self.statuses) + len(self.removed)
+
+    @property
+    def summary(self) -> dict[str, int]:
+        """ Количество операций каждого вида. """
+        return {'added': len(self.added), 'changed': len(self.changed), 'statuses': len(self.statuses),
+                'removed': len(self.removed)}
+
+    @classmethod
+    def compute(cls, base: Iterable[tuple[Book, bool | BookStatus]],
+                target: Iterable[tuple[Book, bool | BookStatus]]) -> 'Changeset':
+        """
+        Вычисляет изменения, которые переводят исходное состояние хранилища в итоговое.
+        :param base: Книги исходного состояния вместе со статусами.
+        :param target: Книги итогового состояния вместе со статусами.
+        :return: Набор изменений.
+        """
+        base = sorted(((book, validation_status(status)) for book, status in base), key=lambda pair: pair[0].id)
+        target = sorted(((book, validation_status(status)) for book, status in target), key=lambda pair: pair[0].id)
+        changeset = cls(len(base), len(target))
+        i = j = 0
+        while i < len(base) or j < len(target):
+            base_id = base[i][0].id if i < len(base) else None
+            target_id = target[j][0].id if j < len(target) else None
+            if target_id is None or base_id is not None and base_id < target_id:
+                changeset.removed.append(base_id)
+                i += 1
+            elif base_id is None or target_id < base_id:
+                changeset.added.append(target[j])
+                j += 1
+            else:
+                (base_book, base_status), (target_book, target_status) = base[i], target[j]
+                if not cls._same_book(base_book, target_book):
+                    changeset.changed.append(target[j])
+                elif base_status != target_status:
+                    changeset.statuses.append((target_id, target_status))
+                i += 1
+                j += 1
+        return changeset
+
+    @classmethod
+    def compute_from_snapshot(cls, base_filename, book_repository: AbstractBookRepository) -> 'Changeset':
+        """
+        Вычисляет изменения, которые переводят снимок хранилища в текущее состояние хранилища.
+        :param base_filename: Файл снимка исходного состояния.
+        :param book_repository: Хранилище в итоговом состоянии.
+        :return: Набор изменений.
+        :raises BookRepositoryError:
+        :raises BookRepositoryExportException:
+        """
+        base_repository = BookRepository()
+        base_repository.set_repository_export(BookRepositoryExport(base_repository))
+        base_repository.load(base_filename)
+        return cls.compute(base_repository.iter_books_with_status(), book_repository.iter_books_with_status())
+
+    def apply(self, book_repository: BookRepository) -> int:
+        """
+        Применяет изменения к хранилищу.
+        Вначале проверяется, что хранилище находится в исходном состоянии набора, и только потом
+        выполняются операции, поэтому при ошибке хранилище не меняется.
+        :param book_repository: Хранилище в исходном состоянии набора.
+        :return: Количество выполненных операций.
+        :raises BookManagerError: Хранилище не находится в исходном состоянии набора.
+        """
+        if book_repository.number_of_books != self.base_books:
+            raise BookManagerError(f"The patch was made for a repository with {self.base_books} books, "
+                                   f"but the repository contains {book_repository.number_of_books} books")
+        for book, _ in self.added:
+            if book_repository.get_book_by_id(book.id) is not None:
+                raise BookManagerError(f"The book with the ID {book.id} added by the patch already exists")
+        for _id in (*(book.id for book, _ in self.changed), *(_id for _id, _ in self.statuses), *self.removed):
+            if book_repository.get_book_by_id(_id) is None:
+                raise BookManagerError(f"The book with the ID {_id} changed by the patch is missing")
+
+        try:
+            for operation in self._operations():
+                apply_operation(book_repository, *operation)
+        except BookRepositoryError as err:
+            raise BookManagerError(err.message)
+        return len(self)
+
+    def write(self, filename) -> int:
+        """
+        Записывает набор изменений в файл патча, файл с расширением сжатия записывается сжатым.
+        :param filename: Файл патча.
+        :return: Количество записанных операций.
+        """
+        header = {'format': PATCH_FORMAT, 'version': PATCH_VERSION, 'base_books': self.base_books,
+                  'target_books': self.target_books, **self.summary}
+        with open_snapshot(filename, 'w') as f:
+            f.write(json.dumps(header) + '\n')
+            f.writelines(json.dumps(encode_operation(*operation), ensure_ascii=False) + '\n'
+                         for operation in self._operations())
+        return len(self)
+
+    @classmethod
+    def read(cls, filename) -> 'Changeset':
+        """
+        Читает набор изменений из файла патча.
+        :param filename: Файл патча.
+        :return: Набор изменений.
+        :raises BookManagerError: Файл не найден или не является патчем хранилища.
+        """
+        filename = Path(filename)
+        if not filename.exists():
+            raise BookManagerError(f"The patch file '{filename}' was not found")
+        with open_snapshot(filename, 'r') as f:
+            line_num = 1
+            try:
+                header = json.loads(f.readline() or 'null')
+                if not isinstance(header, dict) or header.get('format') != PATCH_FORMAT:
+                    raise BookManagerError(f"The file '{filename}' is not a repository patch")
+                if header.get('version') != PATCH_VERSION:
+                    raise BookManagerError(f"The patch version {header.get('version')} is not supported")
+                changeset = cls(header['base_books'], header['target_books'])
+                for line_num, line in enumerate(f, start=2):
+                    if line.strip():
+                        changeset._add_operation(*decode_operation(json.loads(line)))
+            except BookManagerError:
+                raise
+            except ValidationError as err:
+                raise BookManagerError(f"Error in the patch on line {line_num}. {err.message}")
+            except (ValueError, KeyError, TypeError):
+                raise BookManagerError(f"Error in the patch on line {line_num}. The line is not a valid operation")
+        return changeset
+
+    def _operations(self) -> Iterator[tuple[PatchOperation, Book | int, bool | None]]:
+        """ Обходит операции набора, удаление книг идёт первым. """
+        yield from ((PatchOperation.REMOVE, _id, None) for _id in self.removed)
+        for op, pairs in ((PatchOperation.ADD, self.added), (PatchOperation.CHANGE, self.changed)):
+            yield from ((op, book, status) for book, status in pairs)
+        yield from ((PatchOperation.STATUS, _id, status) for _id, status in self.statuses)
+
+    def _add_operation(self, op: PatchOperation, item: Book | int, status: bool | None):
+        """ Добавляет в набор операцию, прочитанную из патча. """
+        match op:
+            case PatchOperation.ADD:
+                self.added.append((item, status))
+            case PatchOperation.CHANGE:
+                self.changed.append((item, status))
+            case PatchOperation.STATUS:
+                self.statuses.append((item, status))
+            case PatchOperation.REMOVE:
+                self.removed.append(item)
+
+    @classmethod
+    def _same_book(cls, book: Book, other: Book) -> bool:
+        """ Сравнивает данные двух книг с одинаковым идентификатором. """
+        return (book.title, book.author, book.year) == (other.title, other.author, other.year)
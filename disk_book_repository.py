@@ -0,0 +1,909 @@
+import json
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from abstract_class import AbstractBookRepository
+from background_save import BackgroundSave
+from bitmap import Bitmap
+from book import Book, BookStatus
+from enums import ChangeKind
+from exceptions import BookRepositoryError, BookRepositoryExportException, ValidationError
+from record_store import BookRecord, BookRecordStore
+from repository_export import BookRepositoryExport
+from repository_view import RepositoryView
+from snapshot_io import open_snapshot, SnapshotReader, is_line_delimited
+from validation import validation_id, validation_status, validation_year
+
+
+class PageCache:
+    """
+    LRU-кэш декодированных страниц каталога с ограничением по памяти.
+    Объём страницы оценивается по длине её содержимого на диске, а при превышении бюджета
+    вытесняются страницы, к которым дольше всего не обращались. Страница больше всего бюджета в кэш не попадает.
+    """
+    DECODED_BYTES_PER_BYTE = 2
+    """ Во сколько раз декодированные книги страницы больше её содержимого на диске, по замерам deep_sizeof. """
+
+    def __init__(self, max_bytes: int):
+        """
+        Конструктор класса.
+        :param max_bytes: Бюджет памяти кэша в байтах.
+        """
+        self._max_bytes = max_bytes
+        self._pages: OrderedDict[int, tuple[dict[int, Book], int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+
+    def __contains__(self, page_num: int) -> bool:
+        return page_num in self._pages
+
+    def get(self, page_num: int) -> dict[int, Book] | None:
+        """
+        Возвращает страницу из кэша и отмечает её как последнюю использованную.
+        :return: Книги страницы или None, если страницы в кэше нет.
+        """
+        entry = self._pages.get(page_num)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._pages.move_to_end(page_num)
+        return entry[0]
+
+    def put(self, page_num: int, books: dict[int, Book], page_bytes: int, prefetched: bool = False):
+        """
+        Помещает страницу в кэш, вытесняя давно не использованные страницы при превышении бюджета.
+        :param page_num: Номер страницы.
+        :param books: Книги страницы.
+        :param page_bytes: Длина содержимого страницы на диске без дополнения.
+        :param prefetched: Страница прочитана заранее, а не по запросу.
+        """
+        self.discard(page_num)
+        size = page_bytes * self.DECODED_BYTES_PER_BYTE
+        if size > self._max_bytes:
+            return
+        self._pages[page_num] = (books, size)
+        self._bytes += size
+        if prefetched:
+            self.prefetched += 1
+        while self._bytes > self._max_bytes:
+            _, (_, evicted_size) = self._pages.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def discard(self, page_num: int):
+        """ Удаляет страницу из кэша. """
+        entry = self._pages.pop(page_num, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self):
+        """ Удаляет из кэша все страницы, статистика при этом сохраняется. """
+        self._pages.clear()
+        self._bytes = 0
+
+    def statistics(self) -> dict[str, int]:
+        """
+        Статистика кэша.
+        :return: Словарь с количеством попаданий, промахов, вытеснений, заранее прочитанных страниц,
+            а также с количеством страниц в кэше, их объёмом и бюджетом памяти.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'prefetched': self.prefetched, 'pages': len(self._pages), 'bytes': self._bytes,
+                'max_bytes': self._max_bytes}
+
+
+class _PageSnapshot:
+    """
+    Снимок каталога для фонового сохранения и представлений.
+    Индекс и статусы копируются в память, а страницы копируются при записи: перед тем как хранилище перепишет
+    страницу, её прежнее содержимое дописывается во временный файл снимка. Непереписанные страницы читаются
+    из файла страниц хранилища, поэтому снимок берётся без копирования файла страниц и каталог целиком
+    в память не загружается. Временный файл удаляется, когда на снимок больше нет ссылок.
+    """
+    def __init__(self, book_repository: 'DiskBookRepository'):
+        """
+        Конструктор класса, вызывается под блокировкой хранилища.
+        :param book_repository: Хранилище, снимок которого берётся.
+        """
+        self._book_repository: 'DiskBookRepository | None' = book_repository
+        self._index = dict(book_repository._index)
+        self._available = book_repository._available.copy()
+        self._page_size = book_repository._page_size
+        self._number_of_pages = book_repository._number_of_pages
+        self._pages: dict[int, int] = {}
+        """ Смещения скопированных страниц во временном файле снимка. """
+        self._file = None
+        self._finalizer = None
+        self._lock = threading.Lock()
+        book_repository._snapshots.add(self)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, _id) -> bool:
+        return _id in self._index
+
+    def __iter__(self) -> Iterator[int]:
+        """ Обходит идентификаторы книг. """
+        return iter(self._index)
+
+    def get(self, _id: int) -> BookRecord | None:
+        """ Возвращает запись книги или None, если книги с указанным идентификатором в снимке нет. """
+        page_num = self._index.get(_id)
+        if page_num is None:
+            return None
+        return BookRecord(DiskBookRepository._get_book(self._read_page(page_num), page_num, _id), self._available[_id])
+
+    def books(self) -> Iterator[Book]:
+        """ Обходит книги снимка в порядке страниц. """
+        for page_num in range(self._number_of_pages):
+            yield from self._read_page(page_num).values()
+
+    def records(self) -> Iterator[BookRecord]:
+        """ Обходит записи книг снимка в порядке страниц. """
+        for book in self.books():
+            yield BookRecord(book, self._available[book.id])
+
+    def count_available(self) -> int:
+        """ Количество книг в наличии. """
+        return self._available.count()
+
+    def close(self):
+        """ Отсоединяет снимок от хранилища, закрывает и удаляет временный файл снимка. """
+        book_repository = self._book_repository
+        if book_repository is not None:
+            with book_repository._lock:
+                book_repository._snapshots.discard(self)
+                self._book_repository = None
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def preserve(self, page_num: int, data: bytes):
+        """
+        Сохраняет прежнее содержимое страницы перед её перезаписью, вызывается под блокировкой хранилища.
+        Страницы, которых не было в снимке или которые уже скопированы, не сохраняются.
+        :param page_num: Номер страницы.
+        :param data: Содержимое страницы в файле страниц хранилища.
+        """
+        if not self.needs_page(page_num):
+            return
+        with self._lock:
+            if self._file is None:
+                book_repository = self._book_repository
+                fd, filename = tempfile.mkstemp(prefix=book_repository._filename.name + '.',
+                                                suffix='.snapshot', dir=book_repository._filename.parent)
+                self._file = os.fdopen(fd, 'w+b')
+                self._finalizer = weakref.finalize(self, self._remove, self._file, Path(filename))
+            offset = len(self._pages) * self._page_size
+            self._file.seek(offset)
+            self._file.write(data.ljust(self._page_size, b' '))
+            self._file.flush()
+            self._pages[page_num] = offset
+
+    def needs_page(self, page_num: int) -> bool:
+        """ Проверяет, что страница есть в снимке и ещё не скопирована. """
+        return page_num < self._number_of_pages and page_num not in self._pages
+
+    def detach(self):
+        """
+        Копирует все ещё не скопированные страницы и отсоединяет снимок от хранилища.
+        Вызывается под блокировкой хранилища перед тем, как файл страниц закрывается или заменяется.
+        """
+        book_repository = self._book_repository
+        for page_num in range(self._number_of_pages):
+            if self.needs_page(page_num):
+                self.preserve(page_num, book_repository._read_page_data(page_num))
+        self._book_repository = None
+
+    def _read_page(self, page_num: int) -> dict[int, Book]:
+        """ Читает страницу из файла страниц хранилища или, если она уже переписана, из копии снимка. """
+        data = None
+        book_repository = self._book_repository
+        if book_repository is not None:
+            with book_repository._lock:
+                if self._book_repository is not None and self.needs_page(page_num):
+                    data = book_repository._read_page_data(page_num)
+        if data is None:
+            with self._lock:
+                self._file.seek(self._pages[page_num])
+                data = self._file.read(self._page_size)
+        return DiskBookRepository._decode_page(data)
+
+    @staticmethod
+    def _remove(file, filename: Path):
+        """ Закрывает и удаляет временный файл. """
+        file.close()
+        filename.unlink(missing_ok=True)
+
+
+class _PageRecords:
+    """
+    Записи каталога для записи снимка.
+    Записи читаются со страниц при каждом обходе, поэтому снимок пишется без загрузки каталога в память.
+    """
+    def __init__(self, book_repository: 'DiskBookRepository'):
+        self._book_repository = book_repository
+
+    def __len__(self) -> int:
+        return self._book_repository.number_of_books
+
+    def records(self) -> Iterator[BookRecord]:
+        """ Обходит записи книг в порядке страниц. """
+        return (BookRecord(book, status.value) for book, status in self._book_repository.iter_books_with_status())
+
+
+class DiskBookRepository(AbstractBookRepository):
+    """
+    Хранилище книг, которое держит книги на диске в файле из страниц фиксированного размера.
+    В памяти находятся только индекс {идентификатор: номер страницы}, битовая карта статусов
+    и ограниченный по памяти LRU-кэш декодированных страниц, поэтому каталог не обязан помещаться в память целиком.
+    Страница это JSON-массив книг, дополненный пробелами до размера страницы.
+    Индекс и статусы сохраняются в файл индекса рядом с файлом страниц при вызове flush() и close().
+    Пока страницы изменены после сохранения индекса, рядом лежит файл-отметка, и если после сбоя отметка осталась,
+    то при открытии индекс перестраивается по страницам.
+    """
+    PAGE_SIZE = 16 * 1024
+    MIN_PAGE_SIZE = 1024
+    """ Минимальный размер страницы, в который гарантированно помещается любая книга. """
+    CACHE_BYTES = 8 * 1024 * 1024
+    INDEX_SUFFIX = '.index.json'
+    DIRTY_SUFFIX = '.dirty'
+    LOAD_BATCH = 1000
+    """ Количество строк снимка, которые разбираются перед записью в страницы. """
+
+    def __init__(self, filename, page_size: int = PAGE_SIZE, cache_bytes: int = CACHE_BYTES,
+                 prefetch_pages: int = 0):
+        """
+        Конструктор класса.
+        Если файл страниц уже существует, то каталог открывается вместе с его индексом.
+        :param filename: Файл страниц каталога.
+        :param page_size: Размер страницы в байтах, для существующего каталога берётся из его индекса.
+        :param cache_bytes: Бюджет памяти кэша страниц в байтах.
+        :param prefetch_pages: Количество страниц, которые при последовательном обходе читаются заранее.
+        :raises BookRepositoryError: Слишком маленький размер страницы;
+                                     Файл индекса существующего каталога не найден.
+        """
+        super().__init__()
+        if page_size < self.MIN_PAGE_SIZE:
+            raise BookRepositoryError(f"The page size must be at least {self.MIN_PAGE_SIZE} bytes")
+        self._filename = Path(filename)
+        self._index_filename = self._filename.with_name(self._filename.name + self.INDEX_SUFFIX)
+        self._dirty_filename = self._filename.with_name(self._filename.name + self.DIRTY_SUFFIX)
+        self._dirty = False
+        """ Страницы изменены после последнего сохранения индекса. """
+        self._page_size = page_size
+        self._prefetch_pages = prefetch_pages
+        self._cache = PageCache(cache_bytes)
+        self._index: dict[int, int] = {}
+        """ Номера страниц книг. """
+        self._available = Bitmap()
+        """ Битовая карта книг в наличии. """
+        self._number_of_pages = 0
+        self._last_page_bytes = 0
+        """ Длина содержимого последней страницы без дополнения. """
+        self._dead_entries = 0
+        """ Количество удалённых и перемещённых книг, место которых на страницах ещё не освобождено. """
+        self._snapshots: weakref.WeakSet[_PageSnapshot] = weakref.WeakSet()
+        """ Снимки, которым перед перезаписью страниц надо сохранить их прежнее содержимое. """
+        # Файл страниц и кэш общие для всех потоков.
+        self._lock = threading.RLock()
+        if self._filename.exists():
+            if not self._index_filename.exists():
+                raise BookRepositoryError(f"The index file '{self._index_filename}' of the catalog was not found")
+            self._read_index()
+            self._file = open(self._filename, 'r+b')
+            if self._dirty_filename.exists():
+                self._dirty = True
+                self._rebuild_index()
+            if self._number_of_pages > 0:
+                self._file.seek((self._number_of_pages - 1) * self._page_size)
+                self._last_page_bytes = len(self._file.read(self._page_size).rstrip(b' '))
+        else:
+            self._file = open(self._filename, 'w+b')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def cache_statistics(self) -> dict[str, int]:
+        """ Статистика кэша страниц. """
+        return self._cache.statistics()
+
+    @property
+    def number_of_pages(self) -> int:
+        """ Количество страниц в файле каталога. """
+        return self._number_of_pages
+
+    def flush(self):
+        """ Сбрасывает страницы на диск и атомарно записывает файл индекса. """
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            pages: list[list[int]] = [[] for _ in range(self._number_of_pages)]
+            for _id, page_num in self._index.items():
+                pages[page_num].append(_id)
+            index = {'page_size': self._page_size, 'last_id': self._last_id, 'pages': pages,
+                     'available': self._available.to_bytes().hex(), 'dead_entries': self._dead_entries}
+            tmp_filename = self._index_filename.with_name(self._index_filename.name + '.tmp')
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_filename, self._index_filename)
+            if self._dirty:
+                self._dirty_filename.unlink(missing_ok=True)
+                self._dirty = False
+
+    def close(self):
+        """ Сохраняет индекс и закрывает файл страниц. """
+        with self._lock:
+            if not self._file.closed:
+                self.flush()
+                self._detach_snapshots()
+                self._file.close()
+
+    def save(self, filename) -> int:
+        """
+        Сохраняет книги в файл снимка в любом из форматов хранилища.
+        Книги читаются со страниц по мере записи, поэтому каталог целиком в память не загружается.
+        Файл создаётся, только если хранилище не пустое.
+        :param filename:
+        :return: Количество сохранённых книг.
+        """
+        self.flush()
+        if self.number_of_books == 0:
+            return 0
+        return self._write_snapshot(filename, _PageRecords(self))
+
+    def save_in_background(self, filename) -> BackgroundSave:
+        """
+        Сохраняет книги в файл в фоновом потоке.
+        Снимок не копирует файл страниц: страницы копируются, только когда хранилище их переписывает,
+        а в файл сохранения книги переписываются по одной странице, поэтому каталог целиком в память не загружается.
+        :param filename:
+        :return: Запущенное фоновое сохранение.
+        """
+        with self._lock:
+            records = _PageSnapshot(self)
+        self._background_save = BackgroundSave(
+            lambda progress: self._write_snapshot(filename, records, progress),
+            len(records), previous=self._background_save).start()
+        return self._background_save
+
+    def view(self) -> RepositoryView:
+        """
+        Возвращает представление каталога только для чтения, закреплённое за текущей версией.
+        Представление копирует в память только индекс и статусы, а страницы копируются, только когда хранилище
+        их переписывает, поэтому ни файл страниц, ни каталог целиком не копируются.
+        """
+        with self._lock:
+            return RepositoryView(_PageSnapshot(self), self._version)
+
+    def load(self, filename) -> int:
+        """
+        Загружает книги из файла снимка в страницы каталога.
+        Снимок разбирается потоково и записывается в страницы пачками, поэтому целиком в памяти не строится.
+        :param filename:
+        :return: Количество книг в каталоге.
+        :raises BookRepositoryError:
+        :raises BookRepositoryExportException:
+        """
+        filename = Path(filename)
+        if not filename.exists():
+            raise BookRepositoryError(f"The file '{filename}' with the saved books was not found")
+        try:
+            with open_snapshot(filename, 'r') as f:
+                if is_line_delimited(filename):
+                    self._load_lines(f)
+                else:
+                    self._load_snapshot(*SnapshotReader(f).read())
+        except BookRepositoryExportException:
+            self._clear()
+            self._publish(ChangeKind.RESET)
+            raise
+        self._version += 1
+        self._publish(ChangeKind.RESET)
+        self.flush()
+        return self.number_of_books
+
+    def _load_lines(self, lines: Iterable[str]):
+        """
+        Загружает построчный снимок.
+        :raises BookRepositoryExportException: Ошибка при экспорте данных с указанием номера строки.
+        """
+        def records() -> Iterator[BookRecord]:
+            batch = BookRecordStore()
+            for line_num, line in enumerate(lines, start=1):
+                if line.strip() == '':
+                    continue
+                try:
+                    _id = BookRepositoryExport.export_line(line, batch)
+                except BookRepositoryExportException as err:
+                    raise BookRepositoryExportException(f"Error when exporting books on line {line_num}. "
+                                                        f"{err.message}")
+                self._last_id = max(self._last_id, _id)
+                if len(batch) >= self.LOAD_BATCH:
+                    yield from batch.records()
+                    batch.clear()
+            yield from batch.records()
+
+        self._append(records())
+
+    def _load_snapshot(self, book_list: Iterable[dict[str: Any]], status_dict: dict[str, Any]):
+        """
+        Загружает снимок в формате [[book, ...], {id: status, ...}].
+        Статусы разбираются после книг, поэтому книги сначала записываются в наличии.
+        :raises BookRepositoryExportException: Ошибка при экспорте данных с указанием номера книги.
+        """
+        def records() -> Iterator[BookRecord]:
+            for row_num, _book in enumerate(book_list, start=1):
+                try:
+                    book = Book(_book['_title'], _book['_author'], _book['_year'])
+                    book.set_id(_book['_id'])
+                except ValidationError as err:
+                    raise BookRepositoryExportException(f"Error when exporting books number {row_num}. "
+                                                        f"{err.message}: {err.var_name} = {err.value}")
+                except KeyError as err:
+                    raise BookRepositoryExportException(f"Error when exporting books number {row_num}. "
+                                                        f"The {err.args[0][1:]} data is missing")
+                self._last_id = max(self._last_id, book.id)
+                yield BookRecord(book, BookStatus.AVAILABLE.value)
+
+        self._append(records())
+        for row_num, (_id, status) in enumerate(status_dict.items(), start=1):
+            try:
+                _id = validation_id(_id)
+                status = validation_status(status)
+            except ValidationError as err:
+                raise BookRepositoryExportException(f"Error when exporting books number {row_num}. "
+                                                    f"{err.message}: {err.var_name} = {err.value}")
+            # Статусы книг, которых нет в каталоге, не сохраняются.
+            if _id in self._index:
+                self._available[_id] = status
+
+    @property
+    def number_of_books(self) -> int:
+        """ Количество книг в хранилище. """
+        return len(self._index)
+
+    def count_by_status(self) -> dict[BookStatus, int]:
+        """
+        Подсчитывает количество книг с каждым статусом по битовой карте, не читая страниц.
+        :return: Словарь {статус: количество книг}.
+        """
+        available = self._available.count()
+        return {BookStatus.AVAILABLE: available, BookStatus.GIVEN_OUT: len(self._index) - available}
+
+    def status_bitmap(self, status: BookStatus) -> Bitmap:
+        """
+        Возвращает битовую карту идентификаторов книг с указанным статусом, не читая страниц.
+        :param status: Статус книг.
+        """
+        if status == BookStatus.AVAILABLE:
+            return self._available.copy()
+        return Bitmap.from_indexes(self._index) - self._available
+
+    def iter_books_with_status(self) -> Iterator[tuple[Book, BookStatus]]:
+        """
+        Обходит книги каталога вместе с их статусами в порядке страниц.
+        Страницы читаются через кэш, а при включённом упреждающем чтении следующие страницы читаются заранее.
+        :return: Генератор пар (книга, статус).
+        """
+        for book in self._iter_books():
+            yield book, BookStatus.get_status(self._available[book.id])
+
+    @property
+    def all_books(self) -> tuple[Book, ...]:
+        """ Возвращает всё книги из хранилища. """
+        return tuple(self._iter_books())
+
+    def add_book(self, book: Book) -> int:
+        """
+        Добавляет книгу в хранилище.
+        :param book: Добавляемая книга.
+        :return: Идентификатор добавленной в хранилище книги.
+        """
+        with self._lock:
+            self._last_id += 1
+            book.set_id(self._last_id)
+            self._append((BookRecord(book, BookStatus.AVAILABLE.value),))
+            self._version += 1
+            self._publish(ChangeKind.ADD, (BookRecord(book, BookStatus.AVAILABLE.value),))
+        return book.id
+
+    def add_books(self, books: Iterable[Book]) -> tuple[int, ...]:
+        """
+        Добавляет пачку книг в хранилище, каждая страница при этом записывается один раз.
+        :param books: Добавляемые книги.
+        :return: Идентификаторы добавленных книг.
+        """
+        added: list[Book] = []
+
+        def records() -> Iterator[BookRecord]:
+            for book in books:
+                self._last_id += 1
+                book.set_id(self._last_id)
+                added.append(book)
+                yield BookRecord(book, BookStatus.AVAILABLE.value)
+
+        with self._lock:
+            self._append(records())
+            self._version += len(added)
+            if added:
+                self._publish(ChangeKind.ADD, (BookRecord(book, BookStatus.AVAILABLE.value) for book in added))
+        return tuple(book.id for book in added)
+
+    def compact(self, renumber: bool = False) -> tuple[int, dict[int, int]]:
+        """
+        Уплотняет каталог: переписывает книги в новый файл страниц без пустого места,
+        оставшегося от удалённых книг, и при необходимости перенумеровывает книги.
+        :param renumber: Перенумеровать книги, убрав пропуски в идентификаторах.
+        :return: Кортеж (количество освобождённых записей, таблица {старый идентификатор: новый идентификатор}).
+        """
+        id_mapping: dict[int, int] = {}
+
+        def records() -> Iterator[BookRecord]:
+            if not renumber:
+                yield from (BookRecord(book, status.value) for book, status in self.iter_books_with_status())
+                return
+            for new_id, old_id in enumerate(sorted(self._index), start=1):
+                book = self.get_book_by_id(old_id)
+                status = self._available[old_id]
+                if new_id != old_id:
+                    book = Book.from_validated(book.title, book.author, book.year)
+                    book.set_id(new_id)
+                    id_mapping[old_id] = new_id
+                yield BookRecord(book, status)
+
+        with self._lock:
+            tmp_filename = self._filename.with_name(self._filename.name + '.tmp')
+            for filename in (tmp_filename, tmp_filename.with_name(tmp_filename.name + self.INDEX_SUFFIX)):
+                filename.unlink(missing_ok=True)
+            with DiskBookRepository(tmp_filename, self._page_size, cache_bytes=0) as compacted:
+                compacted._append(records())
+                compacted._last_id = len(self._index) if renumber else self._last_id
+            removed = self._dead_entries
+            self._detach_snapshots()
+            self._file.close()
+            os.replace(tmp_filename, self._filename)
+            os.replace(compacted._index_filename, self._index_filename)
+            if self._dirty:
+                self._dirty_filename.unlink(missing_ok=True)
+                self._dirty = False
+            self._read_index()
+            self._file = open(self._filename, 'r+b')
+            self._last_page_bytes = compacted._last_page_bytes
+            self._cache.clear()
+            if id_mapping:
+                self._version += 1
+                self._publish(ChangeKind.RESET)
+        return removed, id_mapping
+
+    def get_status_book(self, _id) -> BookStatus:
+        """
+        Возвращает статус книги
+        :param _id:
+        :return:
+        :raises BookRepositoryError: Книга с указанным идентификатором отсутствует;
+        """
+        if _id not in self._index:
+            raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+        return BookStatus.get_status(self._available[_id])
+
+    def changing_status_book(self, _id: int, status: bool | BookStatus) -> Book:
+        """
+        Изменяет статус книги, переключая её бит в битовой карте, страница книги при этом не переписывается.
+        :param _id: Идентификатор книги, статус которой надо изменить.
+        :param status: Новый статус книги.
+        :return: Книга с изменённым статусом.
+        :raises BookRepositoryError: Изменить статус книги невозможно, так как хранилище пустое;
+                                     Книга с указанным идентификатором отсутствует;
+                                     Статус должен быть логическим значением.
+        """
+        self._is_repository_empty('changing status')
+        try:
+            status = validation_status(status)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        with self._lock:
+            page_num = self._index.get(_id)
+            if page_num is None:
+                raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+            book = self._get_book(self._read_page(page_num), page_num, _id)
+            self._available[_id] = status
+            self._version += 1
+            self._publish(ChangeKind.STATUS, (BookRecord(book, status),))
+            return book
+
+    def remove_book(self, _id: int) -> Book:
+        """
+        Удаляет книгу из хранилища, переписывая её страницу.
+        :param _id: Идентификатор удаляемой книги.
+        :return: Удалённая книга.
+        :raises BookRepositoryError: Удалить книги невозможно, так как хранилище пустое;
+                                     Книга с указанным идентификатором отсутствует.
+        """
+        self._is_repository_empty('delete')
+        with self._lock:
+            page_num = self._index.get(_id)
+            if page_num is None:
+                raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+            books = dict(self._read_page(page_num))
+            book = self._get_book(books, page_num, _id)
+            del books[_id]
+            self._write_page(page_num, books)
+            del self._index[_id]
+            self._dead_entries += 1
+            record = BookRecord(book, self._available[_id])
+            self._available.clear(_id)
+            self._version += 1
+            self._publish(ChangeKind.REMOVE, (record,))
+        return book
+
+    def get_book_by_id(self, _id: int) -> Book | None:
+        """
+        Получение книги по её идентификатору, страница книги читается через кэш.
+        :param _id: Идентификатор книги, которую требуется вернуть.
+        :return: Найденная по указанному идентификатору книга или None, если книги с таим идентификатором нет.
+        :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
+        """
+        try:
+            _id = validation_id(_id)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        with self._lock:
+            page_num = self._index.get(_id)
+            return None if page_num is None else self._get_book(self._read_page(page_num), page_num, _id)
+
+    def get_book_with_status(self, _id: int) -> tuple[Book, BookStatus] | None:
+        """
+        Получение книги вместе с её статусом по идентификатору книги.
+        :param _id: Идентификатор книги, которую требуется вернуть.
+        :return: Пара (книга, статус) или None, если книги с таким идентификатором нет.
+        :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
+        """
+        book = self.get_book_by_id(_id)
+        return None if book is None else (book, BookStatus.get_status(self._available[book.id]))
+
+    def find_book_by_author(self, author: str) -> tuple[Book, ...]:
+        """ Поиск книг по автору. """
+        author = author.strip().lower()
+        if author == "":
+            return ()
+        return self._find(lambda b: author in b.author.lower())
+
+    def find_book_by_title(self, title: str) -> tuple[Book, ...]:
+        """ Поиск книг по заголовку. """
+        title = title.strip().lower()
+        # При пустом запросе должен вернуться пустой кортеж
+        if title == "":
+            return ()
+        return self._find(lambda b: title in b.title.lower())
+
+    def find_book_by_year(self, year: int) -> tuple[Book, ...]:
+        """
+        Поиск книг по году издания.
+        :param year:
+        :return:
+        :raises BookRepositoryError: Ошибка при указании года выпуска книги.
+        """
+        try:
+            year = validation_year(year)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        return self._find(lambda b: b.year == year)
+
+    def _find(self, predicate: Callable[[Book], bool]) -> tuple[Book, ...]:
+        """ Ищет книги, обходя страницы через кэш. """
+        return tuple(filter(predicate, self._iter_books()))
+
+    def _iter_books(self) -> Iterator[Book]:
+        """ Обходит книги в порядке страниц, пропуская пустые страницы. """
+        for page_num in range(self._number_of_pages):
+            with self._lock:
+                books = list(self._read_page(page_num, prefetch=True).values())
+            yield from books
+
+    def _read_page_data(self, page_num: int) -> bytes:
+        """ Читает содержимое страницы с диска в обход кэша. """
+        with self._lock:
+            self._file.seek(page_num * self._page_size)
+            return self._file.read(self._page_size)
+
+    def _read_page(self, page_num: int, prefetch: bool = False) -> dict[int, Book]:
+        """
+        Возвращает книги страницы, при промахе кэша читая страницу с диска.
+        Возвращённый словарь общий с кэшем и не должен изменяться.
+        :param page_num: Номер страницы.
+        :param prefetch: Вместе со страницей прочитать заранее следующие страницы одним чтением.
+        :return: Словарь {идентификатор: книга}.
+        """
+        with self._lock:
+            books = self._cache.get(page_num)
+            if books is not None:
+                return books
+            count = 1 + (min(self._prefetch_pages, self._number_of_pages - page_num - 1) if prefetch else 0)
+            self._file.seek(page_num * self._page_size)
+            data = self._file.read(count * self._page_size)
+            pages = [data[i * self._page_size:(i + 1) * self._page_size].rstrip(b' ') for i in range(count)]
+            books = self._decode_page(pages[0])
+            self._cache.put(page_num, books, len(pages[0]))
+            for i in range(1, count):
+                if page_num + i not in self._cache:
+                    self._cache.put(page_num + i, self._decode_page(pages[i]), len(pages[i]), prefetched=True)
+            return books
+
+    def _write_page(self, page_num: int, books: dict[int, Book]):
+        """
+        Записывает страницу на диск и в кэш.
+        :param page_num: Номер страницы, может быть на единицу больше номера последней страницы.
+        :param books: Книги страницы, после записи словарь не должен изменяться.
+        """
+        data = self._encode_page(books)
+        with self._lock:
+            self._mark_dirty()
+            snapshots = [snapshot for snapshot in self._snapshots if snapshot.needs_page(page_num)]
+            if snapshots:
+                old_data = self._read_page_data(page_num)
+                for snapshot in snapshots:
+                    snapshot.preserve(page_num, old_data)
+            self._file.seek(page_num * self._page_size)
+            self._file.write(data.ljust(self._page_size, b' '))
+            self._cache.put(page_num, books, len(data))
+            if page_num >= self._number_of_pages - 1:
+                self._number_of_pages = page_num + 1
+                self._last_page_bytes = len(data)
+
+    def _append(self, records: Iterable[BookRecord]):
+        """
+        Дописывает книги на последнюю страницу, начиная новую страницу, когда книга не помещается.
+        Книга с уже существующим идентификатором заменяется.
+        """
+        with self._lock:
+            page_num = max(self._number_of_pages - 1, 0)
+            books = dict(self._read_page(page_num)) if self._number_of_pages > 0 else {}
+            used = self._last_page_bytes if self._number_of_pages > 0 else 2
+            changed = False
+            for book, status in records:
+                old_page_num = self._index.get(book.id)
+                if old_page_num is not None and old_page_num != page_num:
+                    old_books = dict(self._read_page(old_page_num))
+                    old_books.pop(book.id, None)
+                    self._write_page(old_page_num, old_books)
+                    self._dead_entries += 1
+                # Заменённая на текущей странице книга остаётся в подсчёте длины, поэтому длина только завышается.
+                size = len(self._encode_book(book)) + (1 if books else 0)
+                if books and used + size > self._page_size:
+                    self._write_page(page_num, books)
+                    page_num += 1
+                    books = {}
+                    used = 2
+                    size -= 1
+                books[book.id] = book
+                used += size
+                self._index[book.id] = page_num
+                self._available[book.id] = status
+                changed = True
+            if changed:
+                self._write_page(page_num, books)
+
+    def _clear(self):
+        """ Удаляет все книги из каталога. """
+        with self._lock:
+            self._detach_snapshots()
+            self._mark_dirty()
+            self._file.truncate(0)
+            self._index = {}
+            self._available = Bitmap()
+            self._number_of_pages = 0
+            self._last_page_bytes = 0
+            self._dead_entries = 0
+            self._cache.clear()
+
+    def _mark_dirty(self):
+        """ Перед первым изменением страниц после сохранения индекса создаёт файл-отметку. """
+        if not self._dirty:
+            self._dirty_filename.touch()
+            self._dirty = True
+
+    def _detach_snapshots(self):
+        """ Отсоединяет снимки от файла страниц, который закрывается или заменяется, скопировав их страницы. """
+        with self._lock:
+            for snapshot in list(self._snapshots):
+                snapshot.detach()
+            self._snapshots.clear()
+
+    def _read_index(self):
+        """
+        Читает файл индекса каталога.
+        :raises BookRepositoryError: Файл индекса повреждён.
+        """
+        with open(self._index_filename, 'r', encoding='utf-8') as f:
+            try:
+                index = json.load(f)
+                self._page_size = index['page_size']
+                self._last_id = index['last_id']
+                pages = index['pages']
+                self._available = Bitmap.from_bytes(bytes.fromhex(index['available']))
+                self._dead_entries = index.get('dead_entries', 0)
+            except (ValueError, KeyError, TypeError):
+                raise BookRepositoryError(f"The index file '{self._index_filename}' of the catalog is corrupted")
+        self._index = {_id: page_num for page_num, ids in enumerate(pages) for _id in ids}
+        self._number_of_pages = len(pages)
+
+    def _rebuild_index(self):
+        """
+        Перестраивает индекс по страницам каталога, если после сохранения индекса страницы менялись.
+        Статусы книг, которых нет в прежнем индексе, считаются статусом в наличии, а удалённых книг сбрасываются.
+        Перестроенный индекс сразу записывается в файл индекса.
+        """
+        with self._lock:
+            number_of_pages = os.fstat(self._file.fileno()).st_size // self._page_size
+            index: dict[int, int] = {}
+            for page_num in range(number_of_pages):
+                try:
+                    books = self._decode_page(self._read_page_data(page_num))
+                except (ValueError, TypeError):
+                    raise BookRepositoryError(f"The page {page_num} of the catalog '{self._filename}' is corrupted")
+                for _id in books:
+                    index[_id] = page_num
+            for _id in self._index.keys() - index.keys():
+                self._available.clear(_id)
+            for _id in index.keys() - self._index.keys():
+                self._available[_id] = BookStatus.AVAILABLE.value
+            self._index = index
+            self._number_of_pages = number_of_pages
+            self._last_id = max(self._last_id, max(index, default=0))
+            self.flush()
+
+    @staticmethod
+    def _get_book(books: dict[int, Book], page_num: int, _id: int) -> Book:
+        """
+        Возвращает книгу со страницы, на которую указывает индекс.
+        :raises BookRepositoryError: Книги на странице нет, индекс каталога устарел.
+        """
+        book = books.get(_id)
+        if book is None:
+            raise BookRepositoryError(f"The book with the ID {_id} is missing from page {page_num} of the catalog, "
+                                      f"the catalog index is out of date")
+        return book
+
+    @classmethod
+    def _encode_book(cls, book: Book) -> bytes:
+        """ Кодирует книгу в JSON-массив [id, title, author, year]. """
+        return json.dumps([book.id, book.title, book.author, book.year], ensure_ascii=False).encode()
+
+    @classmethod
+    def _encode_page(cls, books: dict[int, Book]) -> bytes:
+        """ Кодирует книги страницы в JSON-массив. """
+        return b'[' + b','.join(cls._encode_book(book) for book in books.values()) + b']'
+
+    @classmethod
+    def _decode_page(cls, data: bytes) -> dict[int, Book]:
+        """ Декодирует страницу, книги на странице уже проверены при записи. """
+        books: dict[int, Book] = {}
+        for _id, title, author, year in json.loads(data):
+            book = Book.from_validated(title, author, year)
+            book.set_id(_id)
+            books[_id] = book
+        return books
+
+    def _is_repository_empty(self, action: str):
+        """
+        Проверка на пустое хранилище.
+        :raises BookRepositoryError: Удалить книги невозможно, так как хранилище пустое.
+        """
+        if self.number_of_books == 0:
+            raise BookRepositoryError(f"It is impossible to {action} books because the repository is empty.")
@@ -26,6 +26,23 @@ class SearchCriteria(StrEnum):
                 raise ValueError("Invalid value of the search criteria")
 
 
+class PatchOperation(StrEnum):
+    """ Операции патча хранилища. """
+    ADD = '+'
+    CHANGE = '~'
+    STATUS = 's'
+    REMOVE = '-'
+
+
+class ChangeKind(StrEnum):
+    """ Виды событий ленты изменений хранилища. """
+    ADD = 'add'
+    PUT = 'put'
+    STATUS = 'status'
+    REMOVE = 'remove'
+    RESET = 'reset'
+
+
 class BookStatus(Enum):
     """ Статус книги в библиотеке. """
     AVAILABLE = True
@@ -1,10 +1,37 @@
+import atexit
+import functools
 import logging
 import os
+import queue
+import sys
+import threading
+import time
 from pathlib import Path
+from typing import Callable
 
-import platform
 
-CLEAR_COMMAND = 'clear' if platform.system() == 'Linux' else "cls"
+CLEAR_SCREEN = "\033[2J\033[H"
+""" ANSI-последовательность, которая очищает экран и переводит курсор в начало. """
+
+
+@functools.cache
+def enable_ansi():
+    """
+    Включает обработку ANSI-последовательностей в консоли Windows, выполняется только при первом вызове.
+    Режим консоли устанавливается напрямую через WinAPI, без запуска отдельного процесса.
+    """
+    if os.name != 'nt':
+        return
+    import ctypes
+
+    std_output_handle = -11
+    enable_virtual_terminal_processing = 0x0004
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(std_output_handle)
+    mode = ctypes.c_ulong()
+    # Если вывод перенаправлен не в консоль, то режим получить нельзя и менять его не нужно.
+    if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        kernel32.SetConsoleMode(handle, mode.value | enable_virtual_terminal_processing)
 
 
 def get_root_path():
@@ -12,25 +39,88 @@ def get_root_path():
     return Path(__file__).resolve().parent
 
 
+class _DeferredQueueHandler(logging.Handler):
+    """
+    Обработчик логгера, который передаёт записи в очередь журнала.
+    Очередь, поток записи и файл журнала создаются только при первой записи.
+    """
+    def emit(self, record: logging.LogRecord):
+        Logger.get_queue_handler().emit(record)
+
+
 class Logger:
-    """ Класс логгера """
-    log_dir = get_root_path() / "logs"
-    if not log_dir.exists():
-        log_dir.mkdir()
+    """
+    Класс логгера.
+    Логгеры только кладут записи в очередь, а в файл их пишет отдельный поток,
+    поэтому запись в файл не задерживает вызывающий код.
+    Файл журнала ротируется по размеру, а каталог и файл журнала создаются только при первой записи.
+    Каталог журнала и уровень логгеров можно задать переменными окружения LIBRARY_LOG_DIR и LIBRARY_LOG_LEVEL.
+    """
+    LOG_DIR_VARIABLE = 'LIBRARY_LOG_DIR'
+    LOG_LEVEL_VARIABLE = 'LIBRARY_LOG_LEVEL'
+    log_dir = Path(os.environ.get(LOG_DIR_VARIABLE) or get_root_path() / "logs")
     LOGGER_FILENAME = log_dir / "library.log"
+    MAX_BYTES = 5 * 1024 * 1024
+    """ Размер файла журнала, после которого он ротируется. """
+    BACKUP_COUNT = 3
+    """ Количество хранимых старых файлов журнала. """
+    FORMAT = "%(name)s %(asctime)s %(levelname)s %(message)s"
 
     _loggers = {}
+    _lock = threading.Lock()
+    _queue_handler: 'logging.handlers.QueueHandler | None' = None
+    _listener: 'logging.handlers.QueueListener | None' = None
     logger_level = logging.ERROR
 
     @classmethod
     def get_logger(cls, logger_name, logger_level: int = logger_level):
         """
         Возвращает логгер.
+        Обработчик добавляется логгеру только при первом обращении.
         :param logger_name: Наименование логгера.
         :param logger_level: Уровень отображения информации логеера.
         :return:
         """
-        return cls._loggers.setdefault(logger_name, cls._create_logger(logger_name, logger_level))
+        with cls._lock:
+            if logger_name not in cls._loggers:
+                cls._loggers[logger_name] = cls._create_logger(logger_name, logger_level)
+            return cls._loggers[logger_name]
+
+    @classmethod
+    def get_level(cls, default_level: int = logging.INFO) -> int:
+        """
+        Возвращает уровень логгеров из переменной окружения LIBRARY_LOG_LEVEL.
+        :param default_level: Уровень, если переменная не задана или задана неверно.
+        :return: Уровень логгера, например logging.DEBUG для значения "DEBUG" или "10".
+        """
+        level = os.environ.get(cls.LOG_LEVEL_VARIABLE, '').strip().upper()
+        if level.isdigit():
+            return int(level)
+        level = logging.getLevelName(level)
+        return level if isinstance(level, int) else default_level
+
+    @classmethod
+    def set_log_dir(cls, log_dir: Path):
+        """ Задаёт каталог журнала; действует, только пока поток записи журнала не запущен. """
+        cls.log_dir = Path(log_dir)
+        cls.LOGGER_FILENAME = cls.log_dir / "library.log"
+
+    @classmethod
+    def get_queue_handler(cls) -> 'logging.handlers.QueueHandler':
+        """ Возвращает обработчик очереди журнала, при первом вызове запуская поток записи журнала. """
+        with cls._lock:
+            if cls._listener is None:
+                cls._start_listener()
+            return cls._queue_handler
+
+    @classmethod
+    def shutdown(cls):
+        """ Останавливает поток записи журнала, дописав все записи из очереди. """
+        with cls._lock:
+            if cls._listener is not None:
+                cls._listener.stop()
+                cls._listener.handlers[0].close()
+                cls._listener = None
 
     @classmethod
     def _create_logger(cls, logger_name, logger_level: int = logger_level):
@@ -40,20 +130,64 @@ class Logger:
         :param logger_level: Уровень отображения информации логгера.
         :return:
         """
-
         logger = logging.getLogger(logger_name)
-        logger_handler = logging.FileHandler(cls.LOGGER_FILENAME, mode='a', encoding='utf-8')
-        logger_formatter = logging.Formatter("%(name)s %(asctime)s %(levelname)s %(message)s")
-        logger_handler.setFormatter(logger_formatter)
-        logger.addHandler(logger_handler)
-
+        logger.addHandler(_DeferredQueueHandler())
         logger.setLevel(logger_level)
         return logger
 
+    @classmethod
+    def _start_listener(cls):
+        """ Запускает поток, который пишет записи из очереди в файл журнала. """
+        from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+        if cls._queue_handler is None:
+            cls._queue_handler = QueueHandler(queue.SimpleQueue())
+            atexit.register(cls.shutdown)
+        cls.log_dir.mkdir(exist_ok=True)
+        logger_handler = RotatingFileHandler(cls.LOGGER_FILENAME, mode='a', maxBytes=cls.MAX_BYTES,
+                                             backupCount=cls.BACKUP_COUNT, encoding='utf-8', delay=True)
+        logger_handler.setFormatter(logging.Formatter(cls.FORMAT))
+        cls._listener = QueueListener(cls._queue_handler.queue, logger_handler)
+        cls._listener.start()
+
+
+def log_timing(logger: logging.Logger, operation: str) -> Callable:
+    """
+    Декоратор, который пишет в журнал запись о времени выполнения операции.
+    Запись имеет вид "timing operation=<операция> duration_ms=<время> status=<ok|error>",
+    а значения также доступны в полях записи operation, duration_ms и status.
+    Время замеряется, только если для логгера включён уровень DEBUG.
+    :param logger: Логгер, в который пишется запись.
+    :param operation: Наименование операции.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not logger.isEnabledFor(logging.DEBUG):
+                return func(*args, **kwargs)
+            status = 'error'
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                status = 'ok'
+                return result
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                logger.debug("timing operation=%s duration_ms=%.3f status=%s", operation, duration_ms, status,
+                             extra={'operation': operation, 'duration_ms': duration_ms, 'status': status})
+        return wrapper
+    return decorator
+
 
 def clear_display():
-    """ Очищает дисплей. """
-    os.system(CLEAR_COMMAND)
+    """
+    Очищает дисплей ANSI-последовательностью, не запуская отдельный процесс.
+    Если вывод перенаправлен не в терминал, то дисплей не очищается.
+    """
+    if sys.stdout.isatty():
+        enable_ansi()
+        sys.stdout.write(CLEAR_SCREEN)
+        sys.stdout.flush()
 
 
 def print_awaiting_message(msg):
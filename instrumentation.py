@@ -0,0 +1,231 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable
+
+
+MIN_LATENCY_NS = 1_000
+""" Граница первого интервала гистограммы задержек в наносекундах. """
+
+BUCKET_GROWTH = 2 ** 0.25
+""" Во сколько раз каждый следующий интервал гистограммы больше предыдущего. """
+
+NUMBER_OF_BUCKETS = 110
+""" Количество интервалов гистограммы, последний интервал превышает 100 секунд. """
+
+FILE_OPERATIONS = ('load', 'save', 'load_data', 'save_data')
+""" Операции, для которых запоминается размер файла. """
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с интервалами, растущими в геометрической прогрессии.
+    Память не зависит от количества замеров, а процентили вычисляются с точностью до ширины интервала.
+    """
+    _bounds = [int(MIN_LATENCY_NS * BUCKET_GROWTH ** i) for i in range(NUMBER_OF_BUCKETS)]
+
+    def __init__(self):
+        self._counts = [0] * (NUMBER_OF_BUCKETS + 1)
+        self._count = 0
+        self._total_ns = 0
+        self._max_ns = 0
+
+    @property
+    def count(self) -> int:
+        """ Количество замеров. """
+        return self._count
+
+    @property
+    def total_ns(self) -> int:
+        """ Суммарное время замеров в наносекундах. """
+        return self._total_ns
+
+    @property
+    def max_ns(self) -> int:
+        """ Наибольшая задержка в наносекундах. """
+        return self._max_ns
+
+    def add(self, latency_ns: int):
+        """ Добавляет замер. """
+        self._counts[bisect.bisect_left(self._bounds, latency_ns)] += 1
+        self._count += 1
+        self._total_ns += latency_ns
+        if latency_ns > self._max_ns:
+            self._max_ns = latency_ns
+
+    def percentile(self, percent: float) -> int:
+        """
+        Возвращает процентиль задержки.
+        :param percent: Процентиль от 0 до 100.
+        :return: Верхняя граница интервала, в который попадает процентиль, в наносекундах, но не больше наибольшей задержки.
+        """
+        if self._count == 0:
+            return 0
+        rank = self._count * percent / 100
+        cumulative = 0
+        for i, count in enumerate(self._counts):
+            cumulative += count
+            if cumulative >= rank and count > 0:
+                return min(self._bounds[i], self._max_ns) if i < NUMBER_OF_BUCKETS else self._max_ns
+        return self._max_ns
+
+    def cumulative_buckets(self, step: int = 1) -> list[tuple[int, int]]:
+        """
+        Возвращает накопленное количество замеров по границам интервалов.
+        :param step: Шаг по границам, например 4 оставляет каждую четвёртую границу, то есть удвоение задержки.
+        :return: Список (граница в наносекундах, количество замеров не больше границы), без интервала переполнения.
+        """
+        buckets = []
+        cumulative = 0
+        for i in range(NUMBER_OF_BUCKETS):
+            cumulative += self._counts[i]
+            if (i + 1) % step == 0:
+                buckets.append((self._bounds[i], cumulative))
+        return buckets
+
+
+class OperationStats:
+    """ Статистика одной операции: вызовы, ошибки, задержки, размеры результатов и файлов. """
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.result_size_total = 0
+        self.result_size_max = 0
+        self.result_size_count = 0
+        self.file_size = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """ Преобразование статистики в словарь, время указывается в миллисекундах. """
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': self.latency.total_ns / 1e6,
+            'p50_ms': self.latency.percentile(50) / 1e6,
+            'p95_ms': self.latency.percentile(95) / 1e6,
+            'p99_ms': self.latency.percentile(99) / 1e6,
+            'max_ms': self.latency.max_ns / 1e6,
+            'result_size_avg': self.result_size_total / self.result_size_count if self.result_size_count else None,
+            'result_size_max': self.result_size_max if self.result_size_count else None,
+            'file_size': self.file_size,
+        }
+
+
+def _result_size(result: Any) -> int | None:
+    """
+    Определяет размер результата операции.
+    Менеджер книг возвращает кортеж (количество книг, текст), для него размером считается количество книг.
+    """
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], int) and isinstance(result[1], str):
+        return result[0]
+    if isinstance(result, (str, bytes)) or not hasattr(result, '__len__'):
+        return None
+    return len(result)
+
+
+class Instrumentation:
+    """
+    Сбор статистики вызовов публичных методов хранилища и менеджера книг.
+    Включается явно вызовом instrument для нужных объектов, поэтому без него накладных расходов нет.
+    """
+    def __init__(self):
+        self._stats: dict[str, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, obj: Any, prefix: str) -> Any:
+        """
+        Оборачивает публичные методы объекта, чтобы собирать по ним статистику.
+        Свойства и методы, начинающиеся с подчёркивания, не оборачиваются.
+        :param obj: Объект, например хранилище или менеджер книг.
+        :param prefix: Префикс имени операции в статистике, например 'repository'.
+        :return: Тот же объект.
+        """
+        for name in dir(type(obj)):
+            attr = getattr(type(obj), name, None)
+            if name.startswith('_') or isinstance(attr, property) or not callable(attr):
+                continue
+            method = getattr(obj, name)
+            setattr(obj, name, self._wrap(f"{prefix}.{name}", name in FILE_OPERATIONS, method))
+        return obj
+
+    def _wrap(self, operation: str, is_file_operation: bool, method: Callable) -> Callable:
+        """ Создаёт обёртку метода, которая замеряет время вызова и размер результата. """
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                self._record(operation, time.perf_counter_ns() - start, error=True)
+                raise
+            latency_ns = time.perf_counter_ns() - start
+            file_size = None
+            if is_file_operation and args:
+                try:
+                    file_size = os.path.getsize(args[0])
+                except (OSError, TypeError):
+                    pass
+            self._record(operation, latency_ns, _result_size(result), file_size)
+            return result
+        return wrapper
+
+    def _record(self, operation: str, latency_ns: int, result_size: int | None = None,
+                file_size: int | None = None, error: bool = False):
+        """ Добавляет замер операции в статистику. """
+        with self._lock:
+            stats = self._stats.get(operation)
+            if stats is None:
+                stats = self._stats[operation] = OperationStats()
+            stats.calls += 1
+            stats.latency.add(latency_ns)
+            if error:
+                stats.errors += 1
+            if result_size is not None:
+                stats.result_size_total += result_size
+                stats.result_size_count += 1
+                stats.result_size_max = max(stats.result_size_max, result_size)
+            if file_size is not None:
+                stats.file_size = file_size
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """
+        Возвращает статистику по всем операциям.
+        :return: Словарь {операция: статистика}, упорядоченный по имени операции.
+        """
+        with self._lock:
+            return {operation: self._stats[operation].to_dict() for operation in sorted(self._stats)}
+
+    def histograms(self, step: int = 1) -> dict[str, dict[str, Any]]:
+        """
+        Возвращает счётчики и гистограммы задержек всех операций, например для выгрузки метрик.
+        :param step: Шаг по границам интервалов гистограммы.
+        :return: Словарь {операция: {'calls', 'errors', 'sum_ns', 'buckets'}}, где buckets как у cumulative_buckets.
+        """
+        with self._lock:
+            return {operation: {'calls': stats.calls, 'errors': stats.errors, 'sum_ns': stats.latency.total_ns,
+                                'buckets': stats.latency.cumulative_buckets(step)}
+                    for operation, stats in sorted(self._stats.items())}
+
+    def to_json(self) -> str:
+        """ Сериализация статистики в JSON. """
+        return json.dumps(self.snapshot(), indent=2)
+
+    def dump(self, filename):
+        """ Записывает статистику в файл в формате JSON. """
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(self.to_json())
+
+    def format_table(self) -> str:
+        """ Форматирует статистику в виде таблицы для консоли. """
+        lines = [f"{'operation':<36}{'calls':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                 f"{'max ms':>10}{'avg size':>10}"]
+        for operation, stats in self.snapshot().items():
+            avg_size = f"{stats['result_size_avg']:.1f}" if stats['result_size_avg'] is not None else '-'
+            lines.append(f"{operation:<36}{stats['calls']:>8}{stats['errors']:>8}{stats['p50_ms']:>10.3f}"
+                         f"{stats['p95_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['max_ms']:>10.3f}{avg_size:>10}")
+            if stats['file_size'] is not None:
+                lines.append(f"{'':<4}file size: {stats['file_size']} bytes")
+        return '\n'.join(lines)
@@ -1,10 +1,13 @@
-from typing import final
+import json
+import shlex
+from typing import Any, Iterable, TextIO, final
 
 from book import BookStatus
 from book_manager import BookManager
 from enums import SearchCriteria
 from exceptions import InputException, BookManagerError, ValidationError
 from helper import clear_display, print_awaiting_message
+from instrumentation import Instrumentation
 from validation import validation_id, validation_year, validation_title, validation_author
 
 
@@ -20,9 +23,32 @@ class LibraryConsole:
     SEARCH_BOOK = '3'
     DISPLAY_ALL_BOOKS = '4'
     CHANGE_BOOK_STATUS = '5'
-
-    def __init__(self, book_manager: BookManager):
+    STATISTICS = '6'
+
+    BATCH_USAGE = {
+        'add': "add TITLE AUTHOR YEAR",
+        'remove': "remove ID",
+        'status': "status ID (a)vailable|(g)iven_out",
+        'find': "find title|author|year VALUE",
+        'list': "list [(a)vailable|(g)iven_out]",
+        'stats': "stats",
+    }
+    """ Команды пакетного режима и их синтаксис. """
+    BATCH_SEARCH_CRITERIA = {
+        'title': SearchCriteria.SEARCH_TITLE,
+        'author': SearchCriteria.SEARCH_AUTHOR,
+        'year': SearchCriteria.SEARCH_YEAR,
+    }
+    """ Критерии поиска команды find пакетного режима. """
+
+    def __init__(self, book_manager: BookManager, instrumentation: Instrumentation | None = None):
+        """
+        Конструктор класса.
+        :param book_manager: Менеджер книг.
+        :param instrumentation: Сбор статистики операций, или None, если статистика не собирается.
+        """
         self._book_manager = book_manager
+        self._instrumentation = instrumentation
 
     def _show_menu(self):
         """ Отображает меню действий. """
@@ -31,6 +57,7 @@ class LibraryConsole:
         print(f"{self.SEARCH_BOOK}. Book search.")
         print(f"{self.DISPLAY_ALL_BOOKS}. Displaying all books.")
         print(f"{self.CHANGE_BOOK_STATUS}. Changing the status of a book.")
+        print(f"{self.STATISTICS}. Statistics.")
         print(f"Press (q)uit to exit")
         print("")
 
@@ -50,6 +77,84 @@ class LibraryConsole:
                 break
             self._actions_handle(action_num)
 
+    def run_batch(self, lines: Iterable[str], output: TextIO) -> int:
+        """
+        Выполняет команды в пакетном режиме: экран не очищается, подтверждения и паузы не запрашиваются.
+        Аргументы команды разделяются как в командной оболочке, например: add "War and Peace" "Leo Tolstoy" 1869.
+        Пустые строки и строки, начинающиеся с '#', пропускаются.
+        Результат каждой команды записывается отдельной строкой JSON с номером строки команды и признаком успеха.
+        :param lines: Строки с командами.
+        :param output: Файл, открытый на запись в текстовом режиме.
+        :return: Количество команд, завершившихся ошибкой.
+        """
+        failed = 0
+        for line_num, line in enumerate(lines, start=1):
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            command = line.split(maxsplit=1)[0].lower()
+            try:
+                try:
+                    args = shlex.split(line)
+                except ValueError as err:
+                    raise InputException(f"The command cannot be parsed: {err}")
+                result = {'line': line_num, 'command': command, 'ok': True,
+                          **self._batch_command(command, args[1:])}
+            except (InputException, BookManagerError, ValidationError) as err:
+                result = {'line': line_num, 'command': command, 'ok': False, 'error': err.message}
+                failed += 1
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+        return failed
+
+    def _batch_command(self, command: str, args: list[str]) -> dict[str, Any]:
+        """
+        Выполняет команду пакетного режима.
+        :param command: Команда.
+        :param args: Аргументы команды.
+        :return: Результат команды.
+        :raises InputException: Неизвестная команда или неверные аргументы команды.
+        :raises BookManagerError: Ошибка выполнения команды.
+        :raises ValidationError: Ошибка проверки аргументов команды.
+        """
+        match command, args:
+            case 'add', [title, author, year]:
+                book_id = self._book_manager.add_book(validation_title(title), validation_author(author),
+                                                      validation_year(year))
+                return {'id': book_id}
+            case 'remove', [_id]:
+                return {'id': self._book_manager.remove_book(validation_id(_id))}
+            case 'status', [_id, status]:
+                book_id, _ = self._book_manager.changing_status_book(validation_id(_id),
+                                                                     self._str_status_convert(status.lower()))
+                return {'id': book_id, 'status': self._book_manager.get_status_book(book_id).name.lower()}
+            case 'find', ['title' | 'author' | 'year' as field, value]:
+                # Поиск идёт тем же путём, что и в диалоге, поэтому находит те же книги.
+                books = self._book_manager.find_books(self.BATCH_SEARCH_CRITERIA[field], value.strip())
+                return {'count': len(books), 'books': [{'id': book.id, 'title': book.title, 'author': book.author,
+                                                        'year': book.year, 'status': status.name.lower()}
+                                                       for book, status in books]}
+            case 'list', []:
+                return self._batch_books()
+            case 'list', [status]:
+                return self._batch_books(status=self._str_status_convert(status.lower()))
+            case 'stats', []:
+                if self._instrumentation is None:
+                    raise InputException("Statistics are not collected, start the library with the --stats option")
+                return {'stats': self._instrumentation.snapshot()}
+            case _ if command in self.BATCH_USAGE:
+                raise InputException(f"Usage: {self.BATCH_USAGE[command]}")
+            case _:
+                raise InputException(f"Unknown command '{command}', "
+                                     f"expected one of: {', '.join(self.BATCH_USAGE)}")
+
+    def _batch_books(self, **filters) -> dict[str, Any]:
+        """
+        Возвращает результат команды со списком книг каталога, удовлетворяющих фильтрам.
+        :param filters: Фильтры каталога.
+        """
+        books = list(self._book_manager.iter_catalog(**filters))
+        return {'count': len(books), 'books': books}
+
     def _actions_handle(self, action_num: str):
         """ Обрабатывает выбранное действие. """
         match action_num.strip():
@@ -65,6 +170,8 @@ class LibraryConsole:
                 self._display_all_books()
             case self.CHANGE_BOOK_STATUS:
                 self._changed_book_status()
+            case self.STATISTICS:
+                self._display_statistics()
             case _:
                 self._invalid_menu()
 
@@ -207,6 +314,23 @@ class LibraryConsole:
         except BookManagerError as err:
             print_awaiting_message(err.message)
 
+    def _display_statistics(self):
+        """ Отображает статистику операций и по запросу сохраняет её в файл в формате JSON. """
+        clear_display()
+        if self._instrumentation is None:
+            print_awaiting_message("Statistics are not collected, start the library with the --stats option")
+            return
+        print(self._instrumentation.format_table())
+        print("")
+        filename = input("Enter a file name to save the statistics as JSON, or press Enter to return: ").strip()
+        if filename == '':
+            return
+        try:
+            self._instrumentation.dump(filename)
+            print_awaiting_message(f"The statistics have been saved to '{filename}'")
+        except OSError as err:
+            print_awaiting_message(f"The statistics could not be saved: {err}")
+
     # noinspection PyMethodMayBeStatic
     def _invalid_menu(self):
         """ Сообщение при неверно выбранном меню. """
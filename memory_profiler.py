@@ -0,0 +1,111 @@
+import sys
+import tracemalloc
+from types import FunctionType, MethodType, ModuleType
+from typing import Any, Callable
+
+from abstract_class import AbstractBookRepository, AbstractBookRepositoryExport
+from background_save import BackgroundSave
+from bitmap import Bitmap
+from record_store import BookRecordStore
+
+
+_SKIPPED_TYPES = (type, ModuleType, FunctionType, MethodType, AbstractBookRepository, AbstractBookRepositoryExport,
+                  BackgroundSave)
+""" Объекты, которые не относятся к данным хранилища и при подсчёте не обходятся. """
+
+_DATA_STRUCTURES = (dict, list, tuple, set, frozenset, bytearray, Bitmap)
+""" Типы атрибутов хранилища, которые учитываются как структуры данных. """
+
+COMPONENTS = {'_records': 'books_dict'}
+""" Атрибуты хранилища, которые выделяются в отдельные составляющие отчёта. """
+
+
+def deep_sizeof(obj: Any, seen: set[int] | None = None) -> int:
+    """
+    Оценивает объём памяти объекта вместе со всем, на что он ссылается.
+    Каждый объект учитывается один раз, поэтому общие строки и числа не считаются повторно.
+    :param obj: Объект.
+    :param seen: Идентификаторы уже учтённых объектов, общий для нескольких вызовов.
+    :return: Объём в байтах.
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif hasattr(obj, '__dict__'):
+            stack.append(vars(obj))
+        elif hasattr(type(obj), '__slots__'):
+            stack.extend(getattr(obj, slot) for slot in type(obj).__slots__ if hasattr(obj, slot))
+    return size
+
+
+def _container_sizeof(container: dict, seen: set[int]) -> int:
+    """ Объём самого словаря и его ключей без значений. """
+    seen.add(id(container))
+    return sys.getsizeof(container) + sum(deep_sizeof(key, seen) for key in container)
+
+
+def memory_report(book_repository: AbstractBookRepository) -> dict[str, Any]:
+    """
+    Оценивает объём памяти, который занимает содержимое хранилища, по составляющим.
+    Словарь книг учитывается без самих книг, книги считаются отдельно как book_objects,
+    а битовая карта статусов как status_bitmap, все прочие структуры хранилища, например индексы, попадают в составляющую с именем своего атрибута.
+    Хранилища, которые держат книги в других процессах, учитываются только в части текущего процесса.
+    :param book_repository: Хранилище.
+    :return: Словарь с составляющими в байтах, общим объёмом, количеством книг и объёмом на одну книгу.
+    """
+    seen: set[int] = set()
+    components: dict[str, int] = {}
+    attributes = vars(book_repository)
+    records = attributes.get('_records')
+    if isinstance(records, BookRecordStore):
+        seen.add(id(records))
+        components['books_dict'] = sys.getsizeof(records) + _container_sizeof(records._books, seen)
+        components['book_objects'] = sum(deep_sizeof(book, seen) for book in records.books())
+        components['status_bitmap'] = deep_sizeof(records._available, seen)
+    for name, value in attributes.items():
+        # Индексы и другие структуры данных хранилища, служебные объекты вроде каналов процессов не учитываются.
+        if name in COMPONENTS or not isinstance(value, _DATA_STRUCTURES):
+            continue
+        size = deep_sizeof(value, seen)
+        if size > 0:
+            components[name.lstrip('_')] = size
+    total = sum(components.values())
+    number_of_books = book_repository.number_of_books
+    return {
+        'components': components,
+        'total_bytes': total,
+        'number_of_books': number_of_books,
+        'bytes_per_book': total / number_of_books if number_of_books else 0.0,
+    }
+
+
+def traced_allocations(func: Callable[[], Any]) -> tuple[Any, int, int]:
+    """
+    Выполняет функцию под tracemalloc и замеряет выделенную ей память.
+    :param func: Функция без аргументов.
+    :return: Кортеж (результат функции, память, оставшаяся занятой после вызова, пиковая память во время вызова).
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return result, current - before, peak - before
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from abstract_class import AbstractBookRepository
+from enums import BookStatus
+from instrumentation import Instrumentation
+
+
+STATUS_REFRESH_INTERVAL = 15.0
+""" Минимальный интервал в секундах между пересчётами книг по статусам. """
+
+HISTOGRAM_STEP = 4
+""" Шаг по границам гистограммы задержек, 4 соответствует удвоению границы. """
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+""" Тип содержимого текстового формата Prometheus. """
+
+
+def resident_memory_bytes() -> int | None:
+    """
+    Возвращает объём резидентной памяти процесса.
+    :return: Объём в байтах, или None, если платформа его не сообщает.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _escape(value: str) -> str:
+    """ Экранирует значение метки. """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsCollector:
+    """
+    Сбор метрик библиотеки в текстовом формате Prometheus.
+    Количество книг берётся из хранилища без обхода каталога, а количество книг по статусам пересчитывается,
+    только если хранилище изменилось, и не чаще заданного интервала.
+    """
+    def __init__(self, book_repository: AbstractBookRepository, instrumentation: Instrumentation | None = None,
+                 snapshot_filename=None, status_refresh_interval: float = STATUS_REFRESH_INTERVAL,
+                 replica: 'ReplicationReplica | None' = None):
+        """
+        Конструктор класса.
+        :param book_repository: Хранилище, метрики которого публикуются.
+        :param instrumentation: Статистика операций, или None, если она не собирается.
+        :param snapshot_filename: Файл снимка хранилища, размер которого публикуется.
+        :param status_refresh_interval: Минимальный интервал между пересчётами книг по статусам.
+        :param replica: Реплика, отставание которой публикуется, или None.
+        """
+        self._book_repository = book_repository
+        self._instrumentation = instrumentation
+        self._snapshot_filename = snapshot_filename
+        self._status_refresh_interval = status_refresh_interval
+        self._replica = replica
+        self._status_counts: dict[BookStatus, int] | None = None
+        self._status_version: int | None = None
+        self._status_refreshed = 0.0
+        self._lock = threading.Lock()
+
+    def status_counts(self) -> dict[BookStatus, int]:
+        """ Возвращает количество книг по статусам, пересчитывая его только при необходимости. """
+        with self._lock:
+            version = self._book_repository.version
+            now = time.monotonic()
+            if self._status_counts is None or (version != self._status_version
+                                               and now - self._status_refreshed >= self._status_refresh_interval):
+                self._status_counts = self._book_repository.count_by_status()
+                self._status_version = version
+                self._status_refreshed = now
+            return self._status_counts
+
+    def render(self) -> str:
+        """ Формирует метрики в текстовом формате Prometheus. """
+        lines: list[str] = []
+
+        def metric(name: str, metric_type: str, help_text: str, samples: list[tuple[str, float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        metric('library_books', 'gauge', "Number of books in the catalog.",
+               [('', self._book_repository.number_of_books)])
+        metric('library_books_by_status', 'gauge', "Number of books by status.",
+               [(f'{{status="{status.name.lower()}"}}', count) for status, count in self.status_counts().items()])
+        metric('library_repository_version', 'counter', "Number of repository changes.",
+               [('', self._book_repository.version)])
+
+        if self._snapshot_filename is not None and Path(self._snapshot_filename).exists():
+            metric('library_snapshot_size_bytes', 'gauge', "Size of the repository snapshot file.",
+                   [('', Path(self._snapshot_filename).stat().st_size)])
+
+        background_save = self._book_repository.last_background_save
+        if background_save is not None and background_save.duration is not None:
+            metric('library_background_save_duration_seconds', 'gauge', "Duration of the last background save.",
+                   [('', background_save.duration)])
+            metric('library_background_save_books', 'gauge', "Number of books written by the last background save.",
+                   [('', background_save.saved_books)])
+
+        if self._replica is not None:
+            replication = self._replica.statistics()
+            metric('library_replication_lag_operations', 'gauge',
+                   "Number of primary changes not yet applied by the replica.", [('', replication['lag_operations'])])
+            if replication['lag_seconds'] is not None:
+                metric('library_replication_lag_seconds', 'gauge',
+                       "Seconds since the replica last had all primary changes applied.",
+                       [('', replication['lag_seconds'])])
+            metric('library_replication_connected', 'gauge', "Whether the replica is connected to the primary.",
+                   [('', int(replication['connected']))])
+            metric('library_replication_snapshots_total', 'counter',
+                   "Number of full snapshots received by the replica.", [('', replication['snapshots'])])
+
+        if self._instrumentation is not None:
+            self._render_operations(metric, lines)
+
+        memory = resident_memory_bytes()
+        if memory is not None:
+            metric('process_resident_memory_bytes', 'gauge', "Resident memory size in bytes.", [('', memory)])
+        return '\n'.join(lines) + '\n'
+
+    def _render_operations(self, metric, lines: list[str]):
+        """ Добавляет счётчики и гистограммы задержек операций. """
+        histograms = self._instrumentation.histograms(HISTOGRAM_STEP)
+        metric('library_operation_calls_total', 'counter', "Number of operation calls.",
+               [(f'{{operation="{_escape(operation)}"}}', data['calls']) for operation, data in histograms.items()])
+        metric('library_operation_errors_total', 'counter', "Number of failed operation calls.",
+               [(f'{{operation="{_escape(operation)}"}}', data['errors']) for operation, data in histograms.items()])
+        name = 'library_operation_latency_seconds'
+        lines.append(f"# HELP {name} Latency of operation calls, including save and load.")
+        lines.append(f"# TYPE {name} histogram")
+        for operation, data in histograms.items():
+            label = f'operation="{_escape(operation)}"'
+            for bound_ns, count in data['buckets']:
+                lines.append(f'{name}_bucket{{{label},le="{bound_ns / 1e9:.6g}"}} {count}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {data["calls"]}')
+            lines.append(f'{name}_sum{{{label}}} {data["sum_ns"] / 1e9}')
+            lines.append(f'{name}_count{{{label}}} {data["calls"]}')
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """ Обработчик запросов метрик, сборщик метрик берётся у сервера. """
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.collector.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """ Запросы не выводятся в консоль, чтобы не мешать работе с библиотекой. """
+        pass
+
+
+class MetricsServer:
+    """ HTTP-сервер метрик, который работает в фоновом потоке и отдаёт метрики по адресу /metrics. """
+    HOST = '127.0.0.1'
+
+    def __init__(self, collector: MetricsCollector, port: int, host: str = HOST):
+        """
+        Конструктор класса.
+        :param collector: Сборщик метрик.
+        :param port: Порт сервера, 0 для любого свободного порта.
+        :param host: Адрес, на котором сервер принимает запросы, по умолчанию только локальный.
+        """
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.collector = collector
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        """ Порт, на котором работает сервер. """
+        return self._server.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        """ Запускает сервер в фоновом потоке. """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """ Останавливает сервер. """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
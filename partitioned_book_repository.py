@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from copy import copy
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from background_save import BackgroundSave
+from book_repository import BookRepository
+from enums import ChangeKind
+from exceptions import BookRepositoryError, BookRepositoryExportException
+from record_store import BookRecord, BookRecordStore
+from repository_export import BookRepositoryExport
+
+
+def _load_segment(filename: Path, checksum: str) -> tuple[BookRecordStore, int]:
+    """
+    Загружает и проверяет один сегмент снимка хранилища.
+    Выполняется в отдельном процессе.
+    :param filename: Файл сегмента.
+    :param checksum: Контрольная сумма сегмента из манифеста.
+    :return: Кортеж (записи книг сегмента, последний идентификатор сегмента).
+    :raises BookRepositoryError: Файл сегмента не найден; содержимое сегмента не совпадает с манифестом.
+    :raises BookRepositoryExportException:
+    """
+    try:
+        content = filename.read_bytes()
+    except FileNotFoundError:
+        raise BookRepositoryError(f"The segment file '{filename}' was not found")
+    if hashlib.sha256(content).hexdigest() != checksum:
+        raise BookRepositoryError(f"The checksum of the segment file '{filename}' does not match the manifest")
+    book_repository = BookRepository()
+    records = BookRecordStore()
+    try:
+        data = json.loads(content)
+    except ValueError:
+        raise BookRepositoryExportException(f"The segment file '{filename}' is corrupted")
+    last_id = BookRepositoryExport(book_repository).export_data(data, records)
+    return records, last_id
+
+
+class PartitionedBookRepository(BookRepository):
+    """
+    Хранилище книг, снимок которого разбит на сегменты по диапазонам идентификаторов.
+    Снимок состоит из файла манифеста и файлов сегментов, которые лежат рядом с ним.
+    Сегменты загружаются параллельно в нескольких процессах, а сохраняются параллельно в нескольких потоках,
+    причём сегменты, которые не изменились с последнего сохранения или загрузки, заново не сериализуются.
+    Для этого каждому изменению хранилища назначается номер, и для каждого сегмента запоминается номер
+    его последнего изменения. Сегмент чистый, если он изменился раньше, чем был взят снимок, из которого
+    он был сохранён в последний раз.
+    Изменённые сегменты пишутся в файлы нового поколения, а старые файлы удаляются только после замены
+    манифеста, поэтому прерванное сохранение оставляет прежний снимок целым. При загрузке содержимое
+    каждого сегмента сверяется с контрольной суммой из манифеста.
+    """
+    MANIFEST_SUFFIX = '.manifest.json'
+    SEGMENT_SIZE = 100_000
+
+    def __init__(self, segment_size: int = SEGMENT_SIZE, max_workers: int | None = None):
+        """
+        Конструктор класса.
+        :param segment_size: Количество идентификаторов в одном сегменте.
+        :param max_workers: Максимальное количество процессов и потоков для загрузки и сохранения сегментов.
+        """
+        super().__init__()
+        self._segment_size = segment_size
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._changes_lock = threading.Lock()
+        self._change_count = 0
+        """ Номер следующего изменения хранилища. """
+        self._segment_changes: dict[int, int] = {}
+        """ Номера последних изменений сегментов {номер сегмента: номер изменения}. """
+        self._reset_change = -1
+        """ Номер последней полной замены содержимого хранилища. """
+        self._saved_manifest: Path | None = None
+        """ Манифест последнего сохранения или загрузки. """
+        self._saved_segments: dict[int, tuple[int, dict[str: Any]]] = {}
+        """ Сегменты манифеста {номер сегмента: (номер изменения на момент снимка, описание сегмента)}. """
+        self._save_lock = threading.Lock()
+        """ Блокировка, которая не даёт одновременным сохранениям писать файлы одного поколения. """
+
+    def save(self, filename) -> int:
+        """
+        Сохраняет книги в сегменты снимка.
+        Файлы создаются, только если хранилище не пустое.
+        :param filename: Файл манифеста.
+        :return: Количество сохранённых книг.
+        """
+        if self.number_of_books == 0:
+            return 0
+        # Номер изменения берётся до снимка, поэтому все изменения с меньшими номерами в снимок уже попали.
+        change_count = self._change_count
+        return self._write_snapshot(filename, self._records.view(), change_count=change_count)
+
+    def save_in_background(self, filename) -> BackgroundSave:
+        """
+        Сохраняет книги в сегменты снимка в фоновом потоке.
+        :param filename: Файл манифеста.
+        :return: Запущенное фоновое сохранение.
+        """
+        change_count = self._change_count
+        records = self._records.view()
+        self._background_save = BackgroundSave(
+            lambda progress: self._write_snapshot(filename, records, progress, change_count),
+            len(records), previous=self._background_save).start()
+        return self._background_save
+
+    def load(self, filename) -> int:
+        """
+        Загружает книги из сегментов снимка.
+        :param filename: Файл манифеста.
+        :return: Количество загруженных книг.
+        :raises BookRepositoryError:
+        :raises BookRepositoryExportException:
+        """
+        manifest_filename = Path(filename)
+        if not manifest_filename.exists():
+            raise BookRepositoryError(f"The file '{manifest_filename}' with the saved books was not found")
+        manifest = self._read_manifest(manifest_filename)
+        segment_filenames = [manifest_filename.with_name(segment['filename']) for segment in manifest['segments']]
+        checksums = [segment['checksum'] for segment in manifest['segments']]
+        was_empty = self.number_of_books == 0
+
+        # Загрузка с ошибкой тоже меняет хранилище, поэтому подписчики получают сброс в любом случае.
+        try:
+            if len(segment_filenames) > 1 and self._max_workers > 1:
+                with ProcessPoolExecutor(min(self._max_workers, len(segment_filenames))) as executor:
+                    results = list(executor.map(_load_segment, segment_filenames, checksums))
+            else:
+                results = list(map(_load_segment, segment_filenames, checksums))
+
+            for records, last_id in results:
+                self._records.update(records)
+                self._last_id = max(self._last_id, last_id)
+            # Последние книги могли быть удалены, поэтому последний идентификатор берётся ещё и из манифеста.
+            self._last_id = max(self._last_id, manifest.get('last_id', 0))
+            self._version += 1
+        finally:
+            self._publish(ChangeKind.RESET)
+
+        # Содержимое хранилища совпадает со снимком, только если до загрузки оно было пустым.
+        if was_empty and manifest.get('segment_size') == self._segment_size:
+            try:
+                segments = {(segment['first_id'] - 1) // self._segment_size: segment
+                            for segment in manifest['segments']}
+            except (KeyError, TypeError):
+                segments = None
+            if segments is not None:
+                self._set_saved_segments(manifest_filename, self._change_count, segments)
+        return self.number_of_books
+
+    def _publish(self, kind: ChangeKind, records: Iterable[BookRecord] = ()):
+        """ Запоминает номер изменения затронутых сегментов и публикует событие в ленту изменений. """
+        if self._change_feed:
+            records = tuple(records)
+        with self._changes_lock:
+            change = self._change_count
+            self._change_count += 1
+            if kind == ChangeKind.RESET:
+                self._reset_change = change
+            else:
+                for book, _ in records:
+                    self._segment_changes[(book.id - 1) // self._segment_size] = change
+        super()._publish(kind, records)
+
+    def _clean_segments(self, manifest_filename: Path) -> dict[int, tuple[int, dict[str: Any]]]:
+        """ Возвращает сегменты манифеста, которые не изменились с последнего сохранения или загрузки. """
+        with self._changes_lock:
+            if self._saved_manifest != manifest_filename.resolve():
+                return {}
+            return {segment_num: saved for segment_num, saved in self._saved_segments.items()
+                    if max(self._segment_changes.get(segment_num, -1), self._reset_change) < saved[0]
+                    and manifest_filename.with_name(saved[1]['filename']).exists()}
+
+    def _set_saved_segments(self, manifest_filename: Path, change_count: int,
+                            segments: dict[int, dict[str: Any]], clean_segments=None):
+        """
+        Запоминает сегменты последнего сохранения или загрузки.
+        :param manifest_filename: Файл манифеста.
+        :param change_count: Номер изменения на момент снимка.
+        :param segments: Описания записанных сегментов {номер сегмента: описание}.
+        :param clean_segments: Сегменты, которые не сериализовались и сохранили прежний номер изменения.
+        """
+        saved_segments = dict(clean_segments or {})
+        saved_segments.update((segment_num, (change_count, segment)) for segment_num, segment in segments.items())
+        with self._changes_lock:
+            self._saved_manifest = manifest_filename.resolve()
+            self._saved_segments = saved_segments
+
+    def _write_snapshot(self, filename, records: BookRecordStore,
+                        progress: Callable[[int], None] | None = None, change_count: int = -1) -> int:
+        """
+        Записывает снимок хранилища в сегменты.
+        Чистые сегменты не сериализуются, а их описания переносятся из предыдущего манифеста.
+        Изменённые сегменты пишутся в файлы нового поколения, затем атомарно заменяется манифест,
+        и только после этого удаляются файлы, на которые новый манифест не ссылается.
+        :param filename: Файл манифеста.
+        :param records: Записи книг снимка.
+        :param progress: Функция, которой передаётся количество уже записанных книг.
+        :param change_count: Номер изменения, взятый перед снимком; -1, если он неизвестен
+            и все сегменты надо сериализовать.
+        :return: Количество сохранённых книг.
+        """
+        manifest_filename = Path(filename)
+        with self._save_lock:
+            return self._write_segments(manifest_filename, records, progress, change_count)
+
+    def _write_segments(self, manifest_filename: Path, records: BookRecordStore,
+                        progress: Callable[[int], None] | None, change_count: int) -> int:
+        """ Записывает сегменты и манифест снимка, вызывается под блокировкой сохранения. """
+        old_manifest = self._read_manifest(manifest_filename) if manifest_filename.exists() else {'segments': []}
+        generation = old_manifest.get('generation', 0) + 1
+        # Содержимое прежних сегментов сравнивается по номеру сегмента, только если размер сегментов не менялся.
+        old_segments = {(segment['first_id'] - 1) // self._segment_size: segment
+                        for segment in old_manifest['segments']} \
+            if old_manifest.get('segment_size') == self._segment_size else {}
+        clean_segments = self._clean_segments(manifest_filename) if change_count >= 0 and old_segments else {}
+        saved_books = [sum(segment['count'] for _, segment in clean_segments.values())]
+        lock = threading.Lock()
+        if progress is not None and saved_books[0]:
+            progress(saved_books[0])
+
+        def save_segment(item: tuple[int, tuple[list[dict[str: Any]], dict[int, bool]]]) -> dict[str: Any]:
+            segment = self._save_segment(manifest_filename, *item, old_segments, generation)
+            if progress is not None:
+                with lock:
+                    saved_books[0] += segment['count']
+                    progress(saved_books[0])
+            return segment
+
+        dirty_segments = sorted(self._split_into_segments(records, clean_segments.keys()).items())
+        with ThreadPoolExecutor(self._max_workers) as executor:
+            written_segments = dict(zip((segment_num for segment_num, _ in dirty_segments),
+                                        executor.map(save_segment, dirty_segments)))
+        segments = [segment for _, segment in sorted(
+            {**{segment_num: segment for segment_num, (_, segment) in clean_segments.items()},
+             **written_segments}.items())]
+
+        last_id = max(self._last_id, max(records, default=0))
+        manifest = {'segment_size': self._segment_size, 'generation': generation, 'last_id': last_id,
+                    'segments': segments}
+        self._write_file(manifest_filename, json.dumps(manifest, indent=2).encode())
+
+        # Новый манифест уже записан, поэтому файлы прежних поколений и файлы, оставшиеся
+        # от прерванных сохранений, больше не нужны.
+        segment_filenames = {segment['filename'] for segment in segments}
+        segment_pattern = re.compile(re.escape(self._segment_basename(manifest_filename)) + r'\.\d{4,}(\.\d+)?\.json')
+        for segment_filename in manifest_filename.parent.iterdir():
+            if segment_pattern.fullmatch(segment_filename.name) and segment_filename.name not in segment_filenames:
+                segment_filename.unlink(missing_ok=True)
+        if change_count >= 0:
+            self._set_saved_segments(manifest_filename, change_count, written_segments, clean_segments)
+        return len(records)
+
+    def _split_into_segments(self, records: BookRecordStore, skip_segments: Iterable[int] = ()) \
+            -> dict[int, tuple[list[dict[str: Any]], dict[int, bool]]]:
+        """
+        Разбивает книги снимка на сегменты по диапазонам идентификаторов.
+        :param records: Записи книг снимка.
+        :param skip_segments: Номера сегментов, книги которых пропускаются.
+        """
+        segments: dict[int, tuple[list[dict[str: Any]], dict[int, bool]]] = {}
+        skip_segments = frozenset(skip_segments)
+        for book, status in records.records():
+            segment_num = (book.id - 1) // self._segment_size
+            if segment_num in skip_segments:
+                continue
+            segment_books, segment_status = segments.setdefault(segment_num, ([], {}))
+            segment_books.append(copy(book.to_dict()))
+            segment_status[book.id] = status
+        return segments
+
+    def _save_segment(self, manifest_filename: Path, segment_num: int,
+                      segment_data: tuple[list[dict[str: Any]], dict[int, bool]],
+                      old_segments: dict[int, dict[str: Any]], generation: int) -> dict[str: Any]:
+        """
+        Сохраняет один сегмент, если его содержимое изменилось.
+        :param manifest_filename: Файл манифеста.
+        :param segment_num: Номер сегмента.
+        :param segment_data: Данные сегмента в виде кортежа: [book_list, status_dict].
+        :param old_segments: Описания сегментов из предыдущего манифеста {номер сегмента: описание}.
+        :param generation: Поколение снимка, номер которого входит в имя нового файла сегмента.
+        :return: Описание сегмента для манифеста.
+        """
+        content = json.dumps(segment_data).encode()
+        checksum = hashlib.sha256(content).hexdigest()
+        old_segment = old_segments.get(segment_num)
+        # Сегмент записывается в новый файл, только если его содержимое изменилось,
+        # а файл прежнего поколения остаётся нетронутым, пока на него ссылается прежний манифест.
+        if old_segment is not None and old_segment['checksum'] == checksum \
+                and manifest_filename.with_name(old_segment['filename']).exists():
+            segment_filename = old_segment['filename']
+        else:
+            segment_filename = f"{self._segment_basename(manifest_filename)}.{segment_num:04d}.{generation}.json"
+            self._write_file(manifest_filename.with_name(segment_filename), content)
+        ids = segment_data[1].keys()
+        return {'filename': segment_filename, 'first_id': min(ids), 'last_id': max(ids),
+                'count': len(ids), 'checksum': checksum}
+
+    @classmethod
+    def _segment_basename(cls, manifest_filename: Path) -> str:
+        """ Возвращает общее начало имён файлов сегментов снимка. """
+        return manifest_filename.name.removesuffix(cls.MANIFEST_SUFFIX)
+
+    @classmethod
+    def _read_manifest(cls, manifest_filename: Path) -> dict[str: Any]:
+        """
+        Читает манифест снимка.
+        :raises BookRepositoryExportException: Манифест повреждён или ссылается на файл вне своего каталога.
+        """
+        with open(manifest_filename, 'r') as f:
+            try:
+                manifest = json.load(f)
+                segment_filenames = [segment['filename'] for segment in manifest['segments']]
+                _ = [segment['checksum'] for segment in manifest['segments']]
+            except (ValueError, KeyError, TypeError):
+                raise BookRepositoryExportException(f"The manifest '{manifest_filename}' is corrupted")
+        for segment_filename in segment_filenames:
+            # Файлы сегментов лежат рядом с манифестом, поэтому путь в имени сегмента недопустим.
+            if not isinstance(segment_filename, str) or '..' in segment_filename \
+                    or any(sep in segment_filename for sep in ('/', '\\', os.sep, os.altsep) if sep):
+                raise BookRepositoryExportException(f"The manifest '{manifest_filename}' refers to the segment "
+                                                    f"'{segment_filename}' outside of its directory")
+        return manifest
+
+    @classmethod
+    def _write_file(cls, filename: Path, content: bytes):
+        """ Атомарно записывает файл через временный файл. """
+        tmp_filename = filename.with_name(filename.name + '.tmp')
+        with open(tmp_filename, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
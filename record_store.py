@@ -0,0 +1,193 @@
+import threading
+import weakref
+from typing import Iterable, Iterator, NamedTuple
+
+from bitmap import Bitmap
+from book import Book
+
+
+class BookRecord(NamedTuple):
+    """ Запись хранилища: книга вместе с её статусом. """
+    book: Book
+    status: bool
+
+
+class BookRecordStore:
+    """
+    Хранилище записей книг.
+    Книга находится по идентификатору одним поиском в словаре, а её статус хранится одним битом
+    в битовой карте наличия, где номер бита равен идентификатору книги.
+    Изменение статуса переключает бит, а количество книг в наличии считается по установленным битам.
+    Книги после добавления не меняются, поэтому копия хранилища не меняется при изменении оригинала.
+    Представления хранилища разделяют с ним словарь и битовую карту, а копирует их та сторона, которая первой
+    изменится, пока другая ещё существует (копирование при записи).
+    """
+    __slots__ = ('_books', '_available', '_shared', '_views', '__weakref__')
+    _lock = threading.Lock()
+    """ Блокировка, под которой создаются представления и проверяется, надо ли копировать данные перед записью. """
+
+    def __init__(self, books: dict[int, Book] | None = None, available: Bitmap | None = None):
+        """
+        Конструктор класса.
+        :param books: Словарь книг {идентификатор: книга}, который становится содержимым хранилища.
+        :param available: Битовая карта наличия книг, по умолчанию все книги в наличии.
+        """
+        self._books: dict[int, Book] = {} if books is None else books
+        self._available = Bitmap.from_indexes(self._books) if available is None else available
+        self._shared = False
+        """ Словарь и карта получены от другого хранилища и могут быть общими с ним. """
+        self._views: weakref.WeakSet | None = None
+        """ Представления, которые разделяют словарь и карту с хранилищем. """
+
+    def __len__(self) -> int:
+        return len(self._books)
+
+    def __contains__(self, _id) -> bool:
+        return _id in self._books
+
+    def __iter__(self) -> Iterator[int]:
+        """ Обходит идентификаторы книг. """
+        return iter(self._books)
+
+    def __getitem__(self, _id: int) -> BookRecord:
+        """
+        Возвращает запись книги.
+        :raises KeyError: Записи с указанным идентификатором нет.
+        """
+        return BookRecord(self._books[_id], self._available[_id])
+
+    def get(self, _id: int) -> BookRecord | None:
+        """ Возвращает запись книги или None, если записи с указанным идентификатором нет. """
+        book = self._books.get(_id)
+        return None if book is None else BookRecord(book, self._available[_id])
+
+    def put(self, book: Book, status: bool):
+        """
+        Помещает книгу со статусом, заменяя прежнюю запись с тем же идентификатором.
+        :param book: Книга с назначенным идентификатором.
+        :param status: Статус книги.
+        """
+        with self._lock:
+            self._prepare_write()
+            self._books[book.id] = book
+            self._available[book.id] = status
+
+    def put_all(self, books: Iterable[Book], status: bool):
+        """
+        Помещает пачку книг с одним статусом, заменяя прежние записи с теми же идентификаторами.
+        :param books: Книги с назначенными идентификаторами.
+        :param status: Статус книг.
+        """
+        with self._lock:
+            self._prepare_write()
+            for book in books:
+                self._books[book.id] = book
+                self._available[book.id] = status
+
+    def set_status(self, _id: int, status: bool) -> Book:
+        """
+        Изменяет статус книги.
+        :return: Книга, статус которой изменён.
+        :raises KeyError: Записи с указанным идентификатором нет.
+        """
+        with self._lock:
+            book = self._books[_id]
+            self._prepare_write()
+            self._available[_id] = status
+        return book
+
+    def pop(self, _id: int) -> BookRecord:
+        """
+        Удаляет запись книги.
+        :return: Удалённая запись.
+        :raises KeyError: Записи с указанным идентификатором нет.
+        """
+        with self._lock:
+            if _id not in self._books:
+                raise KeyError(_id)
+            self._prepare_write()
+            book = self._books.pop(_id)
+            status = self._available[_id]
+            self._available.clear(_id)
+        return BookRecord(book, status)
+
+    def books(self) -> Iterator[Book]:
+        """ Обходит книги, обход держит ссылку на хранилище, поэтому обходимое представление не удаляется. """
+        yield from self._books.values()
+
+    def records(self) -> Iterator[BookRecord]:
+        """ Обходит записи книг в порядке их добавления. """
+        available = self._available
+        for _id, book in self._books.items():
+            yield BookRecord(book, available[_id])
+
+    def count_available(self) -> int:
+        """ Количество книг в наличии. """
+        return self._available.count()
+
+    def available_bitmap(self) -> Bitmap:
+        """ Возвращает копию битовой карты книг в наличии. """
+        return self._available.copy()
+
+    def id_bitmap(self) -> Bitmap:
+        """ Возвращает битовую карту идентификаторов всех книг хранилища. """
+        return Bitmap.from_indexes(self._books)
+
+    def update(self, other: 'BookRecordStore'):
+        """ Добавляет записи другого хранилища, заменяя записи с теми же идентификаторами. """
+        with self._lock:
+            self._prepare_write()
+            self._books.update(other._books)
+            # Биты книг другого хранилища берутся из его карты, в том числе сброшенные.
+            self._available = (self._available - other.id_bitmap()) | other._available
+
+    def clear(self):
+        """ Удаляет все записи. """
+        with self._lock:
+            self._books = {}
+            self._available = Bitmap()
+            self._shared = False
+            self._views = None
+
+    def copy(self) -> 'BookRecordStore':
+        """
+        Возвращает копию хранилища.
+        Копируются только словарь и битовая карта, книги неизменяемые и поэтому общие с оригиналом.
+        """
+        return BookRecordStore(dict(self._books), self._available.copy())
+
+    def view(self) -> 'BookRecordStore':
+        """
+        Возвращает представление записей, закреплённое за их текущим состоянием.
+        Представление создаётся за постоянное время, так как словарь и карта не копируются, а последующие
+        изменения хранилища в нём не видны. Представления, на которые никто больше не ссылается, удаляются
+        сборщиком мусора и уже не заставляют хранилище копировать данные перед записью.
+        """
+        with self._lock:
+            view = BookRecordStore(self._books, self._available)
+            view._shared = True
+            if self._views is None:
+                self._views = weakref.WeakSet()
+            self._views.add(view)
+        return view
+
+    def rebuild(self):
+        """ Пересоздаёт словарь книг, так как при удалении ключей словарь не уменьшается. """
+        with self._lock:
+            # Копирование перед записью тоже пересоздаёт словарь.
+            if not self._prepare_write():
+                self._books = dict(self._books)
+
+    def _prepare_write(self) -> bool:
+        """
+        Копирует словарь и карту перед изменением, если они могут быть общими с другим хранилищем
+        или с ещё существующими представлениями. Вызывается под блокировкой.
+        :return: True, если данные скопированы.
+        """
+        if not self._shared and not self._views:
+            return False
+        self._books = dict(self._books)
+        self._available = self._available.copy()
+        self._shared = False
+        self._views = None
+        return True
@@ -0,0 +1,464 @@
+import functools
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable
+
+from abstract_class import AbstractBookRepository
+from book import Book
+from book_repository import BookRepository
+from change_feed import ChangeEvent, Subscription
+from delta_sync import apply_operation, decode_operation, encode_operation
+from enums import ChangeKind, PatchOperation
+from exceptions import BookRepositoryError, ValidationError
+from record_store import BookRecordStore
+
+
+MUTATIONS = ('add_book', 'add_books', 'put_book', 'changing_status_book', 'remove_book',
+             'load', 'restore', 'compact')
+""" Методы хранилища, которые его изменяют и поэтому на реплике доступны только потоку репликации. """
+
+WRITE_BATCH = 1000
+""" Количество строк, которые отправляются реплике одной записью в сокет. """
+
+
+def _connect(address) -> socket.socket:
+    """
+    Подключается к ведущему хранилищу.
+    :param address: Кортеж (хост, порт) для TCP-сокета или путь к Unix-сокету.
+    """
+    if isinstance(address, tuple):
+        return socket.create_connection(address)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(os.fspath(address))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _ReplicationHandler(socketserver.StreamRequestHandler):
+    """ Обработчик подключения реплики, ведущее хранилище берётся у сервера. """
+    def handle(self):
+        try:
+            hello = json.loads(self.rfile.readline() or 'null')
+            last_seq = int(hello['seq'])
+        except (ValueError, KeyError, TypeError):
+            return
+        try:
+            self.server.primary.stream(self.wfile, last_seq)
+        except OSError:
+            # Реплика отключилась.
+            pass
+
+
+class ReplicationPrimary:
+    """
+    Ведущее хранилище репликации.
+    Ведущее хранилище подписывается на ленту изменений хранилища: каждое изменение получает последовательный номер
+    и записывается в журнал ограниченного размера, а журнал передаётся подключённым репликам через TCP- или
+    Unix-сокет. После события сброса журнал очищается, и реплики получают снимок хранилища заново.
+    Реплика сообщает номер последнего применённого изменения и получает хвост журнала после него,
+    а если журнал такого изменения уже не хранит, то вначале снимок хранилища.
+    """
+    LOG_SIZE = 100_000
+    HEARTBEAT_INTERVAL = 1.0
+
+    def __init__(self, book_repository: AbstractBookRepository, address, log_size: int = LOG_SIZE,
+                 heartbeat_interval: float = HEARTBEAT_INTERVAL):
+        """
+        Конструктор класса.
+        :param book_repository: Хранилище, изменения которого передаются репликам.
+        :param address: Кортеж (хост, порт) для TCP-сокета, порт 0 для любого свободного порта,
+            или путь к Unix-сокету.
+        :param log_size: Количество последних изменений, которые хранит журнал.
+        :param heartbeat_interval: Период в секундах, с которым реплике сообщается номер последнего изменения,
+            даже если изменений нет.
+        """
+        self._book_repository = book_repository
+        self._address = address
+        self._heartbeat_interval = heartbeat_interval
+        self._log: deque[tuple[int, float, list[Any]]] = deque(maxlen=log_size)
+        """ Журнал изменений в виде (номер, время, операция). """
+        # Начальное состояние хранилища считается снимком, поэтому новые реплики вначале получают снимок.
+        self._seq = 1
+        self._condition = threading.Condition()
+        self._subscription: Subscription | None = None
+        self._number_of_replicas = 0
+        self._stop_event = threading.Event()
+        self._server: socketserver.BaseServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def address(self):
+        """ Адрес, на котором ведущее хранилище принимает подключения реплик. """
+        return self._server.server_address if self._server is not None else self._address
+
+    @property
+    def seq(self) -> int:
+        """ Номер последнего изменения. """
+        return self._seq
+
+    @property
+    def number_of_replicas(self) -> int:
+        """ Количество подключённых реплик. """
+        return self._number_of_replicas
+
+    def start(self) -> 'ReplicationPrimary':
+        """ Начинает записывать изменения хранилища в журнал и принимать подключения реплик в фоновом потоке. """
+        self._subscription = self._book_repository.change_feed.subscribe(self._on_change)
+        if isinstance(self._address, tuple):
+            self._server = _TcpServer(self._address, _ReplicationHandler)
+        else:
+            # Файл сокета мог остаться после аварийного завершения и помешать привязке.
+            if Path(self._address).is_socket():
+                Path(self._address).unlink()
+            self._server = _UnixServer(os.fspath(self._address), _ReplicationHandler)
+        self._server.primary = self
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replication-primary', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """ Отключает реплики, останавливает сервер и перестаёт записывать изменения в журнал. """
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            if not isinstance(self._address, tuple):
+                Path(self._address).unlink(missing_ok=True)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def stream(self, wfile: BinaryIO, last_seq: int):
+        """
+        Передаёт реплике изменения после указанного номера, пока реплика не отключится или сервер не остановится.
+        Каждая порция изменений заканчивается сообщением с номером последнего изменения и временем ведущего хранилища.
+        :param wfile: Поток записи в сокет реплики.
+        :param last_seq: Номер последнего изменения, которое применила реплика.
+        :raises OSError: Реплика отключилась.
+        """
+        with self._condition:
+            self._number_of_replicas += 1
+        try:
+            while not self._stop_event.is_set():
+                with self._condition:
+                    if last_seq == self._seq:
+                        self._condition.wait(self._heartbeat_interval)
+                    seq = self._seq
+                    entries = self._entries_after(last_seq)
+                # Снимок берётся без блокировки журнала: хранилище публикует изменения под своей блокировкой,
+                # и снимок под блокировкой журнала мог бы ждать хранилище, которое ждёт журнал.
+                # Изменение попадает в журнал после того, как оно сделано в хранилище, поэтому снимок
+                # содержит все изменения до номера и, возможно, несколько следующих, которые реплика
+                # затем получит ещё раз.
+                records = self._book_repository.snapshot() if entries is None else None
+                lines: list[Iterable[str]] = []
+                if records is not None:
+                    lines.append((json.dumps({'snapshot': seq, 'books': len(records), 'ts': time.time()}),))
+                    lines.append(json.dumps(encode_operation(PatchOperation.ADD, book, status), ensure_ascii=False)
+                                 for book, status in records.records())
+                    entries = []
+                lines.append(json.dumps({'seq': entry_seq, 'ts': ts, 'op': op}, ensure_ascii=False)
+                             for entry_seq, ts, op in entries)
+                lines.append((json.dumps({'heartbeat': seq, 'ts': time.time()}),))
+                self._write_lines(wfile, (line for part in lines for line in part))
+                last_seq = seq
+        finally:
+            with self._condition:
+                self._number_of_replicas -= 1
+
+    def _entries_after(self, last_seq: int) -> list[tuple[int, float, list[Any]]] | None:
+        """
+        Возвращает изменения журнала после указанного номера.
+        :return: Список изменений или None, если журнал их уже не хранит и реплике нужен снимок.
+        """
+        if last_seq == self._seq:
+            return []
+        first_seq = self._log[0][0] if self._log else self._seq + 1
+        if last_seq < first_seq - 1 or last_seq > self._seq:
+            return None
+        return list(islice(self._log, last_seq - first_seq + 1, None))
+
+    def _on_change(self, event: ChangeEvent):
+        """
+        Записывает в журнал событие ленты изменений хранилища.
+        Добавление пачки книг приходит одним событием, а в журнал записывается по операции на книгу,
+        чтобы реплика могла продолжить применение с любого номера.
+        """
+        with self._condition:
+            match event.kind:
+                case ChangeKind.ADD | ChangeKind.PUT:
+                    op = PatchOperation.ADD if event.kind == ChangeKind.ADD else PatchOperation.CHANGE
+                    for book, status in event.records:
+                        self._append(op, book, status)
+                case ChangeKind.STATUS:
+                    for book, status in event.records:
+                        self._append(PatchOperation.STATUS, book.id, status)
+                case ChangeKind.REMOVE:
+                    for book, _ in event.records:
+                        self._append(PatchOperation.REMOVE, book.id)
+                case _:
+                    # Хранилище изменилось целиком, поэтому журнал очищается, а реплики получат снимок.
+                    self._log.clear()
+                    self._seq += 1
+            self._condition.notify_all()
+
+    def _append(self, op: PatchOperation, item: Book | int, status: bool | None = None):
+        """ Добавляет операцию в журнал под следующим номером. """
+        self._seq += 1
+        self._log.append((self._seq, time.time(), encode_operation(op, item, status)))
+
+    @classmethod
+    def _write_lines(cls, wfile: BinaryIO, lines: Iterable[str]):
+        """ Записывает строки в сокет пачками. """
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH:
+                wfile.write(('\n'.join(batch) + '\n').encode('utf-8'))
+                batch.clear()
+        if batch:
+            wfile.write(('\n'.join(batch) + '\n').encode('utf-8'))
+
+
+class _ResyncRequired(Exception):
+    """ Реплика не может продолжить применение журнала и должна подключиться заново. """
+    pass
+
+
+class ReplicationReplica:
+    """
+    Реплика хранилища только для чтения.
+    Подключается к ведущему хранилищу, получает снимок и журнал изменений и применяет их к своему хранилищу
+    в фоновом потоке. После разрыва соединения реплика подключается заново и получает только изменения,
+    которые пропустила, или снимок, если журнал ведущего хранилища их уже не хранит.
+    Изменять хранилище реплики может только поток репликации, остальные получают ошибку.
+    """
+    RETRY_INTERVAL = 1.0
+
+    def __init__(self, book_repository: BookRepository, address, retry_interval: float = RETRY_INTERVAL):
+        """
+        Конструктор класса.
+        :param book_repository: Хранилище реплики.
+        :param address: Адрес ведущего хранилища: кортеж (хост, порт) или путь к Unix-сокету.
+        :param retry_interval: Пауза в секундах перед повторным подключением.
+        """
+        self._book_repository = book_repository
+        self._address = address
+        self._retry_interval = retry_interval
+        self._applied_seq = 0
+        self._primary_seq = 0
+        self._synced_at: float | None = None
+        """ Время ведущего хранилища, когда реплика последний раз применила все его изменения. """
+        self._connected = False
+        self._connections = 0
+        self._snapshots = 0
+        self._condition = threading.Condition()
+        self._methods: dict[str, Callable] = {}
+        self._socket: socket.socket | None = None
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def applied_seq(self) -> int:
+        """ Номер последнего применённого изменения. """
+        return self._applied_seq
+
+    def statistics(self) -> dict[str, int | float | bool | None]:
+        """
+        Статистика репликации: номера изменений, отставание реплики, количество подключений и полученных снимков.
+        Отставание в секундах отсчитывается от времени, когда реплика последний раз применила все изменения
+        ведущего хранилища, поэтому у работающей реплики оно не превышает периода сообщений ведущего хранилища.
+        """
+        return {'applied_seq': self._applied_seq, 'primary_seq': self._primary_seq,
+                'lag_operations': max(0, self._primary_seq - self._applied_seq),
+                'lag_seconds': max(0.0, time.time() - self._synced_at) if self._synced_at is not None else None,
+                'connected': self._connected, 'connections': self._connections, 'snapshots': self._snapshots}
+
+    def start(self) -> 'ReplicationReplica':
+        """ Запускает репликацию в фоновом потоке. """
+        self._attach()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='replication-replica', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """ Останавливает репликацию, применённые изменения остаются в хранилище. """
+        self._stop_event.set()
+        sock = self._socket
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._detach()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def wait_for(self, seq: int, timeout: float | None = None) -> bool:
+        """
+        Ожидает применения изменения с указанным номером.
+        :return: True, если изменение применено, и False, если время ожидания истекло.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._applied_seq >= seq, timeout)
+
+    def _run(self):
+        """ Цикл подключения к ведущему хранилищу. """
+        while not self._stop_event.is_set():
+            try:
+                self._socket = _connect(self._address)
+            except OSError:
+                self._stop_event.wait(self._retry_interval)
+                continue
+            self._connected = True
+            self._connections += 1
+            try:
+                self._follow(self._socket)
+            except (OSError, _ResyncRequired):
+                pass
+            finally:
+                self._connected = False
+                self._socket.close()
+                self._socket = None
+            self._stop_event.wait(self._retry_interval)
+
+    def _follow(self, sock: socket.socket):
+        """
+        Сообщает ведущему хранилищу номер последнего применённого изменения и применяет присылаемые изменения.
+        :raises OSError: Соединение разорвано.
+        :raises _ResyncRequired: Изменение не удалось применить; сообщение ведущего хранилища повреждено.
+        """
+        sock.sendall((json.dumps({'seq': self._applied_seq}) + '\n').encode('utf-8'))
+        with sock.makefile('r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    message = json.loads(line)
+                    if 'heartbeat' in message:
+                        self._on_heartbeat(message['heartbeat'], message['ts'])
+                    elif 'snapshot' in message:
+                        self._apply_snapshot(message['snapshot'], message['ts'], message['books'],
+                                             islice(f, message['books']))
+                    else:
+                        self._apply_entry(message['seq'], message['ts'], message['op'])
+                except (ValueError, KeyError, TypeError):
+                    # Повреждённое сообщение не должно завершать поток репликации, поэтому реплика подключается заново.
+                    raise _ResyncRequired()
+
+    def _apply_snapshot(self, seq: int, ts: float, number_of_books: int, lines: Iterable[str]):
+        """ Заменяет содержимое хранилища снимком ведущего хранилища. """
+        records = BookRecordStore()
+        try:
+            for line in lines:
+                _, book, status = decode_operation(json.loads(line))
+                records.put(book, status)
+        except (ValidationError, ValueError):
+            raise _ResyncRequired()
+        # Если соединение разорвано посреди снимка, то снимок не применяется.
+        if len(records) != number_of_books:
+            raise _ResyncRequired()
+        self._book_repository.restore(records)
+        self._snapshots += 1
+        self._set_applied(seq, ts)
+
+    def _apply_entry(self, seq: int, ts: float, operation: list[Any]):
+        """
+        Применяет изменение из журнала ведущего хранилища.
+        Изменения, которые уже вошли в снимок, могут прийти ещё раз. Операции задают итоговое состояние книги,
+        поэтому повторное применение ничего не меняет, а изменение статуса и удаление уже удалённой книги
+        пропускаются.
+        """
+        if seq != self._applied_seq + 1:
+            raise _ResyncRequired()
+        try:
+            op, item, status = decode_operation(operation)
+            if op not in (PatchOperation.STATUS, PatchOperation.REMOVE) \
+                    or self._book_repository.get_book_by_id(item) is not None:
+                apply_operation(self._book_repository, op, item, status)
+        except (BookRepositoryError, ValidationError, ValueError):
+            # Хранилище реплики разошлось с ведущим, поэтому при следующем подключении реплика получит снимок.
+            self._set_applied(0)
+            raise _ResyncRequired()
+        self._set_applied(seq, ts)
+
+    def _on_heartbeat(self, seq: int, ts: float):
+        """ Запоминает номер последнего изменения ведущего хранилища. """
+        self._primary_seq = seq
+        if self._applied_seq >= seq:
+            self._synced_at = ts
+
+    def _set_applied(self, seq: int, ts: float | None = None):
+        """
+        Запоминает номер последнего применённого изменения и будит ожидающих его потоки.
+        :param seq: Номер изменения.
+        :param ts: Время изменения в ведущем хранилище.
+        """
+        with self._condition:
+            self._applied_seq = seq
+            if ts is not None:
+                self._primary_seq = max(self._primary_seq, seq)
+                if seq >= self._primary_seq:
+                    self._synced_at = ts
+            self._condition.notify_all()
+
+    def _attach(self):
+        """ Запрещает изменять хранилище реплики всем, кроме потока репликации. """
+        for name in MUTATIONS:
+            method = getattr(self._book_repository, name)
+            self._methods[name] = method
+            setattr(self._book_repository, name, self._guard(method))
+
+    def _detach(self):
+        """ Возвращает хранилищу методы, которые были у него до начала репликации. """
+        for name, method in self._methods.items():
+            setattr(self._book_repository, name, method)
+        self._methods = {}
+
+    def _guard(self, method: Callable) -> Callable:
+        """ Создаёт обёртку метода, которая разрешает вызов только потоку репликации. """
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if threading.current_thread() is not self._thread:
+                raise BookRepositoryError("The replica repository is read-only")
+            return method(*args, **kwargs)
+        return wrapper
@@ -1,10 +1,11 @@
 import json
 from copy import copy
-from typing import Any
+from typing import Any, Iterable
 
 from abstract_class import AbstractBookRepositoryExport
-from book import Book
+from book import Book, BookStatus
 from exceptions import ValidationError, BookRepositoryExportException
+from record_store import BookRecordStore
 from validation import validation_id, validation_status
 
 
@@ -21,50 +22,107 @@ class BookRepositoryExport(AbstractBookRepositoryExport):
         """
         books: list[dict[str: Any]] = []
         books_status: dict[int, bool] = {}
-        for book in self._book_repository.all_books:
+        for book, status in self._book_repository.iter_books_with_status():
             books.append(copy(book.to_dict()))
-            books_status[book.id] = self._book_repository.get_status_book(book.id).value
+            books_status[book.id] = status.value
         return books, books_status
 
     def export_data(self, source_data: tuple[list[dict[str: Any]], dict[int, bool]],
-                    destination_data: tuple[list[dict[str: Any]], dict[int, bool]]) -> int:
+                    destination_data: BookRecordStore) -> int:
         """
         Заполняет хранилище из списка простых объектов.
+        Книги сначала получают статус "в наличии", а затем статусы устанавливаются по словарю статусов.
         :param source_data: Данные для экспорта в виде кортежа: [book_list, status_dict].
-        :param destination_data: Данные, куда данные экспортируются.
+        :param destination_data: Записи книг, куда данные экспортируются.
         :return: Последний номер идентификатора.
         :raises BookRepositoryExportException: Ошибка при экспорте данных
         """
         source_book_dict, source_status_dict = source_data
-        destination_book_dict, destination_status_dict = destination_data
         row_num = []
         try:
             # logger.debug(status_dict)
             row_num = [1]
             # После экспорта книг, сразу же устанавливается самый последний идентификатор.
-            self._last_id = self._export_book(row_num, source_book_dict, destination_book_dict)
+            self._last_id = self._export_book(row_num, source_book_dict, destination_data)
             row_num = [1]
-            self._export_statuses(row_num, source_status_dict, destination_status_dict)
+            self._export_statuses(row_num, source_status_dict, destination_data)
         except ValidationError as err:
-            self._book_repository._books_status = {}
-            self._book_repository._books = {}
+            destination_data.clear()
             raise BookRepositoryExportException(f"Error when exporting books number {row_num[0]}. "
                                                 f"{err.message}: {err.var_name} = {err.value}")
         except KeyError as err:
-            self._book_repository._books_status = {}
-            self._book_repository._books = {}
+            destination_data.clear()
             raise BookRepositoryExportException(f"Error when exporting books number {row_num[0]}. "
                                                 f"The {err.args[0][1:]} data is missing")
 
         return self._last_id
 
+    def export_lines(self, lines: Iterable[str], destination_data: BookRecordStore) -> int:
+        """
+        Заполняет хранилище из строк, каждая из которых является JSON-записью книги со статусом.
+        Пустые строки пропускаются.
+        :param lines: Строки для экспорта.
+        :param destination_data: Записи книг, куда данные экспортируются.
+        :return: Последний номер идентификатора.
+        :raises BookRepositoryExportException: Ошибка при экспорте данных с указанием номера строки.
+        """
+        last_id = 0
+        for line_num, line in enumerate(lines, start=1):
+            if line.strip() == '':
+                continue
+            try:
+                _id = self.export_line(line, destination_data)
+            except BookRepositoryExportException as err:
+                destination_data.clear()
+                raise BookRepositoryExportException(f"Error when exporting books on line {line_num}. {err.message}")
+            if _id > last_id:
+                last_id = _id
+        self._last_id = last_id
+        return last_id
+
+    @classmethod
+    def export_line(cls, line: str, destination_data: BookRecordStore) -> int:
+        """
+        Экспортирует одну строку с JSON-записью книги и её статусом.
+        :param line: Строка для экспорта.
+        :param destination_data: Записи книг, куда данные экспортируются.
+        :return: Идентификатор книги.
+        :raises BookRepositoryExportException: Ошибка при экспорте строки, без указания номера строки.
+        """
+        try:
+            record = json.loads(line)
+            book = Book(record['_title'], record['_author'], record['_year'])
+            book.set_id(validation_id(record['_id']))
+            status = validation_status(record['_status'])
+        except ValueError:
+            raise BookRepositoryExportException("The line is not a valid JSON record")
+        except ValidationError as err:
+            raise BookRepositoryExportException(f"{err.message}: {err.var_name} = {err.value}")
+        except (KeyError, TypeError) as err:
+            name = err.args[0][1:] if isinstance(err, KeyError) else 'record'
+            raise BookRepositoryExportException(f"The {name} data is missing")
+        destination_data.put(book, status)
+        return book.id
+
+    @classmethod
+    def book_to_line(cls, book: Book, status: bool | BookStatus) -> str:
+        """
+        Преобразует книгу и её статус в строку с JSON-записью.
+        :param book: Книга.
+        :param status: Статус книги.
+        :return: Строка, заканчивающаяся переводом строки.
+        """
+        record = copy(book.to_dict())
+        record['_status'] = validation_status(status)
+        return json.dumps(record) + '\n'
+
     def _export_book(self, row_num, source_book_list: list[dict[str: Any]],
-                     destination_book_list: dict[int, dict[str: Any]]) -> int:
+                     destination_records: BookRecordStore) -> int:
         """
         Экспортирует книги
         :param row_num: Счётчик экспортируемых строк.
         :param source_book_list: Словарь с данными для экспорта.
-        :param destination_book_list: Словарь с данными, куда производиться экспорт.
+        :param destination_records: Записи книг, куда производиться экспорт.
         :return Самый последний (он же самый большой) идентификатор.
         :raises ValidationError: Ошибка валидации данных.
         :raises KeyError: Данные экспорта отсутствуют.
@@ -74,7 +132,7 @@ class BookRepositoryExport(AbstractBookRepositoryExport):
         for _book in source_book_list:
             book = Book(_book['_title'], _book['_author'], _book['_year'])
             book.set_id(_book['_id'])
-            destination_book_list[validation_id(book.id)] = book
+            destination_records.put(book, BookStatus.AVAILABLE.value)
             # Сразу же ищется самый последний (он же самый большой) идентификатор.
             if book.id > last_id:
                 last_id = book.id
@@ -82,12 +140,13 @@ class BookRepositoryExport(AbstractBookRepositoryExport):
 
         return last_id
 
-    def _export_statuses(self, row_num, source_status_dict: dict[int, bool], destination_status_dict: dict[int, bool]):
+    def _export_statuses(self, row_num, source_status_dict: dict[int, bool], destination_records: BookRecordStore):
         """
         Экспортирует статусы книг.
+        Статусы книг, которых нет среди экспортированных книг, проверяются, но не сохраняются.
         :param row_num: Счётчик экспортируемых строк.
         :param source_status_dict: Словарь с данными для экспорта.
-        :param destination_status_dict: Словарь с данными, куда производиться экспорт.
+        :param destination_records: Записи книг, куда производиться экспорт.
         :raises ValidationError: Ошибка валидации данных.
         """
         for _id, status in source_status_dict.items():
@@ -95,7 +154,9 @@ class BookRepositoryExport(AbstractBookRepositoryExport):
             # При экспорте проверятся, чтобы такой идентификатор не превышал самый большой идентификатор в хранилище.
             if _id > self._last_id:
                 ValidationError(f'The identifier does not exist in the book store.', 'status', _id)
-            destination_status_dict[validation_id(_id)] = validation_status(status)
+            status = validation_status(status)
+            if _id in destination_records:
+                destination_records.set_status(_id, status)
             row_num[0] = row_num[0] + 1
 
     def _to_json(self) -> str:
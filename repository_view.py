@@ -0,0 +1,68 @@
+from typing import Iterator
+
+from book import Book, BookStatus
+from record_store import BookRecord, BookRecordStore
+
+
+class RepositoryView:
+    """
+    Представление хранилища только для чтения, закреплённое за его версией.
+    Долгие выгрузки, списки и поиски обходят представление, а не само хранилище, поэтому изменения хранилища
+    во время обхода не прерывают его и не видны в нём. Представление держит записи своей версии, пока на него
+    есть ссылки, а после этого записи удаляются сборщиком мусора.
+    """
+    __slots__ = ('_records', '_version')
+
+    def __init__(self, records: BookRecordStore, version: int):
+        """
+        Конструктор класса.
+        :param records: Записи книг версии, которые не меняются.
+        :param version: Номер версии хранилища.
+        """
+        self._records = records
+        self._version = version
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, _id) -> bool:
+        return _id in self._records
+
+    @property
+    def version(self) -> int:
+        """ Номер версии хранилища, за которой закреплено представление. """
+        return self._version
+
+    @property
+    def number_of_books(self) -> int:
+        """ Количество книг в версии. """
+        return len(self._records)
+
+    @property
+    def records(self) -> BookRecordStore:
+        """ Записи книг версии. """
+        return self._records
+
+    def get_book_by_id(self, _id: int) -> Book | None:
+        """ Возвращает книгу или None, если книги с таким идентификатором в версии нет. """
+        record = self._records.get(_id)
+        return None if record is None else record.book
+
+    def get_book_with_status(self, _id: int) -> tuple[Book, BookStatus] | None:
+        """ Возвращает пару (книга, статус) или None, если книги с таким идентификатором в версии нет. """
+        record = self._records.get(_id)
+        return None if record is None else (record.book, BookStatus.get_status(record.status))
+
+    def iter_books_with_status(self) -> Iterator[tuple[Book, BookStatus]]:
+        """ Обходит книги версии вместе с их статусами. """
+        for book, status in self._records.records():
+            yield book, BookStatus.get_status(status)
+
+    def iter_records(self) -> Iterator[BookRecord]:
+        """ Обходит записи книг версии. """
+        return self._records.records()
+
+    def count_by_status(self) -> dict[BookStatus, int]:
+        """ Подсчитывает количество книг версии с каждым статусом. """
+        available = self._records.count_available()
+        return {BookStatus.AVAILABLE: available, BookStatus.GIVEN_OUT: len(self._records) - available}
@@ -0,0 +1,566 @@
+import heapq
+import multiprocessing
+import os
+import threading
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Any, Iterable
+
+from abstract_class import AbstractBookRepository
+from bloom_filter import BloomFilter
+from book import Book, BookStatus
+from enums import ChangeKind, SearchCriteria
+from book_repository import BookRepository
+from exceptions import BookRepositoryError, ValidationError, SimpleLibraryException
+from record_store import BookRecord, BookRecordStore
+from repository_export import BookRepositoryExport
+from snapshot_io import open_snapshot, SnapshotReader, is_line_delimited
+from validation import validation_id, validation_status, validation_year
+
+
+def _put_books(book_repository: BookRepository, records: list[tuple[Book, bool]]) -> int:
+    """
+    Помещает в шард пачку книг с уже назначенными идентификаторами.
+    :param book_repository: Хранилище шарда.
+    :param records: Список пар (книга, статус).
+    :return: Количество помещённых книг.
+    """
+    for book, status in records:
+        book_repository.put_book(book, status)
+    return len(records)
+
+
+def _import_shard(book_repository: BookRepository) -> tuple[list[dict[str: Any]], dict[int, bool]]:
+    """ Импортирует данные шарда в виде простых объектов. """
+    return BookRepositoryExport(book_repository).import_data()
+
+
+def _shard_ids(book_repository: BookRepository) -> list[int]:
+    """ Возвращает идентификаторы книг шарда. """
+    return list(book_repository._records)
+
+
+def _remove_record(book_repository: BookRepository, _id: int) -> BookRecord | None:
+    """
+    Удаляет книгу из шарда и возвращает её запись со статусом на момент удаления.
+    :return: Запись удалённой книги или None, если книги в шарде нет.
+    """
+    record = book_repository._records.get(_id)
+    return None if record is None else BookRecord(book_repository.remove_book(_id), record.status)
+
+
+def _change_status(book_repository: BookRepository, _id: int, status: bool) -> Book | None:
+    """
+    Изменяет статус книги шарда.
+    :return: Книга с изменённым статусом или None, если книги в шарде нет.
+    """
+    return book_repository.changing_status_book(_id, status) if _id in book_repository._records else None
+
+
+_SHARD_COMMANDS = {'put_books': _put_books, 'import_data': _import_shard, 'ids': _shard_ids,
+                   'remove_record': _remove_record, 'change_status': _change_status}
+""" Команды шарда, которые не являются методами хранилища. """
+
+
+def _shard_worker(connection: Connection):
+    """
+    Рабочий процесс шарда.
+    Хранит свою часть книг в обычном хранилище и выполняет присылаемые ему команды,
+    пока не получит команду завершения.
+    :param connection: Канал связи с координатором.
+    """
+    book_repository = BookRepository()
+    while True:
+        command, args = connection.recv()
+        if command is None:
+            break
+        try:
+            if command in _SHARD_COMMANDS:
+                result = _SHARD_COMMANDS[command](book_repository, *args)
+            else:
+                # Свойства хранилища возвращаются как есть, а методы вызываются с переданными аргументами.
+                attr = getattr(book_repository, command)
+                result = attr(*args) if callable(attr) else attr
+        except SimpleLibraryException as err:
+            connection.send((False, err))
+        except Exception as err:
+            # Любая другая ошибка возвращается координатору, чтобы процесс шарда не завершился,
+            # а координатор не ждал ответа вечно. Исключение может не сериализоваться, поэтому передаётся текст.
+            connection.send((False, BookRepositoryError(f"The shard failed to execute '{command}': "
+                                                        f"{type(err).__name__}: {err}")))
+        else:
+            connection.send((True, result))
+    connection.close()
+
+
+class ShardedBookRepository(AbstractBookRepository):
+    """
+    Хранилище книг, разделённое по идентификаторам между несколькими процессами.
+    Каждый процесс держит свой шард в обычном хранилище, поиск выполняется всеми шардами параллельно,
+    а изменения направляются шарду, которому принадлежит книга.
+    Для каждого шарда координатор держит фильтр Блума его идентификаторов, поэтому запрос книги
+    с отсутствующим идентификатором в большинстве случаев завершается без обращения к шарду.
+    """
+    BLOOM_ERROR_RATE = 0.01
+
+    def __init__(self, number_of_shards: int | None = None, bloom_error_rate: float = BLOOM_ERROR_RATE,
+                 bloom_max_bytes: int | None = None):
+        """
+        Конструктор класса.
+        :param number_of_shards: Количество шардов, по умолчанию по количеству процессоров.
+        :param bloom_error_rate: Допустимая вероятность ложноположительного ответа фильтров Блума.
+        :param bloom_max_bytes: Ограничение памяти фильтра Блума одного шарда в байтах, по умолчанию без ограничения.
+        :raises BookRepositoryError: Вероятность ошибки фильтра не в интервале (0, 1);
+                                     Ограничение памяти фильтра не положительное.
+        """
+        super().__init__()
+        if not 0 < bloom_error_rate < 1:
+            raise BookRepositoryError("The Bloom filter error rate must be between 0 and 1")
+        if bloom_max_bytes is not None and bloom_max_bytes <= 0:
+            raise BookRepositoryError("The Bloom filter memory limit must be positive")
+        self._number_of_shards = number_of_shards or os.cpu_count() or 1
+        self._number_of_books = 0
+        self._bloom_error_rate = bloom_error_rate
+        self._bloom_max_bytes = bloom_max_bytes
+        self._filters = [BloomFilter(BloomFilter.MIN_CAPACITY, bloom_error_rate, bloom_max_bytes)
+                         for _ in range(self._number_of_shards)]
+        """ Фильтры Блума идентификаторов шардов. """
+        self._bloom_lookups = 0
+        self._bloom_negatives = 0
+        self._bloom_false_positives = 0
+        # Запросы к шардам из разных потоков не должны перемешиваться в каналах.
+        self._lock = threading.Lock()
+        self._shards: list[tuple[multiprocessing.Process, Connection]] = []
+        for _ in range(self._number_of_shards):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child_connection,), daemon=True)
+            process.start()
+            child_connection.close()
+            self._shards.append((process, parent_connection))
+
+    @property
+    def number_of_shards(self) -> int:
+        """ Количество шардов. """
+        return self._number_of_shards
+
+    @property
+    def bloom_statistics(self) -> dict[str, int | float]:
+        """
+        Статистика фильтров Блума: количество проверенных идентификаторов, отсеянных фильтрами
+        без обращения к шардам и ложноположительных ответов, а также память фильтров
+        и ожидаемая вероятность ошибки наиболее заполненного фильтра.
+        """
+        return {'lookups': self._bloom_lookups, 'negatives': self._bloom_negatives,
+                'false_positives': self._bloom_false_positives,
+                'items': sum(len(bloom_filter) for bloom_filter in self._filters),
+                'memory_bytes': sum(bloom_filter.memory_bytes for bloom_filter in self._filters),
+                'error_rate': self._bloom_error_rate,
+                'expected_error_rate': max(bloom_filter.error_rate for bloom_filter in self._filters)}
+
+    def close(self):
+        """ Завершает процессы шардов. """
+        with self._lock:
+            for process, connection in self._shards:
+                try:
+                    connection.send((None, ()))
+                except OSError:
+                    # Процесс шарда уже завершился.
+                    pass
+                connection.close()
+            for process, _ in self._shards:
+                process.join()
+            self._shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def save(self, filename) -> int:
+        """
+        Сохраняет книги в файл.
+        Файл создаётся, только если хранилище не пустое.
+        :param filename:
+        :return: Количество сохранённых книг.
+        """
+        if self.number_of_books == 0:
+            return 0
+        return self._write_snapshot(filename, self.snapshot())
+
+    def load(self, filename) -> int:
+        """
+        Загружает книги из файла.
+        :param filename:
+        :return: Количество загруженных книг.
+        :raises BookRepositoryError:
+        :raises BookRepositoryExportException:
+        """
+        filename = Path(filename)
+        if not filename.exists():
+            raise BookRepositoryError(f"The file '{filename}' with the saved books was not found")
+        records = BookRecordStore()
+        with open_snapshot(filename, 'r') as f:
+            if is_line_delimited(filename):
+                self._last_id = self._repository_export.export_lines(f, records)
+            else:
+                self._last_id = self._repository_export.export_data(SnapshotReader(f).read(), records)
+        # Загруженные книги распределяются по шардам, которым они принадлежат.
+        shard_records: list[list[tuple[Book, bool]]] = [[] for _ in range(self._number_of_shards)]
+        for book, status in records.records():
+            shard_records[self._shard_num(book.id)].append((book, status))
+        self._put_records(shard_records)
+        # Книги с уже существующими идентификаторами заменяются, поэтому количество книг запрашивается у шардов.
+        self._number_of_books = sum(self._broadcast('number_of_books'))
+        self._rebuild_filters()
+        self._version += 1
+        self._publish(ChangeKind.RESET)
+        return self.number_of_books
+
+    def snapshot(self) -> BookRecordStore:
+        """
+        Возвращает согласованную копию книг и их статусов.
+        :return: Записи книг вместе с их статусами, упорядоченные по идентификатору.
+        """
+        records = BookRecordStore()
+        shard_records = [shard.records() for shard in self._broadcast('snapshot')]
+        for book, status in heapq.merge(*shard_records, key=lambda r: r.book.id):
+            records.put(book, status)
+        return records
+
+    @property
+    def number_of_books(self) -> int:
+        """ Количество книг в хранилище. """
+        return self._number_of_books
+
+    def compact(self, renumber: bool = False) -> tuple[int, dict[int, int]]:
+        """
+        Уплотняет шарды, пересоздавая их словари записей, и пересоздаёт фильтры Блума без удалённых книг.
+        :param renumber: Перенумерация в шардированном хранилище не поддерживается,
+            так как идентификатор определяет шард книги.
+        :return: Кортеж (количество освобождённых записей, пустая таблица перенумерации).
+        :raises BookRepositoryError: Запрошена перенумерация.
+        """
+        if renumber:
+            raise BookRepositoryError("Renumbering is not supported by the sharded repository")
+        removed = sum(removed for removed, _ in self._broadcast('compact'))
+        self._rebuild_filters()
+        return removed, {}
+
+    def count_by_status(self) -> dict[BookStatus, int]:
+        """
+        Подсчитывает количество книг с каждым статусом, шарды считают свои книги параллельно.
+        :return: Словарь {статус: количество книг}.
+        """
+        counts = dict.fromkeys(BookStatus, 0)
+        for shard_counts in self._broadcast('count_by_status'):
+            for status, count in shard_counts.items():
+                counts[status] += count
+        return counts
+
+    @property
+    def all_books(self) -> tuple[Book, ...]:
+        """ Возвращает всё книги из хранилища. """
+        return self._merge(self._broadcast('all_books'))
+
+    def add_book(self, book: Book) -> int:
+        """
+        Добавляет книгу в хранилище.
+        :param book: Добавляемая книга.
+        :return: Идентификатор добавленной в хранилище книги.
+        """
+        self._last_id += 1
+        book.set_id(self._last_id)
+        self._request(book.id, 'put_book', book, BookStatus.AVAILABLE.value)
+        self._add_to_filters((book.id,))
+        self._number_of_books += 1
+        self._version += 1
+        self._publish(ChangeKind.ADD, (BookRecord(book, BookStatus.AVAILABLE.value),))
+        return book.id
+
+    def add_books(self, books: Iterable[Book]) -> tuple[int, ...]:
+        """
+        Добавляет пачку книг в хранилище.
+        Книги раскладываются по шардам и отправляются каждому шарду одной командой.
+        :param books: Добавляемые книги.
+        :return: Идентификаторы добавленных книг.
+        """
+        ids = []
+        shard_records: list[list[tuple[Book, bool]]] = [[] for _ in range(self._number_of_shards)]
+        for book in books:
+            self._last_id += 1
+            book.set_id(self._last_id)
+            shard_records[self._shard_num(book.id)].append((book, BookStatus.AVAILABLE.value))
+            ids.append(book.id)
+        self._put_records(shard_records)
+        self._add_to_filters(ids)
+        self._number_of_books += len(ids)
+        self._version += len(ids)
+        if ids:
+            self._publish(ChangeKind.ADD, (BookRecord(book, status) for records in shard_records
+                                           for book, status in records))
+        return tuple(ids)
+
+    def get_status_book(self, _id) -> BookStatus:
+        """
+        Возвращает статус книги
+        :param _id:
+        :return:
+        :raises BookRepositoryError: Книга с указанным идентификатором отсутствует;
+        """
+        _id = self._validation_id(_id)
+        pair = self._lookup(_id, 'get_book_with_status', _id)
+        if pair is None:
+            raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+        return pair[1]
+
+    def changing_status_book(self, _id: int, status: bool | BookStatus) -> Book:
+        """
+        Изменяет статус книги.
+        :param _id: Идентификатор книги, статус которой надо изменить.
+        :param status: Новый статус книги.
+        :return: Книга с изменённым статусом.
+        :raises BookRepositoryError: Изменить статус книги невозможно, так как хранилище пустое;
+                                     Книга с указанным идентификатором отсутствует;
+                                     Статус должен быть логическим значением.
+        """
+        self._is_repository_empty('changing status')
+        _id = self._validation_id(_id)
+        try:
+            status = validation_status(status)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        book = self._lookup(_id, 'change_status', _id, status)
+        if book is None:
+            raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+        self._version += 1
+        self._publish(ChangeKind.STATUS, (BookRecord(book, status),))
+        return book
+
+    def remove_book(self, _id: int) -> Book:
+        """
+        Удаляет книгу из хранилища.
+        :param _id: Идентификатор удаляемой книги.
+        :return: Удалённая книга.
+        :raises BookRepositoryError: Удалить книги невозможно, так как хранилище пустое;
+                                     Книга с указанным идентификатором отсутствует.
+        """
+        self._is_repository_empty('delete')
+        _id = self._validation_id(_id)
+        record = self._lookup(_id, 'remove_record', _id)
+        if record is None:
+            raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+        self._number_of_books -= 1
+        self._version += 1
+        self._publish(ChangeKind.REMOVE, (record,))
+        return record.book
+
+    def get_book_by_id(self, _id: int) -> Book | None:
+        """
+        Получение книги по её идентификатору.
+        :param _id: Идентификатор книги, которую требуется вернуть.
+        :return: Найденная по указанному идентификатору книга или None, если книги с таим идентификатором нет.
+        :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
+        """
+        try:
+            _id = validation_id(_id)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        return self._lookup(_id, 'get_book_by_id', _id)
+
+    def get_book_with_status(self, _id: int) -> tuple[Book, BookStatus] | None:
+        """
+        Получение книги вместе с её статусом по идентификатору книги.
+        :param _id: Идентификатор книги, которую требуется вернуть.
+        :return: Пара (книга, статус) или None, если книги с таким идентификатором нет.
+        :raises BookRepositoryError: Ошибка проверки корректности идентификатора.
+        """
+        try:
+            _id = validation_id(_id)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        return self._lookup(_id, 'get_book_with_status', _id)
+
+    def find_book_by_author(self, author: str) -> tuple[Book, ...]:
+        """ Поиск книг по автору. """
+        if author.strip() == "":
+            return ()
+        return self._merge(self._broadcast('find_book_by_author', author))
+
+    def find_book_by_title(self, title: str) -> tuple[Book, ...]:
+        """ Поиск книг по заголовку. """
+        # При пустом запросе должен вернуться пустой кортеж
+        if title.strip() == "":
+            return ()
+        return self._merge(self._broadcast('find_book_by_title', title))
+
+    def find_book_by_year(self, year: int) -> tuple[Book, ...]:
+        """
+        Поиск книг по году издания.
+        :param year:
+        :return:
+        :raises BookRepositoryError: Ошибка при указании года выпуска книги.
+        """
+        try:
+            year = validation_year(year)
+        except ValidationError as err:
+            raise BookRepositoryError(err.message)
+        return self._merge(self._broadcast('find_book_by_year', year))
+
+    def find_books_with_status(self, search_criteria: SearchCriteria, search_val: str | int) \
+            -> tuple[tuple[Book, BookStatus], ...]:
+        """
+        Ищет книги и возвращает их вместе со статусами, шарды ищут параллельно.
+        :param search_criteria: Критерий поиска.
+        :param search_val: Значение поиска.
+        :return: Кортеж пар (книга, статус), упорядоченных по идентификатору книги.
+        :raises BookRepositoryError: Ошибка при указании года выпуска книги;
+                                     Указан неверный критерий поиска.
+        """
+        # Ошибки запроса проверяются до рассылки, чтобы все шарды ответили одинаково.
+        match search_criteria:
+            case SearchCriteria.SEARCH_TITLE | SearchCriteria.SEARCH_AUTHOR:
+                if search_val.strip() == "":
+                    return ()
+            case SearchCriteria.SEARCH_YEAR:
+                try:
+                    search_val = validation_year(search_val)
+                except ValidationError as err:
+                    raise BookRepositoryError(err.message)
+            case _:
+                raise BookRepositoryError("Invalid search criteria specified")
+        shard_results = self._broadcast('find_books_with_status', search_criteria, search_val)
+        return tuple(heapq.merge(*shard_results, key=lambda pair: pair[0].id))
+
+    def _shard_num(self, _id: int) -> int:
+        """ Возвращает номер шарда, которому принадлежит книга с указанным идентификатором. """
+        return _id % self._number_of_shards
+
+    def _lookup(self, _id: int, command: str, *args):
+        """
+        Выполняет команду над книгой в её шарде, если фильтр Блума шарда допускает, что книга там есть.
+        Все обращения по идентификатору идут через этот метод, поэтому статистика фильтров учитывает каждое из них.
+        :param _id: Идентификатор книги.
+        :param command: Команда шарда, которая возвращает None, если книги в шарде нет.
+        :param args: Аргументы команды.
+        :return: Ответ шарда или None, если книги с указанным идентификатором нет.
+        :raises BookRepositoryError: Ошибка, возникшая в шарде.
+        """
+        self._bloom_lookups += 1
+        if _id not in self._filters[self._shard_num(_id)]:
+            self._bloom_negatives += 1
+            return None
+        result = self._request(_id, command, *args)
+        if result is None:
+            self._bloom_false_positives += 1
+        return result
+
+    def _add_to_filters(self, ids: Iterable[int]):
+        """ Добавляет идентификаторы в фильтры Блума, переполненные фильтры пересоздаются с большей ёмкостью. """
+        for _id in ids:
+            self._filters[self._shard_num(_id)].add(_id)
+        if any(bloom_filter.is_full for bloom_filter in self._filters):
+            self._rebuild_filters()
+
+    def _rebuild_filters(self):
+        """ Пересоздаёт фильтры Блума по идентификаторам книг, которые хранятся в шардах. """
+        self._filters = [BloomFilter.from_ids(ids, self._bloom_error_rate, self._bloom_max_bytes)
+                         for ids in self._broadcast('ids')]
+
+    @classmethod
+    def _validation_id(cls, _id) -> int:
+        """
+        Проверяет идентификатор книги перед выбором шарда.
+        :raises BookRepositoryError: Книга с указанным идентификатором отсутствует.
+        """
+        try:
+            return validation_id(_id)
+        except ValidationError:
+            raise BookRepositoryError(f"The book with the ID {_id} is missing.")
+
+    def _put_records(self, shard_records: list[list[tuple[Book, bool]]]):
+        """
+        Помещает книги в шарды параллельно.
+        :param shard_records: Для каждого шарда список пар (книга, статус).
+        """
+        with self._lock:
+            for (_, connection), records in zip(self._shards, shard_records):
+                self._send(connection, 'put_books', records)
+            self._receive_all()
+
+    def _request(self, _id: int, command: str, *args):
+        """
+        Выполняет команду в шарде, которому принадлежит книга.
+        :raises BookRepositoryError: Ошибка, возникшая в шарде.
+        """
+        _, connection = self._shards[self._shard_num(_id)]
+        with self._lock:
+            self._send(connection, command, *args)
+            return self._receive(connection)
+
+    def _broadcast(self, command: str, *args) -> list:
+        """
+        Выполняет команду во всех шардах параллельно.
+        Вначале команда рассылается всем шардам, и только потом собираются их ответы.
+        :return: Список ответов шардов.
+        :raises BookRepositoryError: Ошибка, возникшая в шарде.
+        """
+        with self._lock:
+            for _, connection in self._shards:
+                self._send(connection, command, *args)
+            return self._receive_all()
+
+    def _receive_all(self) -> list:
+        """
+        Получает ответы всех шардов.
+        Ответы собираются целиком и только потом выбрасывается ошибка, иначе непрочитанные ответы
+        остальных шардов достались бы следующему запросу.
+        :raises BookRepositoryError: Ошибка, возникшая в одном из шардов.
+        """
+        results, error = [], None
+        for _, connection in self._shards:
+            try:
+                results.append(self._receive(connection))
+            except SimpleLibraryException as err:
+                error = error or err
+        if error is not None:
+            raise error
+        return results
+
+    @classmethod
+    def _send(cls, connection: Connection, command: str, *args):
+        """
+        Отправляет команду шарду.
+        :raises BookRepositoryError: Процесс шарда завершился.
+        """
+        try:
+            connection.send((command, args))
+        except OSError:
+            raise BookRepositoryError("The shard process has terminated")
+
+    @classmethod
+    def _receive(cls, connection: Connection):
+        """
+        Получает ответ шарда.
+        :raises BookRepositoryError: Ошибка, возникшая в шарде; процесс шарда завершился.
+        """
+        try:
+            success, result = connection.recv()
+        except (EOFError, OSError):
+            raise BookRepositoryError("The shard process has terminated")
+        if not success:
+            raise result
+        return result
+
+    @classmethod
+    def _merge(cls, shard_results: list[tuple[Book, ...]]) -> tuple[Book, ...]:
+        """ Объединяет результаты шардов, упорядочивая книги по идентификатору. """
+        return tuple(heapq.merge(*shard_results, key=lambda b: b.id))
+
+    def _is_repository_empty(self, action: str):
+        """
+        Проверка на пустое хранилище.
+        :raises BookRepositoryError: Удалить книги невозможно, так как хранилище пустое.
+        """
+        if self.number_of_books == 0:
+            raise BookRepositoryError(f"It is impossible to {action} books because the repository is empty.")
@@ -0,0 +1,237 @@
+import json
+from pathlib import Path
+from typing import Any, Callable, Iterator, TextIO
+
+from exceptions import BookRepositoryExportException
+from record_store import BookRecordStore
+
+
+COMPRESSIONS = {
+    'gzip': (b'\x1f\x8b', ('.gz', '.gzip')),
+    'bz2': (b'BZh', ('.bz2',)),
+    'lzma': (b'\xfd7zXZ\x00', ('.xz', '.lzma')),
+}
+""" Поддерживаемые виды сжатия: сигнатура файла и расширения. """
+
+LINE_DELIMITED_SUFFIXES = ('.ndjson', '.jsonl')
+""" Расширения построчного формата снимка. """
+
+CHUNK_SIZE = 64 * 1024
+""" Размер блока, которым читается снимок. """
+
+
+def detect_compression(filename, mode: str = 'r') -> str | None:
+    """
+    Определяет вид сжатия снимка.
+    При чтении сжатие определяется по сигнатуре файла, а при записи по расширению.
+    :param filename:
+    :param mode: Режим 'r' для чтения или 'w' для записи.
+    :return: Вид сжатия или None, если снимок не сжат.
+    """
+    filename = Path(filename)
+    if mode == 'r':
+        with open(filename, 'rb') as f:
+            header = f.read(6)
+        for compression, (magic, _) in COMPRESSIONS.items():
+            if header.startswith(magic):
+                return compression
+        return None
+    for compression, (_, suffixes) in COMPRESSIONS.items():
+        if filename.suffix.lower() in suffixes:
+            return compression
+    return None
+
+
+def is_line_delimited(filename) -> bool:
+    """
+    Проверяет, что снимок хранится в построчном формате, по одной книге в строке.
+    Формат определяется по расширению, расширение сжатия при этом не учитывается.
+    :param filename:
+    """
+    filename = Path(filename)
+    if detect_compression(filename, 'w') is not None:
+        filename = filename.with_suffix('')
+    return filename.suffix.lower() in LINE_DELIMITED_SUFFIXES
+
+
+def split_lines(filename, number_of_chunks: int) -> list[tuple[int, int]]:
+    """
+    Делит несжатый файл на примерно равные части по границам строк.
+    :param filename:
+    :param number_of_chunks: Желаемое количество частей.
+    :return: Список диапазонов байт (начало, конец) каждой части.
+    """
+    size = Path(filename).stat().st_size
+    boundaries = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, number_of_chunks):
+            f.seek(size * i // number_of_chunks)
+            # Часть заканчивается в конце строки, в которую попало смещение.
+            f.readline()
+            boundary = f.tell()
+            if boundary > boundaries[-1] and boundary < size:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def open_snapshot(filename, mode: str = 'r', compression_level: int | None = None) -> TextIO:
+    """
+    Открывает файл снимка в текстовом режиме, при необходимости потоково сжимая или распаковывая его.
+    :param filename:
+    :param mode: Режим 'r' для чтения или 'w' для записи.
+    :param compression_level: Уровень сжатия, или None для уровня по умолчанию.
+    :return: Открытый файл.
+    """
+    compression = detect_compression(filename, mode)
+    text_mode = mode + 't'
+    # Модули сжатия импортируются, только когда снимок действительно сжат.
+    match compression:
+        case 'gzip':
+            import gzip
+            level = 9 if compression_level is None else compression_level
+            return gzip.open(filename, text_mode, compresslevel=level, encoding='utf-8')
+        case 'bz2':
+            import bz2
+            level = 9 if compression_level is None else compression_level
+            return bz2.open(filename, text_mode, compresslevel=level, encoding='utf-8')
+        case 'lzma':
+            import lzma
+            preset = compression_level if mode == 'w' else None
+            return lzma.open(filename, text_mode, preset=preset, encoding='utf-8')
+        case _:
+            return open(filename, mode, encoding='utf-8')
+
+
+def write_snapshot(f: TextIO, records: BookRecordStore, progress: Callable[[int], None] | None = None) -> int:
+    """
+    Потоково записывает снимок хранилища в формате [[book, ...], {id: status, ...}].
+    Книги сериализуются по одной, поэтому весь снимок целиком в памяти не строится.
+    :param f: Файл, открытый на запись в текстовом режиме.
+    :param records: Записи книг хранилища вместе с их статусами.
+    :param progress: Функция, которой передаётся количество уже записанных книг.
+    :return: Количество записанных книг.
+    """
+    count = 0
+    f.write('[[')
+    for book, _ in records.records():
+        if count > 0:
+            f.write(', ')
+        f.write(json.dumps(book.to_dict()))
+        count += 1
+        if progress is not None:
+            progress(count)
+    f.write('], {')
+    for i, (book, status) in enumerate(records.records()):
+        if i > 0:
+            f.write(', ')
+        f.write(f'"{book.id}": {json.dumps(status)}')
+    f.write('}]')
+    return count
+
+
+class SnapshotReader:
+    """
+    Потоковое чтение снимка хранилища в формате [[book, ...], {id: status, ...}].
+    Файл читается блоками, а книги разбираются по одной, поэтому текст снимка целиком в памяти не хранится.
+    """
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, f: TextIO, chunk_size: int = CHUNK_SIZE):
+        """
+        Конструктор класса.
+        :param f: Файл, открытый на чтение в текстовом режиме.
+        :param chunk_size: Размер блока чтения.
+        """
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def read(self) -> tuple[Iterator[dict[str: Any]], dict[str, Any]]:
+        """
+        Читает снимок.
+        Книги возвращаются генератором, который надо полностью прочитать до обращения к статусам.
+        :return: Кортеж из генератора книг и словаря статусов книг.
+        :raises BookRepositoryExportException: Снимок повреждён.
+        """
+        books_status: dict[str, Any] = {}
+
+        def books() -> Iterator[dict[str: Any]]:
+            self._expect('[')
+            self._expect('[')
+            if not self._next_is(']'):
+                while True:
+                    yield self._decode()
+                    if self._next_is(']'):
+                        break
+                    self._expect(',')
+            self._expect(',')
+            # Статусы разбираются сразу за книгами.
+            self._expect('{')
+            if not self._next_is('}'):
+                while True:
+                    key = self._decode()
+                    self._expect(':')
+                    books_status[key] = self._decode()
+                    if self._next_is('}'):
+                        break
+                    self._expect(',')
+            self._expect(']')
+
+        return books(), books_status
+
+    def _fill(self) -> bool:
+        """ Дочитывает очередной блок в буфер, отбрасывая уже разобранную часть. """
+        if self._eof:
+            return False
+        chunk = self._f.read(self._chunk_size)
+        if chunk == '':
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        """ Пропускает пробельные символы. """
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _next_is(self, char: str) -> bool:
+        """ Проверяет следующий символ и, если он совпал, пропускает его. """
+        self._skip_whitespace()
+        if self._buffer[self._pos:self._pos + 1] == char:
+            self._pos += 1
+            return True
+        return False
+
+    def _expect(self, char: str):
+        """
+        Пропускает обязательный символ.
+        :raises BookRepositoryExportException: Снимок повреждён.
+        """
+        if not self._next_is(char):
+            raise BookRepositoryExportException(f"The snapshot is corrupted: '{char}' was expected")
+
+    def _decode(self) -> Any:
+        """
+        Разбирает очередное JSON-значение.
+        :raises BookRepositoryExportException: Снимок повреждён.
+        """
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Число на границе блока может быть прочитано не полностью.
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise BookRepositoryExportException("The snapshot is corrupted: the value cannot be decoded")
+            self._fill()
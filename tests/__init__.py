@@ -0,0 +1,13 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+from helper import Logger
+
+# Журнал тестов пишется во временный каталог, чтобы запуск тестов не оставлял файлов в репозитории.
+# Переменная окружения передаёт каталог и процессам, которые запускают тесты.
+_log_dir = tempfile.mkdtemp(prefix='library_logs_')
+atexit.register(shutil.rmtree, _log_dir, ignore_errors=True)
+os.environ[Logger.LOG_DIR_VARIABLE] = _log_dir
+Logger.set_log_dir(_log_dir)
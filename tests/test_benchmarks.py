@@ -0,0 +1,36 @@
+import unittest
+from collections import Counter
+
+from benchmarks.catalog import generate_catalog
+from benchmarks.repository import compare, run_size
+from validation import validation_columns
+
+
+class BenchmarksTest(unittest.TestCase):
+    """ Тестирование генератора каталога и замеров хранилища. """
+    def test_generate_catalog(self):
+        """ Проверяет, что каталог воспроизводим и состоит из корректных книг. """
+        catalog = list(generate_catalog(2000, seed=1))
+        self.assertEqual(catalog, list(generate_catalog(2000, seed=1)))
+        self.assertNotEqual(catalog, list(generate_catalog(2000, seed=2)))
+
+        titles, authors, years = zip(*catalog)
+        self.assertEqual(validation_columns({'title': titles, 'author': authors, 'year': years})[1], [])
+        self.assertTrue(any(title.isascii() for title in titles))
+        self.assertTrue(any(not title.isascii() for title in titles))
+        # Самый популярный автор по закону Ципфа встречается заметно чаще десятого по популярности.
+        counts = [count for _, count in Counter(authors).most_common(10)]
+        self.assertGreater(counts[0], counts[-1] * 3)
+
+    def test_run_and_compare(self):
+        """ Проверяет замеры на маленьком каталоге и сравнение с базовыми результатами. """
+        results = run_size(500, samples=20)
+        self.assertEqual({result['operation'] for result in results},
+                         {'add_books', 'add_book', 'change_status', 'search_title', 'search_author', 'search_year',
+                          'import_data', 'save', 'load', 'remove'})
+
+        baseline = [dict(result, seconds_per_op=result['seconds_per_op'] / 2) for result in results]
+        comparisons = compare(results, baseline, tolerance=0.5)
+        self.assertEqual(len(comparisons), len([result for result in results if result['seconds_per_op'] > 0]))
+        self.assertTrue(all(comparison['regression'] for comparison in comparisons))
+        self.assertFalse(any(comparison['regression'] for comparison in compare(results, results)))
@@ -0,0 +1,32 @@
+import unittest
+
+from bitmap import Bitmap
+
+
+class BitmapTest(unittest.TestCase):
+    """ Тестирование битовой карты. """
+    def test_set_and_clear(self):
+        """ Проверяет установку, сброс и подсчёт битов. """
+        bitmap = Bitmap()
+        for index in (1, 3, 8, 100):
+            bitmap.set(index)
+        self.assertTrue(bitmap[100])
+        self.assertFalse(bitmap[2])
+        # Биты за пределами карты считаются сброшенными.
+        self.assertFalse(bitmap[10_000])
+        self.assertEqual(bitmap.count(), 4)
+        bitmap[3] = False
+        bitmap.clear(10_000)
+        self.assertEqual(list(bitmap), [1, 8, 100])
+        self.assertEqual(list(bitmap.iter_clear(5)), [0, 2, 3, 4])
+
+    def test_bitwise_operations(self):
+        """ Проверяет побитовые операции над картами разного размера. """
+        first = Bitmap.from_indexes((1, 2, 3, 40))
+        second = Bitmap.from_indexes((2, 3, 4))
+        self.assertEqual(list(first & second), [2, 3])
+        self.assertEqual(list(first | second), [1, 2, 3, 4, 40])
+        self.assertEqual(list(first ^ second), [1, 4, 40])
+        self.assertEqual(list(first - second), [1, 40])
+        self.assertEqual((~second).count(), len(second) - 3)
+        self.assertEqual(Bitmap.from_bytes(first.to_bytes()), first)
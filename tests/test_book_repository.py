@@ -3,6 +3,7 @@ import unittest
 from pathlib import Path
 
 from abstract_class import AbstractBookRepositoryExport
+from background_save import BackgroundSave
 from book import Book, BookStatus
 from book_repository import BookRepository
 from exceptions import BookRepositoryError, BookRepositoryExportException, ValidationError
@@ -526,4 +527,95 @@ class BookRepositoryTest(unittest.TestCase):
             # Проверка, что книга найдена,
             self.assertIsNotNone(find_new_book)
             # и имеет новый идентификатор.
-            self.assertEqual(find_new_book.id, last_id + 1)
\ No newline at end of file
+            self.assertEqual(find_new_book.id, last_id + 1)
+
+    def test_save_in_background(self):
+        """ Проверяет фоновое сохранение хранилища. """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = Path(tmpdir, 'book_repository.json')
+            book_repository = self._get_repository_filled_with_books()
+            book_repository.set_repository_export(BookRepositoryExport(book_repository))
+
+            background_save = book_repository.save_in_background(filename)
+            # Во время сохранения хранилище можно изменять, но в этот снимок изменения уже не попадут.
+            book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000))
+            book_repository.changing_status_book(1, BookStatus.GIVEN_OUT)
+            self.assertTrue(background_save.wait(5))
+            self.assertTrue(background_save.done)
+            self.assertIsNone(background_save.error)
+            self.assertEqual(background_save.saved_books, 6)
+            self.assertEqual(background_save.progress, 1.0)
+
+            other_book_repository = BookRepository()
+            other_book_repository.set_repository_export(BookRepositoryExport(other_book_repository))
+            self.assertEqual(other_book_repository.load(filename), 6)
+            self.assertEqual(other_book_repository.get_status_book(1), BookStatus.AVAILABLE)
+
+            # Следующее сохранение подхватывает изменения, сделанные во время предыдущего.
+            background_save = book_repository.save_in_background(filename)
+            self.assertTrue(background_save.wait(5))
+            other_book_repository = BookRepository()
+            other_book_repository.set_repository_export(BookRepositoryExport(other_book_repository))
+            self.assertEqual(other_book_repository.load(filename), 7)
+            self.assertEqual(other_book_repository.get_status_book(1), BookStatus.GIVEN_OUT)
+
+    def test_failed_background_save(self):
+        """ Проверяет, что любая ошибка фонового сохранения сохраняется в нём, а не теряется в потоке. """
+        def write_snapshot(progress):
+            raise TypeError("Unexpected error")
+
+        background_save = BackgroundSave(write_snapshot, 1).start()
+        self.assertTrue(background_save.wait(5))
+        self.assertIsInstance(background_save.error, TypeError)
+        self.assertEqual(background_save.saved_books, 0)
+
+    def test_compact(self):
+        """ Проверяет уплотнение хранилища и перенумерацию книг. """
+        book_repository = self._get_repository_filled_with_books()
+        book_repository.set_compaction_threshold(None)
+        book_repository.remove_book(2)
+        book_repository.remove_book(4)
+        self.assertEqual(book_repository.dead_entries, 2)
+
+        self.assertEqual(book_repository.compact(), (2, {}))
+        self.assertEqual(book_repository.dead_entries, 0)
+        with self.assertRaises(BookRepositoryError):
+            book_repository.get_status_book(2)
+
+        # Снимок, взятый до перенумерации, не меняется.
+        records = book_repository.snapshot()
+        version = book_repository.version
+        self.assertEqual(book_repository.compact(renumber=True), (0, {3: 2, 5: 3, 6: 4}))
+        self.assertEqual(records[6].book.id, 6)
+        self.assertGreater(book_repository.version, version)
+        self.assertEqual([book.id for book in book_repository.all_books], [1, 2, 3, 4])
+        self.assertEqual(book_repository.get_book_by_id(4).title, "Звездные войны. Возвращение джедая")
+        self.assertEqual(book_repository.get_status_book(4), BookStatus.GIVEN_OUT)
+        self.assertEqual(book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 5)
+
+    def test_status_bitmap(self):
+        """ Проверяет битовые карты статусов и их объединение с картой годов издания. """
+        book_repository = self._get_repository_filled_with_books()
+        available = book_repository.status_bitmap(BookStatus.AVAILABLE)
+        self.assertEqual(list(available), [1, 2, 3, 5])
+        self.assertEqual(list(book_repository.status_bitmap(BookStatus.GIVEN_OUT)), [4, 6])
+        self.assertEqual(list(available & book_repository.year_bitmap(1980, 1999)), [1, 2, 5])
+
+        book_repository.changing_status_book(4, True)
+        book_repository.remove_book(1)
+        self.assertEqual(book_repository.count_by_status(),
+                         {BookStatus.AVAILABLE: 4, BookStatus.GIVEN_OUT: 1})
+        # Ранее полученная карта не меняется вместе с хранилищем.
+        self.assertEqual(list(available), [1, 2, 3, 5])
+
+    def test_auto_compact(self):
+        """ Проверяет автоматическое уплотнение при превышении доли удалённых записей. """
+        book_repository = BookRepository()
+        book_repository.add_books(Book(f"Книга номер {i}", "Автор", 2000) for i in range(4000))
+        for _id in range(1, BookRepository.COMPACTION_MIN_ENTRIES):
+            book_repository.remove_book(_id)
+        # Удалённых записей меньше порога.
+        self.assertEqual(book_repository.dead_entries, BookRepository.COMPACTION_MIN_ENTRIES - 1)
+        book_repository.remove_book(BookRepository.COMPACTION_MIN_ENTRIES)
+        self.assertEqual(book_repository.dead_entries, 0)
+        self.assertEqual(book_repository.number_of_books, 3000)
@@ -0,0 +1,53 @@
+import io
+import json
+import unittest
+
+from book import BookStatus
+from book_manager import BookManager
+from book_repository import BookRepository
+from catalog_export import CatalogExporter
+from exceptions import BookManagerError
+
+
+class CatalogExportTest(unittest.TestCase):
+    """ Тестирование потоковой выгрузки каталога. """
+
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_manager = BookManager(self.book_repository)
+        for book_data in (("Толковый словарь", "В.И. Даль", 1982),
+                          ("Ночной дозор", "Сергей Лукьяненко", 1998),
+                          ("Дневной дозор", "Сергей Лукьяненко", 2000),
+                          ("Звездные войны. Новая надежда", "Алан Дин Фостер", 1976)):
+            self.book_manager.add_book(*book_data)
+        self.book_manager.changing_status_book(3, BookStatus.GIVEN_OUT)
+
+    def test_export_ndjson(self):
+        """ Проверяет выгрузку в NDJSON с фильтрами. """
+        f = io.StringIO()
+        count = self.book_manager.export_catalog(f, 'ndjson', author="лукьяненко")
+        self.assertEqual(count, 2)
+        rows = [json.loads(line) for line in f.getvalue().splitlines()]
+        self.assertEqual(rows, [
+            {'id': 2, 'title': "Ночной дозор", 'author': "Сергей Лукьяненко", 'year': 1998, 'status': 'available'},
+            {'id': 3, 'title': "Дневной дозор", 'author': "Сергей Лукьяненко", 'year': 2000, 'status': 'given_out'},
+        ])
+
+        f = io.StringIO()
+        self.assertEqual(self.book_manager.export_catalog(f, 'ndjson', status=BookStatus.AVAILABLE, year_to=1990), 2)
+
+    def test_export_csv(self):
+        """ Проверяет выгрузку в CSV маленькими блоками. """
+        f = io.StringIO()
+        count = CatalogExporter(self.book_repository, buffer_rows=1).export(f, 'csv', year_from=1980)
+        self.assertEqual(count, 3)
+        self.assertEqual(f.getvalue().splitlines(), [
+            "id,title,author,year,status",
+            "1,Толковый словарь,В.И. Даль,1982,available",
+            "2,Ночной дозор,Сергей Лукьяненко,1998,available",
+            "3,Дневной дозор,Сергей Лукьяненко,2000,given_out",
+        ])
+
+        with self.assertRaises(BookManagerError) as cm:
+            self.book_manager.export_catalog(io.StringIO(), 'xml')
+        self.assertEqual(cm.exception.message, "Unknown export format 'xml', expected one of: ndjson, csv")
@@ -0,0 +1,101 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from book import Book
+from book_repository import BookRepository
+from change_feed import ChangeEvent
+from disk_book_repository import DiskBookRepository
+from enums import ChangeKind
+from exceptions import BookRepositoryError
+from repository_export import BookRepositoryExport
+
+
+class ChangeFeedTest(unittest.TestCase):
+    """ Тестирование ленты изменений хранилища. """
+
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_repository.set_repository_export(BookRepositoryExport(self.book_repository))
+        self.book_repository.add_books(Book(f"Книга номер {i}", "Автор", 2000) for i in range(5))
+
+    def test_synchronous_events(self):
+        """ Проверяет доставку событий сразу после изменения и одно событие на пачку книг. """
+        events: list[ChangeEvent] = []
+        self.book_repository.change_feed.subscribe(events.append)
+
+        self.book_repository.add_books(Book(f"Новая книга {i}", "Автор", 2020) for i in range(1000))
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0].kind, events[0].version), (ChangeKind.ADD, self.book_repository.version))
+        self.assertEqual([book.id for book, _ in events[0].records], list(range(6, 1006)))
+
+        self.book_repository.changing_status_book(2, False)
+        book = Book("Исправленное название", "Автор", 2000)
+        book.set_id(3)
+        self.book_repository.put_book(book, True)
+        self.book_repository.remove_book(2)
+        self.assertEqual([event.kind for event in events[1:]], [ChangeKind.STATUS, ChangeKind.PUT, ChangeKind.REMOVE])
+        self.assertEqual([(book.id, status) for event in events[1:] for book, status in event.records],
+                         [(2, False), (3, True), (2, False)])
+        self.assertEqual([event.version for event in events], sorted(event.version for event in events))
+        self.assertEqual(events[-1].version, self.book_repository.version)
+
+        # Уплотнение без перенумерации книги не меняет, а перенумерация требует перестроения подписчиков.
+        self.book_repository.compact()
+        self.assertEqual(len(events), 4)
+        self.book_repository.compact(renumber=True)
+        self.assertEqual((events[-1].kind, events[-1].records), (ChangeKind.RESET, ()))
+
+    def test_batched_delivery(self):
+        """ Проверяет доставку пачками, отбор видов событий и отмену подписки. """
+        batches: list[list[ChangeEvent]] = []
+        subscription = self.book_repository.change_feed.subscribe(batches.append, kinds=(ChangeKind.STATUS,),
+                                                                  batch_size=3)
+        self.assertTrue(subscription.batched)
+        for _id in range(1, 5):
+            self.book_repository.changing_status_book(_id, False)
+        self.book_repository.add_book(Book("Новая книга", "Автор", 2020))
+        self.assertEqual([len(batch) for batch in batches], [3])
+        self.assertEqual(subscription.pending, 1)
+
+        self.book_repository.change_feed.flush()
+        self.assertEqual([[event.records[0].book.id for event in batch] for batch in batches], [[1, 2, 3], [4]])
+        self.book_repository.changing_status_book(5, False)
+        subscription.close()
+        self.book_repository.changing_status_book(1, True)
+        self.assertEqual(len(batches), 3)
+        self.assertFalse(self.book_repository.change_feed)
+
+        with self.assertRaises(BookRepositoryError) as cm:
+            self.book_repository.change_feed.subscribe(batches.append, batch_size=0)
+        self.assertEqual(cm.exception.message, "The batch size must be a positive integer")
+
+    def test_reset_and_failing_subscriber(self):
+        """ Проверяет событие сброса при загрузке и то, что ошибка подписчика не прерывает изменение. """
+        def fail(event: ChangeEvent):
+            raise RuntimeError(event.kind)
+
+        events: list[ChangeEvent] = []
+        self.book_repository.change_feed.subscribe(fail)
+        self.book_repository.change_feed.subscribe(events.append)
+        self.assertEqual(len(self.book_repository.change_feed), 2)
+        self.book_repository.remove_book(1)
+        self.assertIsNone(self.book_repository.get_book_by_id(1))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = Path(tmpdir, 'books.json')
+            self.book_repository.save(filename)
+            self.book_repository.load(filename)
+        self.assertEqual([event.kind for event in events], [ChangeKind.REMOVE, ChangeKind.RESET])
+
+    def test_disk_repository_events(self):
+        """ Проверяет события хранилища на диске. """
+        with tempfile.TemporaryDirectory() as tmpdir, DiskBookRepository(Path(tmpdir, 'books.db')) as book_repository:
+            events: list[ChangeEvent] = []
+            book_repository.change_feed.subscribe(events.append)
+            book_repository.add_books(Book(f"Книга номер {i}", "Автор", 2000) for i in range(3))
+            book_repository.changing_status_book(2, False)
+            book_repository.remove_book(2)
+            self.assertEqual([(event.kind, len(event.records)) for event in events],
+                             [(ChangeKind.ADD, 3), (ChangeKind.STATUS, 1), (ChangeKind.REMOVE, 1)])
+            self.assertEqual(events[-1].records[0].status, False)
@@ -0,0 +1,98 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from book import Book
+from book_repository import BookRepository
+from checkpoint import CheckpointScheduler
+from repository_export import BookRepositoryExport
+
+
+class CheckpointSchedulerTest(unittest.TestCase):
+    """ Тестирование планировщика контрольных точек. """
+
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_repository.set_repository_export(BookRepositoryExport(self.book_repository))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = Path(self.tmpdir.name, 'book_repository.json')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _load_number_of_books(self) -> int:
+        """ Загружает сохранённый файл в новое хранилище и возвращает количество книг. """
+        book_repository = BookRepository()
+        book_repository.set_repository_export(BookRepositoryExport(book_repository))
+        return book_repository.load(self.filename)
+
+    def _wait_for(self, condition, timeout: float = 5.0) -> bool:
+        """ Ожидает выполнения условия. """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_checkpoint_by_mutations(self):
+        """ Проверяет, что серия изменений объединяется в одну контрольную точку по количеству изменений. """
+        scheduler = CheckpointScheduler(self.book_repository, self.filename, interval=3600,
+                                        max_mutations=4, poll_interval=0.05)
+        for i in range(5):
+            self.book_repository.add_book(Book(f"Книга {i}", "Неизвестный автор", 2000))
+        scheduler.start()
+        time.sleep(0.2)
+        scheduler.stop()
+        # Изменения до запуска планировщика в контрольную точку не попадают.
+        self.assertEqual(scheduler.number_of_checkpoints, 0)
+
+        scheduler.start()
+        try:
+            for i in range(4):
+                self.book_repository.add_book(Book(f"Книга {i}", "Неизвестный автор", 2000))
+            self.assertTrue(self._wait_for(lambda: scheduler.pending_mutations == 0))
+        finally:
+            scheduler.stop()
+        self.assertEqual(scheduler.number_of_checkpoints, 1)
+        self.assertIsNone(scheduler.last_error)
+        self.assertEqual(self._load_number_of_books(), 9)
+
+    def test_checkpoint_by_time(self):
+        """ Проверяет контрольную точку по истечении времени. """
+        scheduler = CheckpointScheduler(self.book_repository, self.filename, interval=0.2,
+                                        max_mutations=1000, poll_interval=0.05).start()
+        try:
+            self.book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000))
+            # Изменение не сохраняется сразу,
+            time.sleep(0.1)
+            self.assertEqual(scheduler.number_of_checkpoints, 0)
+            # а только по истечении интервала.
+            self.assertTrue(self._wait_for(lambda: scheduler.number_of_checkpoints == 1))
+        finally:
+            scheduler.stop()
+        self.assertEqual(self._load_number_of_books(), 1)
+
+        # Если изменений не было, то контрольная точка не создаётся.
+        self.assertIsNone(scheduler.checkpoint())
+
+    def test_retry_failed_checkpoint(self):
+        """ Проверяет, что изменения неудачной контрольной точки сохраняются при следующей попытке. """
+        # Каталога для файла пока нет, поэтому сохранение завершается ошибкой.
+        filename = Path(self.tmpdir.name, 'checkpoints', 'book_repository.json')
+        scheduler = CheckpointScheduler(self.book_repository, filename, interval=3600,
+                                        max_mutations=1, poll_interval=0.05).start()
+        try:
+            self.book_repository.add_book(Book("Книга", "Неизвестный автор", 2000))
+            self.assertTrue(self._wait_for(lambda: scheduler.last_error is not None))
+            # Неудачная контрольная точка повторяется, хотя новых изменений нет.
+            self.assertTrue(self._wait_for(lambda: scheduler.number_of_checkpoints >= 2))
+
+            filename.parent.mkdir()
+            self.assertTrue(self._wait_for(lambda: filename.exists() and scheduler.pending_mutations == 0))
+        finally:
+            scheduler.stop()
+        self.assertIsNone(scheduler.last_error)
+        self.filename = filename
+        self.assertEqual(self._load_number_of_books(), 1)
@@ -0,0 +1,66 @@
+import csv
+import tempfile
+import unittest
+from pathlib import Path
+
+from book import BookStatus
+from book_manager import BookManager
+from book_repository import BookRepository
+from exceptions import BookManagerError
+
+
+class CsvImportTest(unittest.TestCase):
+    """ Тестирование импорта книг из CSV-файла. """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filename = Path(self.tmpdir.name, 'books.csv')
+        self.reject_filename = Path(self.tmpdir.name, 'rejects.csv')
+        with open(self.filename, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('Year', 'Title', 'Author'))
+            writer.writerow((1982, "Толковый словарь", "В.И. Даль"))
+            writer.writerow((1998, "Ночной дозор", "Сергей Лукьяненко"))
+            writer.writerow((2100, "По", "Сергей Лукьяненко"))
+            writer.writerow(('1976', "Звездные войны. Новая надежда", "А"))
+            writer.writerow((1983, "Звездные войны. Возвращение джедая"))
+            writer.writerow((1980, "Звездные войны. Империя наносит ответный удар", "Дональд Ф."))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_import_csv(self):
+        """ Проверяет импорт корректных строк и запись отклонённых строк. """
+        for max_workers in (1, 2):
+            with self.subTest(max_workers=max_workers):
+                book_repository = BookRepository()
+                book_manager = BookManager(book_repository)
+                imported, rejected = book_manager.import_csv(self.filename, self.reject_filename, max_workers)
+                self.assertEqual((imported, rejected), (3, 3))
+                self.assertEqual(tuple(book.title for book in book_repository.all_books),
+                                 ("Толковый словарь", "Ночной дозор",
+                                  "Звездные войны. Империя наносит ответный удар"))
+                self.assertEqual(book_repository.get_status_book(3), BookStatus.AVAILABLE)
+
+                with open(self.reject_filename, encoding='utf-8', newline='') as f:
+                    rejects = list(csv.reader(f))
+                self.assertEqual(rejects[0], ['row', 'field', 'value', 'message'])
+                # Для отклонённой строки указываются все ошибки.
+                self.assertEqual(rejects[1:], [
+                    ['4', 'title', 'По', "The length of the book title should be from 3 to 50 characters."],
+                    ['4', 'year', '2100', "The year cannot be longer than the current year."],
+                    ['5', 'author', 'А', "The length of the book author should be from 2 to 25 characters."],
+                    ['6', 'author', '', "The length of the book author should be from 2 to 25 characters."],
+                ])
+
+    def test_import_csv_negative(self):
+        """ Проверяет импорт из отсутствующего файла и файла без обязательных колонок. """
+        book_manager = BookManager(BookRepository())
+        with self.assertRaises(BookManagerError):
+            book_manager.import_csv(Path(self.tmpdir.name, 'missing.csv'))
+
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write("title,author\nНочной дозор,Сергей Лукьяненко\n")
+        with self.assertRaises(BookManagerError) as cm:
+            book_manager.import_csv(self.filename)
+        self.assertEqual(cm.exception.message, "The CSV file must contain the columns: title, author, year")
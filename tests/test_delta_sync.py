@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from book import Book, BookStatus
+from book_manager import BookManager
+from book_repository import BookRepository
+from delta_sync import Changeset
+from exceptions import BookManagerError
+from repository_export import BookRepositoryExport
+
+
+class DeltaSyncTest(unittest.TestCase):
+    """ Тестирование вычисления и применения патчей хранилища. """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.base_filename = Path(self.tmpdir.name, 'base.json')
+        self.patch_filename = Path(self.tmpdir.name, 'changes.ndjson.gz')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @classmethod
+    def _get_repository(cls) -> BookRepository:
+        """ Возвращает хранилище с десятью книгами. """
+        book_repository = BookRepository()
+        book_repository.set_repository_export(BookRepositoryExport(book_repository))
+        book_repository.add_books(Book(f"Книга номер {i}", "Автор", 1990 + i) for i in range(1, 11))
+        return book_repository
+
+    def _change_repository(self, book_repository: BookRepository):
+        """ Вносит в хранилище изменения всех видов. """
+        book_repository.remove_book(3)
+        book_repository.remove_book(10)
+        book_repository.changing_status_book(5, False)
+        book = Book("Исправленное название", "Автор", 1994)
+        book.set_id(4)
+        book_repository.put_book(book, False)
+        book_repository.add_book(Book("Новая книга", "Новый автор", 2020))
+
+    @classmethod
+    def _records(cls, book_repository: BookRepository) -> list[tuple[int, str, bool]]:
+        """ Возвращает упорядоченные по идентификатору данные книг хранилища для сравнения. """
+        return sorted((book.id, book.title, status.value) for book, status in book_repository.iter_books_with_status())
+
+    def test_compute(self):
+        """ Проверяет вычисление изменений слиянием упорядоченных списков книг. """
+        base = self._get_repository()
+        target = self._get_repository()
+        self.assertEqual(len(Changeset.compute(base.iter_books_with_status(), target.iter_books_with_status())), 0)
+
+        self._change_repository(target)
+        changeset = Changeset.compute(base.iter_books_with_status(), target.iter_books_with_status())
+        self.assertEqual(changeset.summary, {'added': 1, 'changed': 1, 'statuses': 1, 'removed': 2})
+        self.assertEqual([book.id for book, _ in changeset.added], [11])
+        self.assertEqual([(book.title, status) for book, status in changeset.changed],
+                         [("Исправленное название", False)])
+        self.assertEqual(changeset.statuses, [(5, False)])
+        self.assertEqual(changeset.removed, [3, 10])
+
+    def test_make_and_apply_patch(self):
+        """ Проверяет запись патча и его применение к копии хранилища. """
+        book_repository = self._get_repository()
+        book_repository.save(self.base_filename)
+        self._change_repository(book_repository)
+        book_manager = BookManager(book_repository)
+        summary = book_manager.make_patch(self.base_filename, self.patch_filename)
+        self.assertEqual(summary, {'added': 1, 'changed': 1, 'statuses': 1, 'removed': 2})
+
+        other_repository = self._get_repository()
+        other_manager = BookManager(other_repository)
+        self.assertEqual(other_manager.apply_patch(self.patch_filename), summary)
+        self.assertEqual(self._records(other_repository), self._records(book_repository))
+        self.assertEqual(other_repository.get_status_book(5), BookStatus.GIVEN_OUT)
+
+        # Повторное применение отклоняется, так как хранилище уже не в исходном состоянии.
+        with self.assertRaises(BookManagerError):
+            other_manager.apply_patch(self.patch_filename)
+
+    def test_apply_patch_negative(self):
+        """ Проверяет, что патч для другого состояния не применяется и не меняет хранилище. """
+        book_repository = self._get_repository()
+        book_repository.save(self.base_filename)
+        self._change_repository(book_repository)
+        BookManager(book_repository).make_patch(self.base_filename, self.patch_filename)
+
+        other_repository = self._get_repository()
+        other_repository.remove_book(7)
+        other_repository.add_book(Book("Ещё одна книга", "Автор", 2000))
+        with self.assertRaises(BookManagerError) as cm:
+            BookManager(other_repository).apply_patch(self.patch_filename)
+        self.assertEqual(cm.exception.message, "The book with the ID 11 added by the patch already exists")
+        self.assertIsNotNone(other_repository.get_book_by_id(3))
+
+        broken_filename = Path(self.tmpdir.name, 'broken.ndjson')
+        broken_filename.write_text('{"format": "book-delta", "version": 1, "base_books": 10, "target_books": 10}\n'
+                                   '["+", 11, "По", "Автор", 2000, true]\n')
+        with self.assertRaises(BookManagerError) as cm:
+            Changeset.read(broken_filename)
+        self.assertEqual(cm.exception.message, "Error in the patch on line 2. "
+                                               "The length of the book title should be from 3 to 50 characters.")
+        with self.assertRaises(BookManagerError) as cm:
+            Changeset.read(self.base_filename)
+        self.assertEqual(cm.exception.message, f"The file '{self.base_filename}' is not a repository patch")
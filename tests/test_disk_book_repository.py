@@ -0,0 +1,254 @@
+import gc
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from book import Book, BookStatus
+from disk_book_repository import DiskBookRepository
+from enums import SearchCriteria
+from exceptions import BookRepositoryError, BookRepositoryExportException
+from repository_export import BookRepositoryExport
+
+
+class DiskBookRepositoryTest(unittest.TestCase):
+    """ Тестирование хранилища книг в файле страниц. """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        # Каталог удаляется после закрытия хранилищ, так как очистка выполняется в обратном порядке.
+        self.addCleanup(self.tmpdir.cleanup)
+        self.filename = Path(self.tmpdir.name, 'catalog.pages')
+
+    def _get_repository(self, **kwargs) -> DiskBookRepository:
+        """ Возвращает хранилище со страницами минимального размера. """
+        book_repository = DiskBookRepository(self.filename, page_size=DiskBookRepository.MIN_PAGE_SIZE, **kwargs)
+        book_repository.set_repository_export(BookRepositoryExport(book_repository))
+        self.addCleanup(book_repository.close)
+        return book_repository
+
+    def _get_repository_filled_with_books(self, **kwargs) -> DiskBookRepository:
+        """ Возвращает хранилище с сотней книг, каждая десятая книга выдана. """
+        book_repository = self._get_repository(**kwargs)
+        book_repository.add_books(Book(f"Книга номер {i}", f"Автор {i % 7}", 1900 + i) for i in range(100))
+        for _id in range(10, 101, 10):
+            book_repository.changing_status_book(_id, False)
+        return book_repository
+
+    def test_books_on_pages(self):
+        """ Проверяет добавление, поиск, изменение статуса и удаление книг на страницах. """
+        book_repository = self._get_repository_filled_with_books()
+        self.assertGreater(book_repository.number_of_pages, 1)
+        self.assertEqual(book_repository.number_of_books, 100)
+        self.assertEqual(book_repository.get_book_by_id(42).title, "Книга номер 41")
+        self.assertIsNone(book_repository.get_book_by_id(1000))
+        self.assertEqual(book_repository.get_status_book(20), BookStatus.GIVEN_OUT)
+        self.assertEqual(book_repository.count_by_status(), {BookStatus.AVAILABLE: 90, BookStatus.GIVEN_OUT: 10})
+        self.assertEqual(len(book_repository.find_book_by_author("автор 3")), 14)
+        self.assertEqual([book.id for book in book_repository.find_book_by_year(1950)], [51])
+        self.assertEqual([book.id for book, _ in book_repository.find_books_with_status(
+            SearchCriteria.SEARCH_TITLE, "номер 9")], [10] + list(range(91, 101)))
+
+        self.assertEqual(book_repository.remove_book(42).title, "Книга номер 41")
+        self.assertIsNone(book_repository.get_book_by_id(42))
+        with self.assertRaises(BookRepositoryError) as cm:
+            book_repository.remove_book(42)
+        self.assertEqual(cm.exception.message, "The book with the ID 42 is missing.")
+        self.assertEqual(book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 101)
+        self.assertEqual(book_repository.number_of_books, 100)
+
+    def test_reopen(self):
+        """ Проверяет, что каталог открывается заново вместе с индексом и статусами. """
+        book_repository = self._get_repository_filled_with_books()
+        book_repository.remove_book(5)
+        book_repository.close()
+
+        other_repository = self._get_repository()
+        self.assertEqual(other_repository.number_of_books, 99)
+        self.assertEqual(other_repository.get_status_book(30), BookStatus.GIVEN_OUT)
+        self.assertEqual(tuple(book.id for book in other_repository.all_books)[:5], (1, 2, 3, 4, 6))
+        self.assertEqual(other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 101)
+
+    def test_cache(self):
+        """ Проверяет вытеснение страниц из кэша и упреждающее чтение. """
+        book_repository = self._get_repository_filled_with_books(cache_bytes=5_000)
+        book_repository.close()
+
+        book_repository = self._get_repository(cache_bytes=5_000)
+        book_repository.get_book_by_id(1)
+        book_repository.get_book_by_id(2)
+        statistics = book_repository.cache_statistics
+        self.assertEqual((statistics['hits'], statistics['misses']), (1, 1))
+        _ = book_repository.all_books
+        statistics = book_repository.cache_statistics
+        self.assertGreater(statistics['evictions'], 0)
+        self.assertLessEqual(statistics['bytes'], statistics['max_bytes'])
+        self.assertEqual(statistics['prefetched'], 0)
+
+        # Страница больше всего бюджета в кэше не остаётся.
+        book_repository.close()
+        book_repository = self._get_repository(cache_bytes=500)
+        self.assertEqual(book_repository.get_book_by_id(1).id, 1)
+        _ = book_repository.all_books
+        statistics = book_repository.cache_statistics
+        self.assertEqual((statistics['pages'], statistics['bytes'], statistics['hits']), (0, 0, 0))
+
+        book_repository.close()
+        book_repository = self._get_repository(cache_bytes=1_000_000, prefetch_pages=4)
+        _ = book_repository.all_books
+        statistics = book_repository.cache_statistics
+        self.assertGreater(statistics['prefetched'], 0)
+        self.assertEqual(statistics['misses'] + statistics['prefetched'], book_repository.number_of_pages)
+
+    def test_save_and_load(self):
+        """ Проверяет сохранение каталога в снимок и загрузку снимка в каталог. """
+        book_repository = self._get_repository_filled_with_books()
+        for snapshot_name in ('books.json', 'books.ndjson'):
+            with self.subTest(snapshot_name):
+                snapshot_filename = Path(self.tmpdir.name, snapshot_name)
+                self.assertEqual(book_repository.save(snapshot_filename), 100)
+
+                other_repository = DiskBookRepository(Path(self.tmpdir.name, f'{snapshot_name}.pages'))
+                other_repository.set_repository_export(BookRepositoryExport(other_repository))
+                self.addCleanup(other_repository.close)
+                self.assertEqual(other_repository.load(snapshot_filename), 100)
+                self.assertEqual(other_repository.get_status_book(10), BookStatus.GIVEN_OUT)
+                self.assertEqual(other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 101)
+
+        snapshot_filename = Path(self.tmpdir.name, 'broken.ndjson')
+        book = Book("Новая книга", "Неизвестный автор", 2000)
+        book.set_id(1)
+        snapshot_filename.write_text(BookRepositoryExport.book_to_line(book, True) + "{\n")
+        with self.assertRaises(BookRepositoryExportException) as cm:
+            book_repository.load(snapshot_filename)
+        self.assertEqual(cm.exception.message,
+                         "Error when exporting books on line 2. The line is not a valid JSON record")
+        self.assertEqual(book_repository.number_of_books, 0)
+
+    def test_view_and_background_save(self):
+        """ Проверяет представление и фоновое сохранение, которые читают книги из снимка страниц. """
+        book_repository = self._get_repository_filled_with_books()
+        view = book_repository.view()
+        snapshot_filename = Path(self.tmpdir.name, 'books.ndjson')
+        background_save = book_repository.save_in_background(snapshot_filename)
+        book_repository.remove_book(1)
+        book_repository.changing_status_book(2, False)
+        book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000))
+
+        self.assertEqual(len(view), 100)
+        self.assertEqual(view.get_book_by_id(1).title, "Книга номер 0")
+        self.assertIsNone(view.get_book_by_id(101))
+        self.assertEqual(view.get_book_with_status(2)[1], BookStatus.AVAILABLE)
+        self.assertEqual(view.count_by_status(), {BookStatus.AVAILABLE: 90, BookStatus.GIVEN_OUT: 10})
+        self.assertEqual([book.id for book, _ in view.iter_books_with_status()], list(range(1, 101)))
+
+        self.assertTrue(background_save.wait(5))
+        self.assertIsNone(background_save.error)
+        self.assertEqual(background_save.saved_books, 100)
+        other_repository = DiskBookRepository(Path(self.tmpdir.name, 'other.pages'))
+        other_repository.set_repository_export(BookRepositoryExport(other_repository))
+        self.addCleanup(other_repository.close)
+        self.assertEqual(other_repository.load(snapshot_filename), 100)
+        self.assertEqual(other_repository.get_status_book(2), BookStatus.AVAILABLE)
+
+        # Временные копии файла страниц удаляются вместе со снимками.
+        del view
+        gc.collect()
+        self.assertEqual(list(Path(self.tmpdir.name).glob('*.snapshot')), [])
+
+    def test_snapshot_copies_pages_on_write(self):
+        """ Проверяет, что снимок копирует только переписанные страницы и читается после закрытия хранилища. """
+        book_repository = self._get_repository_filled_with_books()
+        view = book_repository.view()
+        self.assertEqual(list(Path(self.tmpdir.name).glob('*.snapshot')), [])
+
+        book_repository.remove_book(1)
+        book_repository.remove_book(2)
+        copies = list(Path(self.tmpdir.name).glob('*.snapshot'))
+        self.assertEqual(len(copies), 1)
+        self.assertEqual(copies[0].stat().st_size, DiskBookRepository.MIN_PAGE_SIZE)
+        self.assertEqual(view.get_book_by_id(1).title, "Книга номер 0")
+
+        # Перед закрытием хранилища снимок копирует оставшиеся страницы.
+        book_repository.close()
+        self.assertEqual(copies[0].stat().st_size, DiskBookRepository.MIN_PAGE_SIZE * book_repository.number_of_pages)
+        self.assertEqual([book.id for book, _ in view.iter_books_with_status()], list(range(1, 101)))
+
+    def test_view_during_changes(self):
+        """ Проверяет, что обход представления не видит изменений, которые идут параллельно в другом потоке. """
+        book_repository = self._get_repository_filled_with_books()
+        view = book_repository.view()
+        changed = threading.Event()
+        stop = threading.Event()
+
+        def change():
+            while not stop.is_set():
+                _id = book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000))
+                book_repository.remove_book(_id - 100)
+                changed.set()
+
+        thread = threading.Thread(target=change)
+        thread.start()
+        try:
+            self.assertTrue(changed.wait(5))
+            for _ in range(20):
+                self.assertEqual([(book.id, book.title) for book, _ in view.iter_books_with_status()],
+                                 [(i, f"Книга номер {i - 1}") for i in range(1, 101)])
+        finally:
+            stop.set()
+            thread.join()
+        self.assertIsNone(book_repository.get_book_by_id(1))
+
+    def test_compact(self):
+        """ Проверяет уплотнение файла страниц и перенумерацию книг. """
+        book_repository = self._get_repository_filled_with_books()
+        for _id in range(1, 61):
+            book_repository.remove_book(_id)
+        number_of_pages = book_repository.number_of_pages
+        removed, id_mapping = book_repository.compact(renumber=True)
+        self.assertEqual(removed, 60)
+        self.assertLess(book_repository.number_of_pages, number_of_pages)
+        self.assertEqual(id_mapping[61], 1)
+        self.assertEqual(book_repository.get_book_by_id(1).title, "Книга номер 60")
+        self.assertEqual(book_repository.get_status_book(10), BookStatus.GIVEN_OUT)
+        self.assertEqual(book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 41)
+        self.assertEqual(book_repository.compact(), (0, {}))
+
+        # Количество удалённых записей сохраняется в индексе вместе с каталогом.
+        book_repository.remove_book(1)
+        book_repository.close()
+        self.assertEqual(self._get_repository().compact(), (1, {}))
+
+    def test_stale_index(self):
+        """ Проверяет, что после сбоя без сохранения индекса каталог открывается с перестроенным индексом. """
+        book_repository = self._get_repository_filled_with_books()
+        book_repository.flush()
+        book_repository.remove_book(5)
+        book_repository.add_books(Book(f"Новая книга {i}", "Неизвестный автор", 2000) for i in range(20))
+        # Сбой: страницы записаны на диск, а индекс остался от последнего вызова flush().
+        book_repository._file.close()
+
+        other_repository = self._get_repository()
+        self.assertEqual(other_repository.number_of_books, 119)
+        self.assertIsNone(other_repository.get_book_by_id(5))
+        self.assertEqual(other_repository.get_book_by_id(120).title, "Новая книга 19")
+        self.assertEqual(other_repository.get_status_book(10), BookStatus.GIVEN_OUT)
+        self.assertEqual(other_repository.get_status_book(110), BookStatus.AVAILABLE)
+        self.assertEqual(other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 121)
+        other_repository.close()
+        self.assertFalse(self.filename.with_name(self.filename.name + DiskBookRepository.DIRTY_SUFFIX).exists())
+
+        # Книга, которой нет на странице из индекса, не приводит к KeyError.
+        index_filename = self.filename.with_name(self.filename.name + DiskBookRepository.INDEX_SUFFIX)
+        index = json.loads(index_filename.read_text(encoding='utf-8'))
+        index['pages'][0].append(1000)
+        index_filename.write_text(json.dumps(index), encoding='utf-8')
+        other_repository = self._get_repository()
+        with self.assertRaises(BookRepositoryError) as cm:
+            other_repository.get_book_by_id(1000)
+        self.assertEqual(cm.exception.message, "The book with the ID 1000 is missing from page 0 of the catalog, "
+                                               "the catalog index is out of date")
+        with self.assertRaises(BookRepositoryError):
+            other_repository.remove_book(1000)
+        self.assertIn(1000, other_repository.view())
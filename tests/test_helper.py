@@ -0,0 +1,63 @@
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from helper import Logger, _DeferredQueueHandler, log_timing
+
+
+class LoggerTest(unittest.TestCase):
+    """ Тестирование журнала. """
+    def test_handler_attached_once(self):
+        """ Проверяет, что при повторных обращениях к логгеру обработчик не добавляется заново. """
+        logger = Logger.get_logger('test_helper', logging.DEBUG)
+        self.assertIs(Logger.get_logger('test_helper', logging.DEBUG), logger)
+        self.assertEqual(len([handler for handler in logger.handlers if isinstance(handler, _DeferredQueueHandler)]), 1)
+
+    def test_log_timing(self):
+        """ Проверяет запись о времени выполнения операции. """
+        logger = Logger.get_logger('test_helper', logging.DEBUG)
+
+        @log_timing(logger, 'divide')
+        def divide(a, b):
+            return a / b
+
+        with self.assertLogs(logger, logging.DEBUG) as cm:
+            self.assertEqual(divide(6, 3), 2)
+            with self.assertRaises(ZeroDivisionError):
+                divide(1, 0)
+        self.assertEqual([(record.operation, record.status) for record in cm.records],
+                         [('divide', 'ok'), ('divide', 'error')])
+        self.assertTrue(cm.output[0].startswith('DEBUG:test_helper:timing operation=divide duration_ms='))
+
+    def test_timing_logged_at_debug_level(self):
+        """ Проверяет, что с LIBRARY_LOG_LEVEL=DEBUG записи о времени операций хранилища попадают в файл журнала. """
+        code = ("import sys\n"
+                "from book import Book\n"
+                "from book_repository import BookRepository\n"
+                "book_repository = BookRepository()\n"
+                "book_repository.add_book(Book('Книга', 'Автор', 2000))\n"
+                "book_repository.save(sys.argv[1])\n")
+        with tempfile.TemporaryDirectory() as log_dir:
+            env = dict(os.environ, **{Logger.LOG_DIR_VARIABLE: log_dir, Logger.LOG_LEVEL_VARIABLE: 'DEBUG'})
+            subprocess.run([sys.executable, '-c', code, str(Path(log_dir) / 'book_repository.json')],
+                           cwd=Path(__file__).parent.parent, env=env, check=True)
+            log = (Path(log_dir) / 'library.log').read_text(encoding='utf-8')
+        self.assertRegex(log, r'book_repository .* DEBUG timing operation=save duration_ms=[\d.]+ status=ok')
+
+    def test_get_level(self):
+        """ Проверяет уровень логгеров из переменной окружения. """
+        old_level = os.environ.pop(Logger.LOG_LEVEL_VARIABLE, None)
+        try:
+            self.assertEqual(Logger.get_level(), logging.INFO)
+            for value, level in (('debug', logging.DEBUG), ('WARNING', logging.WARNING), ('15', 15),
+                                 ('unknown', logging.INFO)):
+                os.environ[Logger.LOG_LEVEL_VARIABLE] = value
+                self.assertEqual(Logger.get_level(), level)
+        finally:
+            os.environ.pop(Logger.LOG_LEVEL_VARIABLE, None)
+            if old_level is not None:
+                os.environ[Logger.LOG_LEVEL_VARIABLE] = old_level
@@ -0,0 +1,62 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from book import Book
+from book_manager import BookManager
+from book_repository import BookRepository
+from enums import SearchCriteria
+from exceptions import BookManagerError
+from instrumentation import Instrumentation, LatencyHistogram
+from repository_export import BookRepositoryExport
+
+
+class InstrumentationTest(unittest.TestCase):
+    """ Тестирование сбора статистики операций. """
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_repository.set_repository_export(BookRepositoryExport(self.book_repository))
+        self.book_manager = BookManager(self.book_repository)
+
+    def test_latency_histogram(self):
+        """ Проверяет процентили гистограммы задержек. """
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(50), 0)
+        for latency_us in range(1, 101):
+            histogram.add(latency_us * 1000)
+        self.assertEqual(histogram.count, 100)
+        self.assertEqual(histogram.max_ns, 100_000)
+        # Процентиль вычисляется с точностью до ширины интервала гистограммы, то есть примерно 19%.
+        self.assertAlmostEqual(histogram.percentile(50), 50_000, delta=50_000 * 0.2)
+        self.assertAlmostEqual(histogram.percentile(95), 95_000, delta=95_000 * 0.2)
+        self.assertEqual(histogram.percentile(100), 100_000)
+
+    def test_instrument(self):
+        """ Проверяет сбор статистики по методам хранилища и менеджера книг. """
+        # Без явного включения методы не оборачиваются.
+        self.assertNotIn('add_book', vars(self.book_manager))
+
+        instrumentation = Instrumentation()
+        instrumentation.instrument(self.book_repository, 'repository')
+        instrumentation.instrument(self.book_manager, 'manager')
+        for i in range(10):
+            self.book_manager.add_book(f"Книга номер {i}", "Автор", 2000 + i)
+        self.book_manager.find_book(SearchCriteria.SEARCH_TITLE, "номер")
+        with self.assertRaises(BookManagerError):
+            self.book_manager.remove_book(100)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = Path(tmpdir, 'books.json')
+            self.book_manager.save_data(filename)
+            stats = instrumentation.snapshot()
+            self.assertEqual(stats['manager.save_data']['file_size'], filename.stat().st_size)
+
+        self.assertEqual(stats['manager.add_book']['calls'], 10)
+        self.assertEqual(stats['repository.add_book']['calls'], 10)
+        self.assertEqual(stats['manager.find_book']['result_size_avg'], 10)
+        self.assertEqual(stats['repository.find_books_with_status']['result_size_max'], 10)
+        self.assertEqual(stats['manager.remove_book']['errors'], 1)
+        self.assertNotIn('repository.number_of_books', stats)
+        self.assertEqual(json.loads(instrumentation.to_json()).keys(), stats.keys())
+        self.assertIn('manager.add_book', instrumentation.format_table())
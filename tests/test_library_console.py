@@ -1,12 +1,17 @@
-# import io
+import io
+import json
+import tempfile
 import unittest
+from pathlib import Path
 # import unittest.mock
 
 from app import SimpleLibrary
 from book_manager import BookManager
 from book_repository import BookRepository
-from enums import BookStatus
+from enums import BookStatus, SearchCriteria
+from exceptions import BookManagerError
 from library_console import LibraryConsole, InputException
+from repository_export import BookRepositoryExport
 
 
 class LibraryConsoleTest(unittest.TestCase):
@@ -34,3 +39,69 @@ class LibraryConsoleTest(unittest.TestCase):
                 with self.assertRaises(InputException, msg=f"'{status_str}' is not raises exception") as cm:
                     self.library_manager._str_status_convert(status_str)
                 self.assertEqual(cm.exception.message, f"The status must be only a '(a)vailable' or '(g)iven_out'.")
+
+    def test_run_batch(self):
+        """ Проверяет выполнение команд в пакетном режиме и вывод результатов в формате JSON. """
+        book_manager = BookManager(BookRepository())
+        commands = [
+            '# Комментарии и пустые строки пропускаются',
+            'add "Война и мир" "Лев Толстой" 1869',
+            'add "Анна Каренина" "Лев Толстой" 1877',
+            '',
+            'status 1 g',
+            'find author толстой',
+            'list given_out',
+            'remove 2',
+            'remove 2',
+            'add "Без года" "Автор"',
+            'fly 1',
+            'stats',
+        ]
+        output = io.StringIO()
+        self.assertEqual(LibraryConsole(book_manager).run_batch(commands, output), 4)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual([(result['line'], result['ok']) for result in results],
+                         [(2, True), (3, True), (5, True), (6, True), (7, True), (8, True), (9, False),
+                          (10, False), (11, False), (12, False)])
+        self.assertEqual(results[0]['id'], 1)
+        self.assertEqual(results[2], {'line': 5, 'command': 'status', 'ok': True, 'id': 1, 'status': 'given_out'})
+        self.assertEqual(results[3]['count'], 2)
+        self.assertEqual(results[4]['books'], [{'id': 1, 'title': "Война и мир", 'author': "Лев Толстой",
+                                                'year': 1869, 'status': 'given_out'}])
+        self.assertEqual(results[6]['error'], "The book with the ID 2 is missing.")
+        self.assertEqual(results[7]['error'], "Usage: add TITLE AUTHOR YEAR")
+        self.assertTrue(results[8]['error'].startswith("Unknown command 'fly'"))
+        self.assertEqual(book_manager.get_all_books()[0], 1)
+
+    def test_batch_find(self):
+        """ Проверяет, что поиск в пакетном режиме находит те же книги, что и поиск в диалоге. """
+        book_manager = BookManager(BookRepository())
+        book_manager.add_book("Война и мир", "Лев Толстой", 1869)
+        book_manager.add_book("Анна Каренина", "Лев Толстой", 1877)
+        queries = [('title', 'ВОЙНА'), ('author', ' толстой '), ('author', '  '), ('year', '1877'), ('year', '3000')]
+        output = io.StringIO()
+        self.assertEqual(LibraryConsole(book_manager).run_batch(
+            [f'find {field} "{value}"' for field, value in queries], output), 1)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        for (field, value), result in zip(queries[:-1], results):
+            books, _ = book_manager.find_book(LibraryConsole.BATCH_SEARCH_CRITERIA[field], value.strip())
+            self.assertEqual(result['count'], books)
+        self.assertEqual([book['id'] for book in results[3]['books']], [2])
+        with self.assertRaises(BookManagerError) as cm:
+            book_manager.find_book(SearchCriteria.SEARCH_YEAR, '3000')
+        self.assertEqual(results[4]['error'], cm.exception.message)
+
+    def test_app_batch(self):
+        """ Проверяет, что приложение сохраняет хранилище после пакетного выполнения команд. """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            commands_filename = Path(tmpdir, 'commands.txt')
+            commands_filename.write_text('add "Война и мир" "Лев Толстой" 1869\n', encoding='utf-8')
+            output_filename = Path(tmpdir, 'results.ndjson')
+            library = SimpleLibrary()
+            library._repository_filename = Path(tmpdir, 'books.json')
+            self.assertEqual(library.run_batch(commands_filename, output_filename), 0)
+            self.assertTrue(json.loads(output_filename.read_text(encoding='utf-8'))['ok'])
+
+            other_repository = BookRepository()
+            other_repository.set_repository_export(BookRepositoryExport(other_repository))
+            self.assertEqual(other_repository.load(library._repository_filename), 1)
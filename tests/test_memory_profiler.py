@@ -0,0 +1,37 @@
+import sys
+import unittest
+
+from book import Book
+from book_manager import BookManager
+from book_repository import BookRepository
+from memory_profiler import deep_sizeof, traced_allocations
+from repository_export import BookRepositoryExport
+
+
+class MemoryProfilerTest(unittest.TestCase):
+    """ Тестирование оценки памяти хранилища. """
+    def test_deep_sizeof(self):
+        """ Проверяет, что общие объекты учитываются один раз. """
+        text = 'строка' * 10
+        self.assertEqual(deep_sizeof([text, text]), sys.getsizeof([text, text]) + sys.getsizeof(text))
+        book = Book("Война и мир", "Л.Н. Толстой", 1869)
+        self.assertGreater(deep_sizeof(book), sys.getsizeof(book) + sys.getsizeof("Война и мир"))
+
+    def test_memory_report(self):
+        """ Проверяет отчёт о памяти по составляющим хранилища. """
+        book_repository = BookRepository()
+        book_repository.set_repository_export(BookRepositoryExport(book_repository))
+        book_manager = BookManager(book_repository)
+        self.assertEqual(book_manager.memory_report()['bytes_per_book'], 0.0)
+
+        _, traced_bytes, peak_bytes = traced_allocations(
+            lambda: book_repository.add_books(Book(f"Книга номер {i}", f"Автор {i}", 2000) for i in range(1000)))
+        report = book_manager.memory_report()
+        self.assertEqual(set(report['components']), {'books_dict', 'book_objects', 'status_bitmap'})
+        self.assertEqual(report['total_bytes'], sum(report['components'].values()))
+        self.assertEqual(report['number_of_books'], 1000)
+        self.assertGreater(report['components']['book_objects'], report['components']['books_dict'])
+        # Оценка по структурам должна быть близка к памяти, которую выделил интерпретатор.
+        self.assertGreater(traced_bytes, 0)
+        self.assertGreaterEqual(peak_bytes, traced_bytes)
+        self.assertLess(abs(report['total_bytes'] - traced_bytes) / traced_bytes, 0.5)
@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from book import Book
+from book_manager import BookManager
+from book_repository import BookRepository
+from enums import BookStatus
+from instrumentation import Instrumentation
+from metrics_server import MetricsCollector, MetricsServer
+from repository_export import BookRepositoryExport
+
+
+class MetricsServerTest(unittest.TestCase):
+    """ Тестирование публикации метрик. """
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_repository.set_repository_export(BookRepositoryExport(self.book_repository))
+        self.instrumentation = Instrumentation()
+        self.book_manager = self.instrumentation.instrument(BookManager(self.book_repository), 'manager')
+        for i in range(10):
+            self.book_manager.add_book(f"Книга номер {i}", "Автор", 2000 + i)
+        self.book_manager.changing_status_book(3, BookStatus.GIVEN_OUT)
+
+    def test_status_counts_cache(self):
+        """ Проверяет, что книги по статусам пересчитываются только после изменения хранилища. """
+        collector = MetricsCollector(self.book_repository, status_refresh_interval=0)
+        self.assertEqual(collector.status_counts(), {BookStatus.AVAILABLE: 9, BookStatus.GIVEN_OUT: 1})
+        counts = collector.status_counts()
+        self.assertIs(collector.status_counts(), counts)
+        self.book_manager.remove_book(3)
+        self.assertEqual(collector.status_counts(), {BookStatus.AVAILABLE: 9, BookStatus.GIVEN_OUT: 0})
+
+        # Пока не прошёл интервал, отдаётся прежний подсчёт.
+        collector = MetricsCollector(self.book_repository, status_refresh_interval=3600)
+        counts = collector.status_counts()
+        self.book_manager.changing_status_book(4, BookStatus.GIVEN_OUT)
+        self.assertIs(collector.status_counts(), counts)
+
+    def test_metrics_endpoint(self):
+        """ Проверяет выдачу метрик по HTTP. """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = Path(tmpdir, 'books.json')
+            self.book_repository.save_in_background(filename).wait()
+            collector = MetricsCollector(self.book_repository, self.instrumentation, filename)
+            server = MetricsServer(collector, 0).start()
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics') as response:
+                    self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+                    body = response.read().decode('utf-8')
+                with self.assertRaises(urllib.error.HTTPError):
+                    urllib.request.urlopen(f'http://127.0.0.1:{server.port}/')
+            finally:
+                server.stop()
+
+        self.assertIn('library_books 10\n', body)
+        self.assertIn('library_books_by_status{status="given_out"} 1\n', body)
+        self.assertIn('library_snapshot_size_bytes ', body)
+        self.assertIn('library_background_save_books 10\n', body)
+        self.assertIn('library_operation_calls_total{operation="manager.add_book"} 10\n', body)
+        self.assertIn('library_operation_latency_seconds_bucket{operation="manager.add_book",le="+Inf"} 10\n', body)
+        self.assertIn('library_operation_latency_seconds_count{operation="manager.add_book"} 10\n', body)
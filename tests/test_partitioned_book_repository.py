@@ -0,0 +1,241 @@
+import hashlib
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from book import Book, BookStatus
+from enums import ChangeKind
+from exceptions import BookRepositoryError, BookRepositoryExportException
+from partitioned_book_repository import PartitionedBookRepository
+from repository_export import BookRepositoryExport
+
+
+class PartitionedBookRepositoryTest(unittest.TestCase):
+    """ Тестирование хранилища книг с сегментированным снимком. """
+
+    def setUp(self):
+        self.books = ((Book("Толковый словарь", "В.И. Даль", 1982), True),
+                      (Book("Ночной дозор", "Сергей Лукьяненко", 1998), True),
+                      (Book("Дневной дозор", "Сергей Лукьяненко", 2000), True),
+                      (Book("Звездные войны. Новая надежда", "Алан Дин Фостер.", 1976), False),
+                      (Book("Звездные войны. Империя наносит ответный удар", "Дональд Ф", 1980), True),
+                      (Book("Звездные войны. Возвращение джедая", "Джеймс Кан", 1983), False))
+
+    @classmethod
+    def _get_repository(cls) -> PartitionedBookRepository:
+        """ Возвращает пустое хранилище с сегментами по две книги. """
+        book_repository = PartitionedBookRepository(segment_size=2, max_workers=2)
+        book_repository.set_repository_export(BookRepositoryExport(book_repository))
+        return book_repository
+
+    def _get_repository_filled_with_books(self) -> PartitionedBookRepository:
+        """ Возвращает заполненное книгами хранилище. """
+        book_repository = self._get_repository()
+        for book, status in self.books:
+            _id = book_repository.add_book(book)
+            book_repository.changing_status_book(_id, status)
+        return book_repository
+
+    def test_save_and_load(self):
+        """ Проверяет сохранение и загрузку сегментированного снимка. """
+        book_repository = self._get_repository_filled_with_books()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            self.assertEqual(book_repository.save(manifest_filename), 6)
+
+            # Шесть книг по две в сегменте дают три файла сегментов.
+            manifest = json.loads(manifest_filename.read_text())
+            self.assertEqual([segment['filename'] for segment in manifest['segments']],
+                             ['book_repository.0000.1.json', 'book_repository.0001.1.json',
+                              'book_repository.0002.1.json'])
+            self.assertEqual([(segment['first_id'], segment['last_id']) for segment in manifest['segments']],
+                             [(1, 2), (3, 4), (5, 6)])
+
+            other_repository = self._get_repository()
+            self.assertEqual(other_repository.load(manifest_filename), 6)
+            self.assertSequenceEqual(tuple(book.title for book in other_repository.all_books),
+                                     tuple(book.title for book, _ in self.books))
+            self.assertEqual(other_repository.get_status_book(4), BookStatus.GIVEN_OUT)
+            self.assertEqual(other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 7)
+
+    def test_save_only_changed_segments(self):
+        """ Проверяет, что при повторном сохранении в файлы нового поколения пишутся только изменённые сегменты. """
+        book_repository = self._get_repository_filled_with_books()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            book_repository.save(manifest_filename)
+            mtimes = {f.name: f.stat().st_mtime_ns for f in Path(tmpdir).glob('book_repository.000*.json')}
+
+            # Изменяется статус книги из второго сегмента и удаляются обе книги третьего сегмента.
+            book_repository.changing_status_book(3, BookStatus.GIVEN_OUT)
+            book_repository.remove_book(5)
+            book_repository.remove_book(6)
+            self.assertEqual(book_repository.save(manifest_filename), 4)
+
+            segment_files = {f.name: f.stat().st_mtime_ns for f in Path(tmpdir).glob('book_repository.000*.json')}
+            self.assertEqual(segment_files.keys(), {'book_repository.0000.1.json', 'book_repository.0001.2.json'})
+            self.assertEqual(segment_files['book_repository.0000.1.json'], mtimes['book_repository.0000.1.json'])
+
+            # Последний идентификатор сохраняется, даже если последние книги были удалены.
+            other_repository = self._get_repository()
+            other_repository.load(manifest_filename)
+            self.assertEqual(other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 7)
+
+    def test_serialize_only_changed_segments(self):
+        """ Проверяет, что при сохранении сериализуются только сегменты, изменённые после сохранения или загрузки. """
+        book_repository = self._get_repository_filled_with_books()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            self.assertEqual(self._save_and_get_serialized(book_repository, manifest_filename), [0, 1, 2])
+
+            book_repository.changing_status_book(3, BookStatus.GIVEN_OUT)
+            self.assertEqual(self._save_and_get_serialized(book_repository, manifest_filename), [1])
+            self.assertEqual(self._save_and_get_serialized(book_repository, manifest_filename), [])
+
+            # Другой файл манифеста сохраняется полностью.
+            other_filename = Path(tmpdir, 'other.manifest.json')
+            self.assertEqual(self._save_and_get_serialized(book_repository, other_filename), [0, 1, 2])
+
+            # После загрузки в пустое хранилище сегменты снимка считаются сохранёнными.
+            other_repository = self._get_repository()
+            other_repository.load(manifest_filename)
+            other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000))
+            self.assertEqual(self._save_and_get_serialized(other_repository, manifest_filename), [3])
+
+            other_repository = self._get_repository()
+            other_repository.load(manifest_filename)
+            self.assertEqual(other_repository.number_of_books, 7)
+            self.assertEqual(other_repository.get_status_book(3), BookStatus.GIVEN_OUT)
+
+    def test_write_during_save(self):
+        """ Проверяет, что изменения хранилища во время сохранения не попадают в снимок, но попадают в следующий. """
+        book_repository = self._get_repository_filled_with_books()
+        split_into_segments = book_repository._split_into_segments
+
+        def change_and_split(records, skip_segments=()):
+            # Хранилище изменяется, пока книги снимка разбиваются на сегменты.
+            def records_with_changes():
+                for num, record in enumerate(records.records()):
+                    if num == 1:
+                        book_repository.changing_status_book(4, BookStatus.AVAILABLE)
+                        book_repository.remove_book(5)
+                        book_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000))
+                    yield record
+            return split_into_segments(SimpleNamespace(records=records_with_changes), skip_segments)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            book_repository._split_into_segments = change_and_split
+            self.assertEqual(book_repository.save(manifest_filename), 6)
+            del book_repository._split_into_segments
+
+            other_repository = self._get_repository()
+            self.assertEqual(other_repository.load(manifest_filename), 6)
+            self.assertEqual(other_repository.get_status_book(4), BookStatus.GIVEN_OUT)
+            self.assertIsNotNone(other_repository.get_book_by_id(5))
+            self.assertIsNone(other_repository.get_book_by_id(7))
+
+            self.assertEqual(self._save_and_get_serialized(book_repository, manifest_filename), [1, 2, 3])
+            other_repository = self._get_repository()
+            self.assertEqual(other_repository.load(manifest_filename), 6)
+            self.assertEqual(other_repository.get_status_book(4), BookStatus.AVAILABLE)
+            self.assertIsNone(other_repository.get_book_by_id(5))
+            self.assertIsNotNone(other_repository.get_book_by_id(7))
+
+    @classmethod
+    def _save_and_get_serialized(cls, book_repository: PartitionedBookRepository, manifest_filename: Path) \
+            -> list[int]:
+        """ Сохраняет хранилище и возвращает номера сериализованных сегментов. """
+        serialized = []
+        save_segment = book_repository._save_segment
+        book_repository._save_segment = lambda filename, segment_num, *args: \
+            serialized.append(segment_num) or save_segment(filename, segment_num, *args)
+        try:
+            book_repository.save(manifest_filename)
+        finally:
+            del book_repository._save_segment
+        return sorted(serialized)
+
+    def test_load_corrupted_segment(self):
+        """ Проверяет загрузку снимка с повреждённым сегментом. """
+        book_repository = self._get_repository_filled_with_books()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            book_repository.save(manifest_filename)
+            segment_filename = Path(tmpdir, 'book_repository.0001.1.json')
+            books, books_status = json.loads(segment_filename.read_text())
+            books[0]['_year'] = 2100
+            segment_filename.write_text(json.dumps((books, books_status)))
+
+            # Изменённый после сохранения сегмент не совпадает с контрольной суммой манифеста.
+            with self.assertRaises(BookRepositoryError) as cm:
+                self._get_repository().load(manifest_filename)
+            self.assertEqual(cm.exception.message,
+                             f"The checksum of the segment file '{segment_filename}' does not match the manifest")
+
+            # Книги сегмента проверяются, даже если контрольная сумма совпадает.
+            manifest = json.loads(manifest_filename.read_text())
+            manifest['segments'][1]['checksum'] = hashlib.sha256(segment_filename.read_bytes()).hexdigest()
+            manifest_filename.write_text(json.dumps(manifest))
+            with self.assertRaises(BookRepositoryExportException) as cm:
+                self._get_repository().load(manifest_filename)
+            self.assertEqual(cm.exception.message,
+                             "Error when exporting books number 1. "
+                             "The year cannot be longer than the current year.: year = 2100")
+
+            # Подписчики получают сброс, даже если загрузка завершилась ошибкой.
+            events = []
+            other_repository = self._get_repository()
+            other_repository.change_feed.subscribe(events.append)
+            with self.assertRaises(BookRepositoryExportException):
+                other_repository.load(manifest_filename)
+            self.assertEqual([event.kind for event in events], [ChangeKind.RESET])
+
+    def test_load_segment_outside_directory(self):
+        """ Проверяет, что манифест не может ссылаться на файлы вне своего каталога. """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            for segment_filename in ('../book_repository.0000.json', 'segments/book_repository.0000.json'):
+                manifest_filename.write_text(json.dumps({'segment_size': 2, 'last_id': 2, 'segments': [
+                    {'filename': segment_filename, 'checksum': ''}]}))
+                with self.assertRaises(BookRepositoryExportException) as cm:
+                    self._get_repository().load(manifest_filename)
+                self.assertEqual(cm.exception.message,
+                                 f"The manifest '{manifest_filename}' refers to the segment "
+                                 f"'{segment_filename}' outside of its directory")
+
+    def test_interrupted_save(self):
+        """ Проверяет, что прерванное сохранение оставляет прежний снимок целым, а следующее убирает его файлы. """
+        book_repository = self._get_repository_filled_with_books()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_filename = Path(tmpdir, 'book_repository.manifest.json')
+            book_repository.save(manifest_filename)
+            book_repository.changing_status_book(1, BookStatus.GIVEN_OUT)
+            book_repository.remove_book(5)
+            book_repository.remove_book(6)
+
+            # Сохранение прерывается после записи сегментов, но до замены манифеста.
+            write_file = book_repository._write_file
+
+            def write_segments_only(filename, content):
+                if filename == manifest_filename:
+                    raise OSError("Interrupted")
+                write_file(filename, content)
+
+            book_repository._write_file = write_segments_only
+            with self.assertRaises(OSError):
+                book_repository.save(manifest_filename)
+            del book_repository._write_file
+
+            other_repository = self._get_repository()
+            self.assertEqual(other_repository.load(manifest_filename), 6)
+            self.assertEqual(other_repository.get_status_book(1), BookStatus.AVAILABLE)
+
+            self.assertEqual(book_repository.save(manifest_filename), 4)
+            self.assertEqual(sorted(f.name for f in Path(tmpdir).glob('book_repository.000*.json')),
+                             ['book_repository.0000.2.json', 'book_repository.0001.1.json'])
+            other_repository = self._get_repository()
+            self.assertEqual(other_repository.load(manifest_filename), 4)
+            self.assertEqual(other_repository.get_status_book(1), BookStatus.GIVEN_OUT)
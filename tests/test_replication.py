@@ -0,0 +1,162 @@
+import socket
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from book import Book, BookStatus
+from book_repository import BookRepository
+from disk_book_repository import DiskBookRepository
+from exceptions import BookRepositoryError
+from metrics_server import MetricsCollector
+from replication import ReplicationPrimary, ReplicationReplica
+
+
+TIMEOUT = 5.0
+
+
+class ReplicationTest(unittest.TestCase):
+    """ Тестирование репликации хранилища через локальные сокеты. """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.primary_repository = BookRepository()
+        self.primary_repository.add_books(Book(f"Книга номер {i}", "Автор", 2000) for i in range(10))
+
+    def _start_primary(self, address, **kwargs) -> ReplicationPrimary:
+        """ Запускает ведущее хранилище, которое останавливается после теста. """
+        primary = ReplicationPrimary(self.primary_repository, address, heartbeat_interval=0.05, **kwargs).start()
+        self.addCleanup(primary.stop)
+        return primary
+
+    def _start_replica(self, address, book_repository: BookRepository | None = None) -> ReplicationReplica:
+        """ Запускает реплику, которая останавливается после теста. """
+        replica = ReplicationReplica(book_repository or BookRepository(), address, retry_interval=0.05).start()
+        self.addCleanup(replica.stop)
+        return replica
+
+    def _assert_synced(self, primary: ReplicationPrimary, replica: ReplicationReplica,
+                       book_repository: BookRepository):
+        """ Проверяет, что реплика применила все изменения и совпадает с ведущим хранилищем. """
+        self.assertTrue(replica.wait_for(primary.seq, TIMEOUT))
+        self.assertEqual(self._records(book_repository), self._records(self.primary_repository))
+
+    @classmethod
+    def _records(cls, book_repository: BookRepository) -> list[tuple[int, str, bool]]:
+        """ Возвращает упорядоченные по идентификатору данные книг хранилища для сравнения. """
+        return sorted((book.id, book.title, status.value) for book, status in book_repository.iter_books_with_status())
+
+    def test_replication(self):
+        """ Проверяет передачу снимка и изменений реплике через TCP-сокет. """
+        primary = self._start_primary(('127.0.0.1', 0))
+        replica_repository = BookRepository()
+        replica = self._start_replica(primary.address, replica_repository)
+        self._assert_synced(primary, replica, replica_repository)
+
+        self.primary_repository.add_book(Book("Новая книга", "Новый автор", 2020))
+        self.primary_repository.remove_book(3)
+        self.primary_repository.changing_status_book(5, False)
+        self._assert_synced(primary, replica, replica_repository)
+        self.assertEqual(replica_repository.get_status_book(5), BookStatus.GIVEN_OUT)
+        self.assertEqual(replica.statistics()['snapshots'], 1)
+
+        with self.assertRaises(BookRepositoryError) as cm:
+            replica_repository.add_book(Book("Ещё одна книга", "Автор", 2000))
+        self.assertEqual(cm.exception.message, "The replica repository is read-only")
+
+        # Перенумерация меняет идентификаторы всех книг, поэтому реплика получает снимок заново.
+        self.primary_repository.compact(renumber=True)
+        self._assert_synced(primary, replica, replica_repository)
+        self.assertEqual(replica.statistics()['snapshots'], 2)
+
+    def test_reconnect(self):
+        """ Проверяет, что после переподключения реплика получает хвост журнала или снимок через Unix-сокет. """
+        primary = self._start_primary(Path(self.tmpdir.name, 'primary.sock'), log_size=5)
+        replica_repository = BookRepository()
+        replica = self._start_replica(primary.address, replica_repository)
+        self._assert_synced(primary, replica, replica_repository)
+        replica.stop()
+
+        # Пропущенные изменения ещё в журнале.
+        self.primary_repository.remove_book(1)
+        self.primary_repository.changing_status_book(2, False)
+        replica.start()
+        self._assert_synced(primary, replica, replica_repository)
+        statistics = replica.statistics()
+        self.assertEqual((statistics['connections'], statistics['snapshots']), (2, 1))
+        replica.stop()
+
+        # Пропущенных изменений больше, чем хранит журнал.
+        self.primary_repository.add_books(Book(f"Новая книга {i}", "Автор", 2000) for i in range(10))
+        replica.start()
+        self._assert_synced(primary, replica, replica_repository)
+        self.assertEqual(replica.statistics()['snapshots'], 2)
+
+    def test_disk_primary(self):
+        """ Проверяет, что реплика получает снимок хранилища на диске, пока в него параллельно пишут. """
+        self.primary_repository = DiskBookRepository(Path(self.tmpdir.name, 'catalog.pages'),
+                                                     page_size=DiskBookRepository.MIN_PAGE_SIZE)
+        self.addCleanup(self.primary_repository.close)
+        self.primary_repository.add_books(Book(f"Книга номер {i}", "Автор", 2000) for i in range(2000))
+        primary = self._start_primary(('127.0.0.1', 0))
+        stop = threading.Event()
+
+        def change():
+            while not stop.is_set():
+                _id = self.primary_repository.add_book(Book("Новая книга", "Новый автор", 2020))
+                self.primary_repository.remove_book(_id - 2000)
+
+        thread = threading.Thread(target=change)
+        thread.start()
+        try:
+            replica_repository = BookRepository()
+            replica = self._start_replica(primary.address, replica_repository)
+            self.assertTrue(replica.wait_for(1, TIMEOUT))
+        finally:
+            stop.set()
+            thread.join(TIMEOUT)
+        self.assertFalse(thread.is_alive())
+        self._assert_synced(primary, replica, replica_repository)
+
+    def test_lag_metrics(self):
+        """ Проверяет публикацию отставания реплики в метриках. """
+        primary = self._start_primary(('127.0.0.1', 0))
+        replica_repository = BookRepository()
+        replica = self._start_replica(primary.address, replica_repository)
+        self._assert_synced(primary, replica, replica_repository)
+        statistics = replica.statistics()
+        self.assertEqual(statistics['lag_operations'], 0)
+        self.assertTrue(statistics['connected'])
+
+        text = MetricsCollector(replica_repository, replica=replica).render()
+        self.assertIn("library_replication_lag_operations 0", text)
+        self.assertIn("library_replication_lag_seconds ", text)
+        self.assertIn("library_replication_connected 1", text)
+
+    def test_corrupted_messages(self):
+        """ Проверяет, что повреждённые сообщения ведущего хранилища не завершают поток репликации. """
+        with socket.create_server(('127.0.0.1', 0)) as server:
+            server.settimeout(TIMEOUT)
+            replica = self._start_replica(server.getsockname())
+            for message in (b'{broken\n', b'{"heartbeat": 1}\n', b'[1, 2]\n', b'{"seq": 1, "ts": 0, "op": []}\n'):
+                connection, _ = server.accept()
+                with connection:
+                    connection.recv(1024)
+                    connection.sendall(message)
+            # Реплика подключается ещё раз и сообщает номер последнего применённого изменения.
+            connection, _ = server.accept()
+            with connection:
+                self.assertEqual(connection.recv(1024), b'{"seq": 0}\n')
+        self.assertGreaterEqual(replica.statistics()['connections'], 5)
+
+    def test_stale_unix_socket(self):
+        """ Проверяет, что файл сокета, оставшийся после аварийного завершения, не мешает запуску. """
+        address = Path(self.tmpdir.name, 'primary.sock')
+        stale_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale_socket.bind(str(address))
+        stale_socket.close()
+        primary = self._start_primary(address)
+        replica_repository = BookRepository()
+        replica = self._start_replica(primary.address, replica_repository)
+        self._assert_synced(primary, replica, replica_repository)
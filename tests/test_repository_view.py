@@ -0,0 +1,66 @@
+import gc
+import unittest
+
+from book import Book, BookStatus
+from book_repository import BookRepository
+from enums import SearchCriteria
+
+
+class RepositoryViewTest(unittest.TestCase):
+    """ Тестирование представлений хранилища, закреплённых за версией. """
+
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_repository.add_books(Book(f"Книга номер {i}", "Автор", 2000 + i) for i in range(10))
+
+    def test_view_is_pinned(self):
+        """ Проверяет, что изменения хранилища не видны в ранее взятом представлении. """
+        view = self.book_repository.view()
+        version = self.book_repository.version
+        self.book_repository.changing_status_book(1, False)
+        self.book_repository.remove_book(2)
+        self.book_repository.add_book(Book("Новая книга", "Автор", 2020))
+
+        self.assertEqual(view.version, version)
+        self.assertEqual(len(view), 10)
+        self.assertEqual(view.get_book_with_status(1)[1], BookStatus.AVAILABLE)
+        self.assertIsNotNone(view.get_book_by_id(2))
+        self.assertIsNone(view.get_book_by_id(11))
+        self.assertEqual(view.count_by_status(), {BookStatus.AVAILABLE: 10, BookStatus.GIVEN_OUT: 0})
+        self.assertEqual(self.book_repository.get_status_book(1), BookStatus.GIVEN_OUT)
+        self.assertEqual(self.book_repository.number_of_books, 10)
+        self.assertIsNone(self.book_repository.get_book_by_id(2))
+
+    def test_write_during_iteration(self):
+        """ Проверяет, что обход и поиск не прерываются изменениями хранилища. """
+        seen = []
+        for book, _ in self.book_repository.iter_books_with_status():
+            seen.append(book.id)
+            self.book_repository.remove_book(book.id)
+            self.book_repository.add_book(Book("Добавлена при обходе", "Автор", 2020))
+        self.assertEqual(seen, list(range(1, 11)))
+
+        found = self.book_repository._find_records(SearchCriteria.SEARCH_TITLE, "добавлена")
+        self.book_repository.add_book(Book("Добавлена после поиска", "Автор", 2020))
+        self.assertEqual(len(list(found)), 10)
+
+    def test_old_versions_are_released(self):
+        """ Проверяет, что хранилище копирует записи перед записью, только пока представление используется. """
+        books = self.book_repository._records._books
+        self.book_repository.view()
+        gc.collect()
+        self.book_repository.changing_status_book(1, False)
+        self.assertIs(self.book_repository._records._books, books)
+
+        view = self.book_repository.snapshot()
+        self.book_repository.changing_status_book(2, False)
+        self.assertIsNot(self.book_repository._records._books, books)
+        self.assertIs(view._books, books)
+        self.assertEqual([status for _, status in view.records()][:2], [False, True])
+
+        # Изменение представления тоже не меняет хранилище.
+        book = Book("Книга снимка", "Автор", 2000)
+        book.set_id(11)
+        view.put(book, False)
+        self.assertEqual(len(view), 11)
+        self.assertEqual(self.book_repository.number_of_books, 10)
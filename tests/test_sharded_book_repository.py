@@ -0,0 +1,167 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from book import Book, BookStatus
+from book_manager import BookManager
+from book_repository import BookRepository
+from enums import SearchCriteria
+from exceptions import BookRepositoryError
+from repository_export import BookRepositoryExport
+from sharded_book_repository import ShardedBookRepository
+
+
+class ShardedBookRepositoryTest(unittest.TestCase):
+    """ Тестирование хранилища книг, разделённого на шарды. """
+
+    def setUp(self):
+        self.books = ((Book("Толковый словарь", "В.И. Даль", 1982), True),
+                      (Book("Ночной дозор", "Сергей Лукьяненко", 1998), True),
+                      (Book("Дневной дозор", "Сергей Лукьяненко", 2000), True),
+                      (Book("Звездные войны. Новая надежда", "Алан Дин Фостер.", 1976), False),
+                      (Book("Звездные войны. Империя наносит ответный удар", "Дональд Ф", 1980), True),
+                      (Book("Звездные войны. Возвращение джедая", "Джеймс Кан", 1983), False))
+        self.book_repository = ShardedBookRepository(3)
+        self.book_repository.set_repository_export(BookRepositoryExport(self.book_repository))
+
+    def tearDown(self):
+        self.book_repository.close()
+
+    def _fill_repository(self):
+        """ Заполняет хранилище книгами. """
+        for book, status in self.books:
+            _id = self.book_repository.add_book(book)
+            self.book_repository.changing_status_book(_id, status)
+
+    def test_add_and_remove_book(self):
+        """ Проверяет добавление и удаление книг в шардах. """
+        self._fill_repository()
+        self.assertEqual(self.book_repository.number_of_books, 6)
+        # Книги распределяются по шардам, но возвращаются в порядке идентификаторов.
+        self.assertEqual(tuple(book.id for book in self.book_repository.all_books), (1, 2, 3, 4, 5, 6))
+
+        remove_book = self.book_repository.remove_book(5)
+        self.assertEqual(remove_book.id, 5)
+        self.assertEqual(self.book_repository.number_of_books, 5)
+        self.assertIsNone(self.book_repository.get_book_by_id(5))
+
+        with self.assertRaises(BookRepositoryError) as cm:
+            self.book_repository.remove_book(10)
+        self.assertEqual(cm.exception.message, "The book with the ID 10 is missing.")
+
+    def test_find_books(self):
+        """ Проверяет поиск книг по всем шардам. """
+        self._fill_repository()
+        books = self.book_repository.find_book_by_title("Звездные войны")
+        self.assertEqual(tuple(book.id for book in books), (4, 5, 6))
+        books = self.book_repository.find_book_by_author("Сергей Лукьяненко")
+        self.assertEqual(tuple(book.title for book in books), ("Ночной дозор", "Дневной дозор"))
+        books = self.book_repository.find_book_by_year('1983')
+        self.assertEqual(books[0].title, "Звездные войны. Возвращение джедая")
+        self.assertEqual(self.book_repository.find_book_by_title(""), ())
+
+        with self.assertRaises(BookRepositoryError) as cm:
+            self.book_repository.find_book_by_year(2111)
+        self.assertEqual(cm.exception.message, "The year cannot be longer than the current year.")
+
+    def test_changing_book_status(self):
+        """ Проверяет изменение статуса книги в шарде. """
+        self._fill_repository()
+        self.assertEqual(self.book_repository.get_status_book(4), BookStatus.GIVEN_OUT)
+        self.book_repository.changing_status_book(4, BookStatus.AVAILABLE)
+        self.assertEqual(self.book_repository.get_status_book(4), BookStatus.AVAILABLE)
+
+        with self.assertRaises(BookRepositoryError) as cm:
+            self.book_repository.changing_status_book(2, 3)
+        self.assertEqual(cm.exception.message, "The status must be a logical value.")
+
+    def test_bloom_filters(self):
+        """ Проверяет отсев отсутствующих идентификаторов фильтрами Блума и их пересоздание при уплотнении. """
+        self.book_repository.add_books(Book(f"Книга {i}", "Автор", 2000) for i in range(3000))
+        self.assertEqual(self.book_repository.bloom_statistics['items'], 3000)
+        self.assertIsNotNone(self.book_repository.get_book_by_id(2500))
+        for _id in range(3001, 4001):
+            self.assertIsNone(self.book_repository.get_book_by_id(_id))
+        statistics = self.book_repository.bloom_statistics
+        self.assertEqual(statistics['lookups'], 1001)
+        self.assertEqual(statistics['negatives'] + statistics['false_positives'], 1000)
+        self.assertGreater(statistics['negatives'], 950)
+        self.assertLessEqual(statistics['expected_error_rate'], statistics['error_rate'])
+        # Обращения для получения статуса, изменения статуса и удаления тоже учитываются в статистике фильтров.
+        for method, args in ((self.book_repository.get_status_book, ()),
+                             (self.book_repository.changing_status_book, (False,)),
+                             (self.book_repository.remove_book, ())):
+            with self.assertRaises(BookRepositoryError) as cm:
+                method(5000, *args)
+            self.assertEqual(cm.exception.message, "The book with the ID 5000 is missing.")
+        statistics = self.book_repository.bloom_statistics
+        self.assertEqual(statistics['lookups'], 1004)
+        self.assertEqual(statistics['negatives'] + statistics['false_positives'], 1003)
+
+        # Удалённые книги остаются в фильтрах до уплотнения.
+        for _id in range(1, 1001):
+            self.book_repository.remove_book(_id)
+        self.assertEqual(self.book_repository.bloom_statistics['items'], 3000)
+        self.book_repository.compact()
+        self.assertEqual(self.book_repository.bloom_statistics['items'], 2000)
+        self.assertIsNone(self.book_repository.get_book_with_status(500))
+        self.assertEqual(self.book_repository.get_book_with_status(1500)[1], BookStatus.AVAILABLE)
+
+    def test_bloom_filter_memory_limit(self):
+        """ Проверяет ограничение памяти фильтров Блума. """
+        with ShardedBookRepository(2, bloom_max_bytes=64) as other_repository:
+            other_repository.add_books(Book(f"Книга {i}", "Автор", 2000) for i in range(1000))
+            statistics = other_repository.bloom_statistics
+            self.assertEqual(statistics['memory_bytes'], 128)
+            self.assertGreater(statistics['expected_error_rate'], statistics['error_rate'])
+            # Ложноположительные ответы не влияют на результат запроса.
+            self.assertIsNone(other_repository.get_book_by_id(1001))
+        with self.assertRaises(BookRepositoryError) as cm:
+            ShardedBookRepository(2, bloom_error_rate=1.5)
+        self.assertEqual(cm.exception.message, "The Bloom filter error rate must be between 0 and 1")
+
+    def test_shard_errors(self):
+        """ Проверяет, что непредвиденная ошибка в шарде и завершение процесса шарда не блокируют координатор. """
+        self._fill_repository()
+        with self.assertRaises(BookRepositoryError) as cm:
+            self.book_repository._broadcast('get_book_by_id')
+        self.assertTrue(cm.exception.message.startswith("The shard failed to execute 'get_book_by_id': TypeError"))
+        # Шарды продолжают работать, а ответы на неудачный запрос не достаются следующему.
+        self.assertEqual(len(self.book_repository.all_books), len(self.books))
+
+        process, _ = self.book_repository._shards[1]
+        process.kill()
+        process.join()
+        with self.assertRaises(BookRepositoryError) as cm:
+            self.book_repository.find_book_by_year(1998)
+        self.assertEqual(cm.exception.message, "The shard process has terminated")
+
+    def test_save_and_load(self):
+        """ Проверяет совместимость сохранения шардированного и обычного хранилища. """
+        self._fill_repository()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = Path(tmpdir, 'book_repository.json')
+            self.assertEqual(self.book_repository.save(filename), 6)
+
+            # Сохранённый файл загружается обычным хранилищем,
+            book_repository = BookRepository()
+            book_repository.set_repository_export(BookRepositoryExport(book_repository))
+            self.assertEqual(book_repository.load(filename), 6)
+            self.assertEqual(book_repository.get_status_book(6), BookStatus.GIVEN_OUT)
+
+            # и снова шардированным.
+            with ShardedBookRepository(2) as other_repository:
+                other_repository.set_repository_export(BookRepositoryExport(other_repository))
+                self.assertEqual(other_repository.load(filename), 6)
+                self.assertEqual(other_repository.bloom_statistics['items'], 6)
+                self.assertEqual(other_repository.get_status_book(4), BookStatus.GIVEN_OUT)
+                self.assertEqual(other_repository.add_book(Book("Новая книга", "Неизвестный автор", 2000)), 7)
+
+    def test_book_manager(self):
+        """ Проверяет работу менеджера книг с шардированным хранилищем. """
+        book_manager = BookManager(self.book_repository)
+        for book, _ in self.books:
+            book_manager.add_book(book.title, book.author, book.year)
+        count, _ = book_manager.find_book(SearchCriteria.SEARCH_TITLE, "дозор")
+        self.assertEqual(count, 2)
+        self.assertEqual(book_manager.changing_status_book(1, BookStatus.GIVEN_OUT), (1, 'given out'))
@@ -0,0 +1,93 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from book import Book, BookStatus
+from book_repository import BookRepository
+from exceptions import BookRepositoryExportException
+from repository_export import BookRepositoryExport
+from snapshot_io import SnapshotReader, detect_compression, is_line_delimited, write_snapshot
+
+
+class SnapshotIOTest(unittest.TestCase):
+    """ Тестирование потоковой записи и чтения снимков хранилища. """
+
+    def setUp(self):
+        self.book_repository = BookRepository()
+        self.book_repository.set_repository_export(BookRepositoryExport(self.book_repository))
+        for i in range(1, 101):
+            _id = self.book_repository.add_book(Book(f"Книга номер {i}", "Неизвестный автор", 1900 + i))
+            self.book_repository.changing_status_book(_id, i % 3 != 0)
+
+    def test_streaming_reader(self):
+        """ Проверяет разбор снимка маленькими блоками. """
+        f = io.StringIO()
+        write_snapshot(f, self.book_repository.snapshot())
+        f.seek(0)
+        # Блоки меньше одной книги, так что значения постоянно разрываются на границах блоков.
+        books, books_status = SnapshotReader(f, chunk_size=7).read()
+        books = list(books)
+        self.assertEqual(len(books), 100)
+        self.assertEqual(books[99]['_year'], 2000)
+        self.assertEqual(books_status['3'], False)
+        self.assertEqual(len(books_status), 100)
+
+        with self.assertRaises(BookRepositoryExportException) as cm:
+            list(SnapshotReader(io.StringIO('[[{"_id": 1}, {"_id": '), chunk_size=4).read()[0])
+        self.assertEqual(cm.exception.message, "The snapshot is corrupted: the value cannot be decoded")
+
+    def test_compressed_save_and_load(self):
+        """ Проверяет сохранение и загрузку сжатых снимков. """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for compression, filename in (('gzip', 'books.json.gz'), ('bz2', 'books.json.bz2'),
+                                          ('lzma', 'books.json.xz'), (None, 'books.json')):
+                with self.subTest(compression=compression):
+                    filename = Path(tmpdir, filename)
+                    self.book_repository.set_compression_level(1)
+                    self.assertEqual(self.book_repository.save(filename), 100)
+                    self.assertEqual(detect_compression(filename), compression)
+
+                    book_repository = BookRepository()
+                    book_repository.set_repository_export(BookRepositoryExport(book_repository))
+                    self.assertEqual(book_repository.load(filename), 100)
+                    self.assertEqual(book_repository.get_status_book(99), BookStatus.GIVEN_OUT)
+                    self.assertEqual(book_repository.get_book_by_id(100).title, "Книга номер 100")
+
+            # Сжатие при чтении определяется по сигнатуре, а не по расширению.
+            renamed = Path(tmpdir, 'books.json.gz').rename(Path(tmpdir, 'books.snapshot'))
+            self.assertEqual(detect_compression(renamed), 'gzip')
+
+    def test_line_delimited_save_and_load(self):
+        """ Проверяет сохранение и загрузку построчного снимка, в том числе параллельный разбор. """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for filename, parallel in (('books.ndjson', False), ('books.jsonl.gz', False), ('books.ndjson', True)):
+                with self.subTest(filename=filename, parallel=parallel):
+                    filename = Path(tmpdir, filename)
+                    self.assertEqual(self.book_repository.save(filename), 100)
+                    self.assertTrue(is_line_delimited(filename))
+
+                    book_repository = BookRepository()
+                    book_repository.set_repository_export(BookRepositoryExport(book_repository))
+                    if parallel:
+                        book_repository.PARALLEL_LOAD_MIN_SIZE = 0
+                    self.assertEqual(book_repository.load(filename), 100)
+                    self.assertEqual(book_repository.get_status_book(99), BookStatus.GIVEN_OUT)
+                    self.assertEqual(book_repository.get_book_by_id(100).title, "Книга номер 100")
+                    self.assertEqual(book_repository.add_book(Book("Новая книга", "Автор", 2000)), 101)
+
+            # Номер строки с ошибкой считается от начала файла и при параллельном разборе.
+            filename = Path(tmpdir, 'books.ndjson')
+            lines = filename.read_text(encoding='utf-8').splitlines(keepends=True)
+            lines[86] = lines[86].replace('"_year": 1987', '"_year": 9999')
+            filename.write_text(''.join(lines), encoding='utf-8')
+            for parallel in (False, True):
+                with self.subTest(parallel=parallel):
+                    book_repository = BookRepository()
+                    book_repository.set_repository_export(BookRepositoryExport(book_repository))
+                    if parallel:
+                        book_repository.PARALLEL_LOAD_MIN_SIZE = 0
+                    with self.assertRaises(BookRepositoryExportException) as cm:
+                        book_repository.load(filename)
+                    self.assertTrue(cm.exception.message.startswith("Error when exporting books on line 87. "))
+                    self.assertEqual(book_repository.number_of_books, 0)
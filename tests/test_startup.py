@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from benchmarks.startup import DEFERRED_MODULES, ROOT_PATH, STARTUP_BUDGET_MS, measure_import_time
+
+
+class StartupTest(unittest.TestCase):
+    """ Тестирование запуска приложения. """
+    BUDGET_MARGIN = 5
+    """ Во сколько раз бюджет времени импорта увеличивается для теста, который запускается всегда. """
+
+    def test_deferred_modules(self):
+        """ Проверяет, что импорт приложения не загружает тяжёлые модули. """
+        result = subprocess.run([sys.executable, '-c', 'import json, sys, app; print(json.dumps(list(sys.modules)))'],
+                                cwd=ROOT_PATH, capture_output=True, text=True, check=True)
+        modules = set(json.loads(result.stdout))
+        self.assertIn('app', modules)
+        self.assertEqual([name for name in DEFERRED_MODULES if name in modules], [])
+
+    def test_startup_budget(self):
+        """
+        Проверяет, что импорт приложения укладывается в бюджет времени с большим запасом.
+        Запас нужен, чтобы тест не падал на медленных и загруженных машинах, но ловил возврат тяжёлых импортов.
+        """
+        self.assertLessEqual(self._best_import_ms(), STARTUP_BUDGET_MS * self.BUDGET_MARGIN)
+
+    @unittest.skipUnless(os.environ.get('LIBRARY_TIMING_TESTS'), "timing tests run only with LIBRARY_TIMING_TESTS=1")
+    def test_strict_startup_budget(self):
+        """ Проверяет, что импорт приложения укладывается в бюджет времени без запаса. """
+        self.assertLessEqual(self._best_import_ms(), STARTUP_BUDGET_MS)
+
+    @staticmethod
+    def _best_import_ms() -> float:
+        """ Возвращает время импорта приложения в миллисекундах. """
+        # Берётся лучший из нескольких замеров, чтобы случайная нагрузка на машину не влияла на результат.
+        return min(measure_import_time('app')['app'][1] for _ in range(3)) / 1000
@@ -0,0 +1,45 @@
+import unittest
+
+from book import BookStatus
+from exceptions import ValidationError
+from validation import validation_columns, validation_year
+
+
+class ValidationTest(unittest.TestCase):
+    """ Тестирование пакетной проверки значений. """
+    def test_validation_columns(self):
+        """ Проверяет пачку значений и сравнивает ошибки с ошибками проверки по одному значению. """
+        columns, errors = validation_columns({
+            'id': [1, '2', 0],
+            'title': [' Толковый словарь ', 'То', 'Война и мир'],
+            'author': ['В.И. Даль', 'Автор', 'Л'],
+            'year': ['1988', 2100, 'год'],
+            'status': [True, BookStatus.GIVEN_OUT, 1],
+        }, rows=[2, 3, 4])
+        self.assertEqual(columns['id'], [1, 2, None])
+        self.assertEqual(columns['title'], ['Толковый словарь', None, 'Война и мир'])
+        self.assertEqual(columns['year'], [1988, None, None])
+        self.assertEqual(columns['status'], [True, False, None])
+        self.assertEqual([error[:2] for error in errors],
+                         [(3, 'title'), (3, 'year'), (4, 'id'), (4, 'author'), (4, 'year'), (4, 'status')])
+
+        # Ошибки совпадают с теми, что выбрасывают функции проверки одного значения.
+        with self.assertRaises(ValidationError) as cm:
+            validation_year(2100)
+        self.assertEqual(errors[1], (3, cm.exception.var_name, cm.exception.value, cm.exception.message))
+        self.assertEqual(errors[0][2:], ('То', "The length of the book title should be from 3 to 50 characters."))
+
+        # Строки по умолчанию нумеруются с единицы.
+        _, errors = validation_columns({'title': ['Книга', 'Т']})
+        self.assertEqual(errors[0][0], 2)
+
+        # Значения не строкового типа дают ошибку проверки, а не исключение.
+        columns, errors = validation_columns({'title': [None, 'Книга'], 'author': ['Автор', 42]})
+        self.assertEqual(columns, {'title': [None, 'Книга'], 'author': ['Автор', None]})
+        self.assertEqual(errors, [(1, 'title', None, "The book title must be a string."),
+                                  (2, 'author', 42, "The book author must be a string.")])
+
+        with self.assertRaises(ValueError):
+            validation_columns({'pages': [1]})
+        with self.assertRaises(ValueError):
+            validation_columns({'title': ['Книга'], 'year': []})
@@ -1,10 +1,83 @@
 from datetime import datetime
-from typing import final
+from typing import Any, Callable, Sequence, final
 
 from book import BookStatus
 from exceptions import ValidationError
 
 
+TITLE_MIN: final = 3
+TITLE_MAX: final = 50
+AUTHOR_MIN: final = 2
+AUTHOR_MAX: final = 25
+
+
+def _check_id(val: int | str) -> tuple[Any, str | None]:
+    """
+    Проверяет идентификатор, не выбрасывая исключения.
+    :return: Кортеж (корректный идентификатор, None) или (значение для сообщения об ошибке, сообщение об ошибке).
+    """
+    try:
+        _id = int(val)
+    except (ValueError, TypeError):
+        return val, "The identifier must be an integer."
+    if _id < 1:
+        return val, "The identifier must be greater than zero."
+    return _id, None
+
+
+def _check_year(val: int | str, now_year: int) -> tuple[Any, str | None]:
+    """
+    Проверяет год, не выбрасывая исключения.
+    :param now_year: Текущий год.
+    :return: Кортеж (корректный год, None) или (значение для сообщения об ошибке, сообщение об ошибке).
+    """
+    try:
+        year = int(val)
+    except (ValueError, TypeError):
+        return val, "The year must be an integer."
+    if year > now_year:
+        return val, "The year cannot be longer than the current year."
+    return year, None
+
+
+def _check_status(val: bool | BookStatus) -> tuple[Any, str | None]:
+    """
+    Проверяет статус книги, не выбрасывая исключения.
+    :return: Кортеж (корректный статус, None) или (значение для сообщения об ошибке, сообщение об ошибке).
+    """
+    if isinstance(val, BookStatus):
+        return val.value, None
+    if not isinstance(val, bool):
+        return val, "The status must be a logical value."
+    return val, None
+
+
+def _check_title(val: str) -> tuple[Any, str | None]:
+    """
+    Проверяет заголовок, не выбрасывая исключения.
+    :return: Кортеж (корректный заголовок, None) или (значение для сообщения об ошибке, сообщение об ошибке).
+    """
+    if not isinstance(val, str):
+        return val, "The book title must be a string."
+    title = val.strip()
+    if len(title) < TITLE_MIN or len(title) > TITLE_MAX:
+        return title, f"The length of the book title should be from {TITLE_MIN} to {TITLE_MAX} characters."
+    return title, None
+
+
+def _check_author(val: str) -> tuple[Any, str | None]:
+    """
+    Проверяет автора, не выбрасывая исключения.
+    :return: Кортеж (корректный автор, None) или (значение для сообщения об ошибке, сообщение об ошибке).
+    """
+    if not isinstance(val, str):
+        return val, "The book author must be a string."
+    author = val.strip()
+    if len(author) < AUTHOR_MIN or len(author) > AUTHOR_MAX:
+        return author, f"The length of the book author should be from {AUTHOR_MIN} to {AUTHOR_MAX} characters."
+    return author, None
+
+
 def validation_id(val: int | str) -> int:
     """
     Проверяет переданный идентификатор.
@@ -13,14 +86,9 @@ def validation_id(val: int | str) -> int:
     :return: Корректный идентификатор.
     :raises ValidationError: Ошибка проверки корректности идентификатора.
     """
-    try:
-        _id = int(val)
-    except ValueError:
-        raise ValidationError("The identifier must be an integer.", 'id', val)
-
-    if _id < 1:
-        raise ValidationError("The identifier must be greater than zero.", 'id', val)
-
+    _id, message = _check_id(val)
+    if message is not None:
+        raise ValidationError(message, 'id', _id)
     return _id
 
 
@@ -33,14 +101,9 @@ def validation_year(val: int | str) -> int:
     :return: Корректный год.
     :raises ValidationError: Ошибка проверки корректности года.
     """
-    try:
-        year = int(val)
-    except ValueError:
-        raise ValidationError("The year must be an integer.", 'year', val)
-
-    now_year = datetime.now().year
-    if year > now_year:
-        raise ValidationError("The year cannot be longer than the current year.", 'year', val)
+    year, message = _check_year(val, datetime.now().year)
+    if message is not None:
+        raise ValidationError(message, 'year', year)
     return year
 
 
@@ -51,12 +114,9 @@ def validation_status(val: bool | BookStatus) -> bool:
     :return: Корректный статус.
     :raises ValidationError: Ошибка проверки статуса.
     """
-    if isinstance(val, BookStatus):
-        status = val.value
-    elif not isinstance(val, bool):
-        raise ValidationError("The status must be a logical value.", 'status', val)
-    else:
-        status = val
+    status, message = _check_status(val)
+    if message is not None:
+        raise ValidationError(message, 'status', status)
     return status
 
 
@@ -67,11 +127,9 @@ def validation_title(val: str):
     :return:
     :raises ValidationError: Ошибка проверки заголовка.
     """
-    _min: final = 3
-    _max: final = 50
-    title = val.strip()
-    if len(title) < _min or len(title) > _max:
-        raise ValidationError(f"The length of the book title should be from {_min} to {_max} characters.", 'title', title)
+    title, message = _check_title(val)
+    if message is not None:
+        raise ValidationError(message, 'title', title)
     return title
 
 
@@ -82,9 +140,49 @@ def validation_author(val: str):
     :return:
     :raises ValidationError: Ошибка проверки автора.
     """
-    _min: final = 2
-    _max: final = 25
-    author = val.strip()
-    if len(author) < _min or len(author) > _max:
-        raise ValidationError(f"The length of the book author should be from {_min} to {_max} characters.", 'author', author)
+    author, message = _check_author(val)
+    if message is not None:
+        raise ValidationError(message, 'author', author)
     return author
+
+
+def validation_columns(columns: dict[str, Sequence[Any]], rows: Sequence[int] | None = None) \
+        -> tuple[dict[str, list[Any]], list[tuple[int, str, Any, str]]]:
+    """
+    Проверяет пачку значений, разложенных по колонкам, за один проход.
+    Текущий год определяется один раз на всю пачку, а ошибки не выбрасываются, а собираются в список.
+    :param columns: Колонки значений, ключами могут быть 'id', 'title', 'author', 'year' и 'status'.
+        Все колонки должны быть одной длины.
+    :param rows: Номера строк пачки для сообщений об ошибках, по умолчанию строки нумеруются с единицы.
+    :return: Кортеж из колонок корректных значений, где вместо ошибочных значений стоит None,
+        и списка ошибок (номер строки, поле, значение, сообщение), как в ValidationError.
+    :raises ValueError: Неизвестная колонка или колонки разной длины.
+    """
+    now_year = datetime.now().year
+    checks: dict[str, Callable[[Any], tuple[Any, str | None]]] = {
+        'id': _check_id,
+        'title': _check_title,
+        'author': _check_author,
+        'year': lambda val: _check_year(val, now_year),
+        'status': _check_status,
+    }
+    unknown = columns.keys() - checks.keys()
+    if unknown:
+        raise ValueError(f"Unknown columns for validation: {', '.join(sorted(unknown))}")
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("The columns for validation must be of the same length")
+    length = lengths.pop() if lengths else 0
+    if rows is None:
+        rows = range(1, length + 1)
+
+    fields = [(field, checks[field], values, []) for field, values in columns.items()]
+    errors: list[tuple[int, str, Any, str]] = []
+    for i in range(length):
+        for field, check, values, valid_values in fields:
+            value, message = check(values[i])
+            if message is not None:
+                errors.append((rows[i], field, value, message))
+                value = None
+            valid_values.append(value)
+    return {field: valid_values for field, _, _, valid_values in fields}, errors